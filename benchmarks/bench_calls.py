@@ -0,0 +1,31 @@
+"""Compares function calls per second of every execution engine.
+
+Usage (from repository root):
+    python -m benchmarks.bench_calls [calls] [depth]
+"""
+import sys
+
+from mylang.program import EXECUTION_ENGINES
+
+from .bench_engines import run
+from .programs import deep_recursion_program, shallow_calls_program
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    repeats = calls // depth
+    benchmarks = [
+        ("shallow calls", shallow_calls_program(calls), calls),
+        (f"recursion of depth {depth}",
+         deep_recursion_program(depth, repeats), (depth + 1) * repeats),
+    ]
+    for title, code, call_count in benchmarks:
+        print(f"{title}, {call_count} calls")
+        for engine in EXECUTION_ENGINES:
+            elapsed = run(code, engine)
+            print(f"{engine:>12}: {call_count / elapsed:,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compares drawing on every canvas (CANVAS_MODES) on every execution engine.
+Time includes computing lines of deferred canvas. Also reports memory (RAM)
+taken by one point of line.
+
+Usage (from repository root):
+    python -m benchmarks.bench_canvas [iterations]
+"""
+import sys
+import time
+import tracemalloc
+
+from mylang.lexer import ScanningLexer
+from mylang.parser_logo import Parser
+from mylang.program import EXECUTION_ENGINES
+from mylang.standard_library.drawing.canvas import CANVAS_MODES
+from mylang.text_reader import StringReader
+
+from .programs import loop_program, method_calls_program
+
+
+def run(code: str, engine: str, canvas: str, repeat: int = 3) -> float:
+    "returns the best time of execution and reading canvas"
+    times = []
+    for _ in range(repeat):
+        program = Parser(ScanningLexer(StringReader(code))).parse_program()
+        program.set_canvas(CANVAS_MODES[canvas]())
+        start = time.perf_counter()
+        program.execute(engine)
+        program.get_canvas().turtle_lines
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bytes_per_point(canvas: str, points: int = 100000) -> float:
+    "returns memory taken by points of line drawn by native methods"
+    code = f"t = Turtle() t.poly({points}, 1) t.get_x()"
+    program = Parser(ScanningLexer(StringReader(code))).parse_program()
+    program.set_canvas(CANVAS_MODES[canvas]())
+    tracemalloc.start()
+    program.execute("tree")
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / points
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    benchmarks = [
+        (f"fd and rotate, {iterations} iterations",
+         method_calls_program(iterations)),
+        (f"while loop, {iterations} iterations", loop_program(iterations)),
+    ]
+    for title, code in benchmarks:
+        print(title)
+        for engine in EXECUTION_ENGINES:
+            times = [run(code, engine, x) for x in CANVAS_MODES]
+            results = ", ".join(f"{x} {y:.3f}s"
+                                for x, y in zip(CANVAS_MODES, times))
+            print(f"{engine:>12}: {results}")
+    print("memory per point")
+    for canvas in CANVAS_MODES:
+        print(f"{canvas:>12}: {bytes_per_point(canvas):.1f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Measures number of points and time of building levels of detail of
+spiral drawn with many short moves.
+
+Usage (from repository root):
+    python -m benchmarks.bench_decimation [points]
+"""
+import sys
+import time
+
+from mylang.lexer import ScanningLexer
+from mylang.parser_logo import Parser
+from mylang.standard_library.drawing.canvas import ColumnarPaths
+from mylang.standard_library.drawing.decimation import LevelsOfDetail
+from mylang.text_reader import StringReader
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    code = (f"t = Turtle() repeat({points // 1000}) "
+            f"{{ t.arc(500, 360, 1000) t.fd(5) }}")
+    program = Parser(ScanningLexer(StringReader(code))).parse_program()
+    program.set_canvas(ColumnarPaths())
+    program.execute()
+    canvas = program.get_canvas()
+    levels = LevelsOfDetail(canvas)
+    print(f"{len(canvas.get_columns(0)[0])} points")
+    for level, tolerance in enumerate(levels.tolerances):
+        start = time.perf_counter()
+        paths = levels.get_level(level)
+        took = time.perf_counter() - start
+        print(f"level {level}: tolerance {tolerance:.4f}, "
+              f"{paths.count_points()} points, {took:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
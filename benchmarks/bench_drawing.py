@@ -0,0 +1,29 @@
+"""Compares drawing of polygons by native poly method and by loop of fd and
+rotate calls on every execution engine.
+
+Usage (from repository root):
+    python -m benchmarks.bench_drawing [sides] [count]
+"""
+import sys
+
+from mylang.program import EXECUTION_ENGINES
+
+from .bench_engines import run
+from .programs import polygons_program
+
+
+def main():
+    sides = int(sys.argv[1]) if len(sys.argv) > 1 else 360
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"{count} polygons with {sides} sides")
+    loop_code = polygons_program(sides, count, native=False)
+    native_code = polygons_program(sides, count, native=True)
+    for engine in EXECUTION_ENGINES:
+        loop_time = run(loop_code, engine)
+        native_time = run(native_code, engine)
+        print(f"{engine:>12}: loop {loop_time:.3f}s, poly {native_time:.3f}s "
+              f"({loop_time / native_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
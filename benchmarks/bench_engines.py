@@ -0,0 +1,55 @@
+"""Compares execution time of programs on every execution engine.
+
+Usage (from repository root):
+    python -m benchmarks.bench_engines [iterations] [fractal_depth]
+"""
+import sys
+import time
+
+from mylang.lexer import ScanningLexer
+from mylang.parser_logo import Parser
+from mylang.program import EXECUTION_ENGINES
+from mylang.text_reader import StringReader
+
+from .programs import (arithmetic_program, counted_loop_program,
+                       fractal_program, if_in_while_program, loop_program,
+                       nested_scopes_program)
+
+
+def run(code: str, engine: str, repeat: int = 3) -> float:
+    "returns the best execution time of repeat runs"
+    times = []
+    for _ in range(repeat):
+        program = Parser(ScanningLexer(StringReader(code))).parse_program()
+        start = time.perf_counter()
+        program.execute(engine)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 13
+    benchmarks = [
+        (f"arithmetic loop, {iterations} iterations",
+         arithmetic_program(iterations)),
+        (f"while loop, {iterations} iterations", loop_program(iterations)),
+        (f"for loop, {iterations} iterations",
+         counted_loop_program(iterations)),
+        (f"recursive tree, depth {depth}", fractal_program(depth)),
+        (f"nested scopes, {iterations} iterations",
+         nested_scopes_program(iterations)),
+        (f"if inside while, {iterations} iterations",
+         if_in_while_program(iterations)),
+    ]
+    for title, code in benchmarks:
+        print(title)
+        base_time = None
+        for engine in EXECUTION_ENGINES:
+            elapsed = run(code, engine)
+            base_time = base_time or elapsed
+            print(f"{engine:>12}: {elapsed:.3f}s ({base_time / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
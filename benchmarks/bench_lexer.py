@@ -0,0 +1,53 @@
+"""Compares tokens per second of the available lexers.
+
+Usage (from repository root):
+    python -m benchmarks.bench_lexer [copies]
+"""
+import sys
+import time
+
+from mylang.lexer import LEXERS, ScanningLexer
+from mylang.shared import TokenType
+from mylang.text_reader import StringReader
+
+from .programs import generated_program
+
+
+def count_tokens(lexer_class, code: str) -> int:
+    lexer = lexer_class(StringReader(code))
+    count = 0
+    while lexer.get_token().symbol_type != TokenType.EOF:
+        count += 1
+    return count
+
+
+def count_raw_tokens(code: str) -> int:
+    "Token count using raw tuples from ScanningLexer.scan (no Token objects)"
+    count = 0
+    for token_type, _, _, _ in ScanningLexer(StringReader(code)).scan():
+        if token_type == TokenType.EOF:
+            return count
+        count += 1
+
+
+def report(name: str, tokens: int, elapsed: float):
+    print(f"{name:>16}: {tokens} tokens in {elapsed:.3f}s "
+          f"({tokens / elapsed:,.0f} tokens/s)")
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    code = generated_program(copies)
+    print(f"Source size: {len(code) / 1024:.0f} KiB")
+    for name, lexer_class in LEXERS.items():
+        start = time.perf_counter()
+        tokens = count_tokens(lexer_class, code)
+        report(name, tokens, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tokens = count_raw_tokens(code)
+    report("scanning (raw)", tokens, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
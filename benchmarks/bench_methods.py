@@ -0,0 +1,25 @@
+"""Compares turtle method calls (fd, rotate) per second of every execution
+engine.
+
+Usage (from repository root):
+    python -m benchmarks.bench_methods [iterations]
+"""
+import sys
+
+from mylang.program import EXECUTION_ENGINES
+
+from .bench_engines import run
+from .programs import method_calls_program
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    code = method_calls_program(iterations)
+    print(f"fd and rotate, {2 * iterations} calls")
+    for engine in EXECUTION_ENGINES:
+        elapsed = run(code, engine)
+        print(f"{engine:>12}: {2 * iterations / elapsed:,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main()
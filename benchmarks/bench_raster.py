@@ -0,0 +1,52 @@
+"""Measures speed of RasterRenderer in megapixels per second, rendering in
+one process and in tiles by pool of processes.
+
+Usage (from repository root):
+    python -m benchmarks.bench_raster [size] [polygons]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from mylang.lexer import ScanningLexer
+from mylang.parser_logo import Parser
+from mylang.standard_library.drawing.raster_renderer import RasterRenderer
+from mylang.text_reader import StringReader
+
+
+def run(canvas, size: int, **options) -> tuple:
+    "returns megapixels of image and the best time of rendering"
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "image.png")
+        renderer = RasterRenderer(canvas, output, size=size, **options)
+        for _ in range(3):
+            start = time.perf_counter()
+            renderer.render()
+            times.append(time.perf_counter() - start)
+        width, height, _ = renderer.get_segments()
+    return width * height / 1e6, min(times)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    polygons = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    code = (f"t = Turtle() repeat({polygons}) "
+            f"{{ t.poly(36, 40) t.rotate({360 / polygons}) }}")
+    program = Parser(ScanningLexer(StringReader(code))).parse_program()
+    program.execute()
+    canvas = program.get_canvas()
+    print(f"{36 * polygons} segments, image of {size} pixels, "
+          f"{os.cpu_count()} CPUs")
+    for title, options in [
+        ("one process", {"workers": 1, "tile_size": size}),
+        ("tiles of 512 px", {"workers": 1, "tile_size": 512}),
+        ("process pool", {"tile_size": 512}),
+    ]:
+        megapixels, best = run(canvas, size, **options)
+        print(f"{title:>16}: {best:.3f}s, {megapixels / best:.1f} Mpx/s")
+
+
+if __name__ == "__main__":
+    main()
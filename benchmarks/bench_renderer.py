@@ -0,0 +1,45 @@
+"""Compares time of building Qt scene of big drawing in every render mode
+of WindowRenderer. Needs PyQt5, runs without window (offscreen platform).
+
+Usage (from repository root):
+    python -m benchmarks.bench_renderer [segments]
+"""
+import os
+import sys
+import time
+
+from mylang.lexer import ScanningLexer
+from mylang.parser_logo import Parser
+from mylang.standard_library.drawing.canvas import ColumnarPaths
+from mylang.standard_library.drawing.window_renderer import (
+    RENDER_MODES, CanvasWidget, WindowRenderer)
+from mylang.text_reader import StringReader
+
+from PyQt5.QtWidgets import QApplication
+
+
+def build_scene(canvas, mode: str) -> float:
+    "returns time of drawing canvas on new scene"
+    scene = CanvasWidget()
+    renderer = WindowRenderer(canvas, mode)
+    start = time.perf_counter()
+    renderer.draw_lines(scene)
+    scene.fit_to_items(renderer.MARGIN)
+    return time.perf_counter() - start
+
+
+def main():
+    segments = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    code = f"t = Turtle() t.arc(1000, {segments}, {segments})"
+    program = Parser(ScanningLexer(StringReader(code))).parse_program()
+    program.set_canvas(ColumnarPaths())
+    program.execute()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])
+    print(f"scene of {segments} segments")
+    for mode in RENDER_MODES:
+        print(f"{mode:>12}: {build_scene(program.get_canvas(), mode):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Generators of big Logo programs used by benchmarks."""
+
+DRAW_TRIANGLE = """
+fun draw_triangle{nr}(turtle, len){{
+    num=0
+    turtle.fd(len/2)
+    while(num<2)
+    {{
+        turtle.rotate(120)
+        turtle.fd(len)
+        num = num + 1
+    }}
+    turtle.rotate(120)
+    turtle.fd(len/2)
+    if(len > 10 && num == 2 || len != 3){{
+        println("triangle {nr} done")
+    }}else{{
+        print("skipped")
+    }}
+}}
+t{nr} = Turtle()
+t{nr}.set_angle({nr} * 3.5)
+draw_triangle{nr}(t{nr}, {nr} + 100)
+"""
+
+
+def generated_program(copies: int) -> str:
+    """Returns program made of `copies` renamed copies of testfile.logo-like
+    triangle drawing code (around 400 bytes per copy).
+    """
+    return "".join(DRAW_TRIANGLE.format(nr=nr) for nr in range(copies))
+
+
+def loop_program(iterations: int) -> str:
+    """Returns loop-heavy turtle program running `iterations` iterations."""
+    return f"""
+t = Turtle()
+i = 0
+while(i < {iterations})
+{{
+    t.fd(i / 100 + 1)
+    t.rotate(91)
+    i = i + 1
+}}
+"""
+
+
+def counted_loop_program(iterations: int) -> str:
+    """Returns loop_program with while loop replaced by for loop."""
+    return f"""
+t = Turtle()
+for (i, 0, {iterations} - 1)
+{{
+    t.fd(i / 100 + 1)
+    t.rotate(91)
+}}
+"""
+
+
+def fractal_program(depth: int) -> str:
+    """Returns recursive tree drawing program (2^depth branches)."""
+    return f"""
+fun tree(t, len, depth)
+{{
+    if(depth > 0)
+    {{
+        t.fd(len)
+        t.rotate(-25)
+        tree(t, len * 0.7, depth - 1)
+        t.rotate(50)
+        tree(t, len * 0.7, depth - 1)
+        t.rotate(-25)
+        t.fd(-len)
+    }}
+}}
+tree(Turtle(), 50, {depth})
+"""
+
+
+def arithmetic_program(iterations: int) -> str:
+    """Returns loop doing only arithmetic and comparisons."""
+    return f"""
+i = 0
+sum = 0
+while(i < {iterations})
+{{
+    sum = sum + i * 2 / 3 - 1
+    if(sum > 1000 && i != 3)
+    {{
+        sum = sum - 1000
+    }}
+    i = i + 1
+}}
+"""
+
+
+def nested_scopes_program(iterations: int) -> str:
+    """Returns function accessing its variables from nested while/if
+    blocks (`iterations` iterations of innermost loop)."""
+    return f"""
+fun nested(count)
+{{
+    total = 0
+    i = 0
+    while(i < count)
+    {{
+        j = 0
+        while(j < 10)
+        {{
+            if(j > 2)
+            {{
+                if(i != j)
+                {{
+                    total = total + i - j
+                }}
+            }}
+            j = j + 1
+        }}
+        i = i + 1
+    }}
+    return(total)
+}}
+result = nested({iterations // 10})
+"""
+
+
+def if_in_while_program(iterations: int) -> str:
+    """Returns loop with if statements not defining variables (first one)
+    and defining one (second one)."""
+    return f"""
+i = 0
+odd = 0
+while(i < {iterations})
+{{
+    if(i - (i / 2 - 0.5) * 2 == 1)
+    {{
+        odd = odd + 1
+    }}
+    if(i > 10)
+    {{
+        last = i
+        odd = odd + last - i
+    }}
+    i = i + 1
+}}
+"""
+
+
+def shallow_calls_program(calls: int) -> str:
+    """Returns loop calling small non-recursive function `calls` times."""
+    return f"""
+fun add(a, b)
+{{
+    return(a + b)
+}}
+i = 0
+while(i < {calls})
+{{
+    i = add(i, 1)
+}}
+"""
+
+
+def deep_recursion_program(depth: int, repeats: int) -> str:
+    """Returns program running recursion of given depth `repeats` times
+    ((depth + 1) * repeats calls)."""
+    return f"""
+fun depth(n)
+{{
+    if(n > 0)
+    {{
+        return(depth(n - 1) + 1)
+    }}
+    return(0)
+}}
+i = 0
+while(i < {repeats})
+{{
+    i = i + depth({depth}) / {depth}
+}}
+"""
+
+
+def method_calls_program(iterations: int) -> str:
+    """Returns loop calling fd and rotate of turtle `iterations` times each
+    (2 * iterations method calls)."""
+    return f"""
+t = Turtle()
+i = 0
+while(i < {iterations})
+{{
+    t.fd(1)
+    t.rotate(1)
+    i = i + 1
+}}
+"""
+
+
+def polygons_program(sides: int, count: int, native: bool) -> str:
+    """Returns program drawing `count` polygons with `sides` sides, with
+    poly method or with loop of fd and rotate calls."""
+    if native:
+        draw = f"t.poly({sides}, 1)"
+    else:
+        draw = f"repeat({sides}) {{ t.fd(1) t.rotate(360 / {sides}) }}"
+    return f"""
+t = Turtle()
+repeat({count})
+{{
+    {draw}
+    t.rotate(7)
+}}
+"""
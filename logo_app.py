@@ -3,13 +3,19 @@ import argparse
 
 import pathlib
 
+from mylang.optimizer import AstOptimizer
+from mylang.parse_cache import ParseCache
 from mylang.parser_logo import Parser
-from mylang.lexer import Lexer
+from mylang.program import EXECUTION_ENGINES
+from mylang.lexer import LEXERS
 from mylang.shared import ConsoleLogger
-from mylang.text_reader import FileReader
+from mylang.text_reader import MappedFileReader
 from mylang.language_errors import BaseLanguageException
 
-from mylang.standard_library.drawing.window_renderer import WindowRenderer
+from mylang.standard_library.drawing.canvas import CANVAS_MODES
+from mylang.standard_library.drawing.raster_renderer import RasterRenderer
+from mylang.standard_library.drawing.renderer import RENDER_MODES
+from mylang.standard_library.drawing.svg_renderer import SvgRenderer
 
 logger = ConsoleLogger()
 
@@ -26,36 +32,108 @@ def parse_arguments():
                         help="Don't show turtle visualization after execution",
                         action="store_false",
                         dest="render")
+    parser.add_argument("-l",
+                        "--lexer",
+                        help="lexer used for tokenizing source",
+                        choices=LEXERS.keys(),
+                        default="classic")
+    parser.add_argument("-c",
+                        "--cache-dir",
+                        help="directory for cache of parsed programs",
+                        type=pathlib.Path)
+    parser.add_argument("-e",
+                        "--engine",
+                        help="engine used for program execution",
+                        choices=EXECUTION_ENGINES.keys(),
+                        default="tree")
+    parser.add_argument("-O",
+                        "--optimize",
+                        help="simplify program (constant folding, removal "
+                        "of unreachable branches) before execution",
+                        action="store_true")
+    parser.add_argument("-m",
+                        "--memoize",
+                        help="cache results of pure functions and show "
+                        "statistics of cache hits",
+                        action="store_true")
+    parser.add_argument("--canvas",
+                        help="eager canvas computes lines while program "
+                        "runs, deferred one records turtle commands and "
+                        "computes lines when they are read, columnar one "
+                        "keeps points in compact arrays, spill one writes "
+                        "them to temporary files, indexed one also keeps "
+                        "segments in spatial grid",
+                        choices=CANVAS_MODES.keys(),
+                        default="eager")
+    parser.add_argument("--render-mode",
+                        help="path mode draws line of every turtle as few "
+                        "paths, segments mode draws every segment separately",
+                        choices=RENDER_MODES,
+                        default="path")
+    parser.add_argument("-o",
+                        "--output",
+                        help="write drawing to PNG or SVG file (by "
+                        "extension) instead of showing it in window",
+                        type=pathlib.Path)
 
     return parser.parse_args()
 
 
-def render(program):
+def render(program, mode: str):
+    # imported only when it's used, it needs PyQt5 and display
+    from mylang.standard_library.drawing.window_renderer import WindowRenderer
     c = program.get_canvas()
-    renderer = WindowRenderer(c)
+    renderer = WindowRenderer(c, mode)
     renderer.render()
 
 
+def write_image(program, path: pathlib.Path):
+    canvas = program.get_canvas()
+    if path.suffix.lower() == ".svg":
+        with open(path, "w") as file:
+            SvgRenderer(canvas, file).render()
+    else:
+        RasterRenderer(canvas, path).render()
+
+
 def main():
     args = parse_arguments()
     if not args.file.exists():
         logger.warn(f"File {args.file} does not exist")
         return
     logger.info("Parsing program")
-    reader = FileReader(args.file)
+    reader = MappedFileReader(args.file)
     try:
-        lexer = Lexer(reader)
-        program = Parser(lexer).parse_program()
+        if args.cache_dir:
+            cache = ParseCache(cache_dir=args.cache_dir,
+                               lexer_class=LEXERS[args.lexer])
+            program = cache.parse_program(reader)
+        else:
+            program = Parser(LEXERS[args.lexer](reader)).parse_program()
+        if args.optimize:
+            optimizer = AstOptimizer()
+            optimizer.optimize(program)
+            logger.info(optimizer.report())
+        program.set_canvas(CANVAS_MODES[args.canvas]())
         logger.info("Executing program")
-        program.execute()
-        if args.render:
-            render(program)
+        program.execute(args.engine, memoize=args.memoize)
+        if args.memoize:
+            logger.info(program.memoizer.report())
+        if program.quickening_stats:
+            logger.info(program.quickening_stats.report())
+        if args.output:
+            logger.info(f"Writing drawing to {args.output}")
+            write_image(program, args.output)
+        elif args.render:
+            render(program, args.render_mode)
         else:
             logger.info("Pass rendering")
     except BaseLanguageException as exc:
         logger.error(f"Error: {exc.args[0]}")
         logger.error(f"At: {exc.location}")
         logger.log(reader.get_loc_region(exc.location))
+    finally:
+        reader.close()
 
 
 if __name__ == "__main__":
@@ -64,11 +64,102 @@ class BaseValue(Expression):
         pass
 
 
+class NativeMethod(object):
+    """method of BaseObject implemented by Python function, arguments is
+    number of its arguments (None if it takes any number)"""
+    __slots__ = ("name", "function", "arguments")
+
+    def __init__(self, name: str, function, arguments: int = 0):
+        self.name = name
+        self.function = function
+        self.arguments = arguments
+
+    def call(self, source_object, values: list):
+        if self.arguments is not None and len(values) != self.arguments:
+            raise LogoRuntimeError(
+                f"wrong number of arguments passed to function {self.name} "
+                f"{len(values)} instead of expected {self.arguments}")
+        return self.function(source_object, *values)
+
+
+class BoundMethod(BaseFunctionDefinition):
+    "value of object field, NativeMethod bound to the object"
+
+    def __init__(self, source_object, method: NativeMethod):
+        super().__init__(name=method.name)
+        self.source_object = source_object
+        self.method = method
+
+    def execute(self, values: list, root_context: RootContext):
+        return self.method.call(self.source_object, values)
+
+
+def native_method(name: str, arguments: int = 0):
+    """Decorator registering method of BaseObject subclass as field with
+    given name and number of arguments (None for any number)."""
+    def decorator(function):
+        function.native_method = NativeMethod(name, function, arguments)
+        return function
+
+    return decorator
+
+
 class BaseObject(ABC):
-    @abstractmethod
+    """Object with fields, which are native methods.
+
+    Methods are kept in class-level table (name -> NativeMethod), filled
+    by native_method decorator and register_method, subclasses inherit
+    methods of base classes. obj.m(...) is called with call_method without
+    creating any object, get_field returns BoundMethod, cached in object if
+    cache_bound_methods is set. Objects with __del__ shouldn't cache, it
+    makes reference cycles which delay their deletion.
+    """
+    methods = {}
+    cache_bound_methods = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        methods = {}
+        for base in reversed(cls.__mro__[1:]):
+            methods.update(vars(base).get("methods", {}))
+        for value in vars(cls).values():
+            method = getattr(value, "native_method", None)
+            if isinstance(method, NativeMethod):
+                methods[method.name] = method
+        cls.methods = methods
+
+    @classmethod
+    def register_method(cls, name: str, function, arguments: int = 0):
+        "adds field calling function(object, *arguments)"
+        cls.methods[name] = NativeMethod(name, function, arguments)
+
     def get_field(self, name: str):
-        pass
+        "returns field of object, raises KeyError if there is no such field"
+        if not self.cache_bound_methods:
+            return BoundMethod(self, self.methods[name])
+        cache = self.__dict__.setdefault("_bound_methods", {})
+        field = cache.get(name)
+        if field is None:
+            field = cache[name] = BoundMethod(self, self.methods[name])
+        return field
+
+    def call_method(self, name: str, values: list):
+        "calls field of object, raises KeyError if there is no such field"
+        return self.methods[name].call(self, values)
 
     @abstractmethod
     def evaluate(self, context: Context):
         pass
+
+
+def get_field(source_element, name: str):
+    "returns field of object, used by engines compiling field access"
+    if isinstance(source_element, BaseObject):
+        try:
+            return source_element.get_field(name)
+        except KeyError:
+            raise LogoRuntimeError(
+                f"Tried to access non-existing field ({name}) from {source_element.name}"
+            )
+    raise LogoRuntimeError(
+        f"Trying to access field ({name}) of non-object element")
@@ -0,0 +1,508 @@
+from array import array
+
+from .base_nodes import BaseObject
+from .context import Context
+from .definition_classes import FUNCTION_DEFINITIONS, FunctionDefinition
+from .language_errors import LogoRuntimeError
+from .memoization import MISSING
+from .node_classes import (ForStatement, IfStatement, Relation,
+                           ReturnStatement, ValueAssignment, WhileStatement)
+from .node_visitor import NodeVisitor
+from .optimizer import assigned_names
+
+# opcodes, every instruction is a pair (opcode, argument)
+LOAD_CONST = 0
+LOAD_NAME = 1
+STORE_NAME = 2
+POP = 3
+ADD = 4
+SUBTRACT = 5
+MULTIPLY = 6
+DIVIDE = 7
+COMPARE = 8
+NEGATE = 9
+NOT = 10
+AND = 11
+OR = 12
+GET_FIELD = 13
+CALL = 14
+RETURN = 15
+JUMP = 16
+JUMP_IF_FALSE = 17
+JUMP_IF_TRUE = 18
+ENTER_SCOPE = 19
+EXIT_SCOPE = 20
+STATEMENT = 21
+HALT = 22
+GET_METHOD = 23
+CALL_METHOD = 24
+FOR_SETUP = 25
+FOR_ITER = 26
+
+OPCODE_NAMES = {
+    value: name
+    for name, value in globals().items()
+    if name.isupper() and isinstance(value, int)
+}
+COMPARE_OPERATORS = tuple(Relation.COMP_OPERATIONS)
+COMPARE_FUNCTIONS = tuple(Relation.COMP_OPERATIONS.values())
+
+
+class CodeObject(object):
+    "Instructions of function body or main program"
+    __slots__ = ("name", "code", "constants")
+
+    def __init__(self, name: str, constants: list):
+        self.name = name
+        self.code = array("i")
+        self.constants = constants
+
+    def emit(self, opcode: int, argument: int = 0) -> int:
+        "appends instruction and returns its position"
+        self.code.append(opcode)
+        self.code.append(argument)
+        return len(self.code) - 2
+
+    def patch(self, position: int, target: int):
+        "sets argument of jump instruction at position"
+        self.code[position + 1] = target
+
+    def __str__(self):
+        ret = f"CODE: {self.name}\n"
+        for pc in range(0, len(self.code), 2):
+            opcode, argument = self.code[pc], self.code[pc + 1]
+            ret += f"{pc:6} {OPCODE_NAMES[opcode]:<14} {argument}"
+            if opcode in (LOAD_CONST, LOAD_NAME, STORE_NAME, GET_FIELD,
+                          GET_METHOD, FOR_SETUP):
+                ret += f" ({self.constants[argument]!r})"
+            ret += "\n"
+        return ret
+
+
+class BytecodeCompiler(NodeVisitor):
+    """Compiles Program into CodeObjects.
+
+    All code objects share one constants pool. Names and locations needed
+    by instructions are stored there too.
+    """
+    def __init__(self, program):
+        self.program = program
+        self.constants = []
+        self.constant_ids = {}
+        self.functions = {}
+        self.code = None
+        # root variable named return would be called by return(...)
+        self.return_assigned = any(
+            isinstance(x, ValueAssignment) and x.name == "return"
+            for x in program.statements)
+        self.return_shadowed = self.return_assigned
+
+    def compile_program(self) -> CodeObject:
+        "compiles definitions and returns code of main program"
+        for definition in self.program.definitions:
+            self.code = CodeObject(definition.name, self.constants)
+            self.return_shadowed = (self.return_assigned
+                                    or "return" in assigned_names(definition))
+            self.visit(definition.block)
+            self.code.emit(LOAD_CONST, self._constant(None))
+            self.code.emit(RETURN, 1)
+            self.functions[definition] = self.code
+
+        self.code = CodeObject("<main>", self.constants)
+        for statement in self.program.statements:
+            self.code.emit(STATEMENT, self._constant(statement))
+            self._compile_statement(statement)
+        self.code.emit(HALT)
+        return self.code
+
+    def _constant(self, value) -> int:
+        if type(value) in (float, str):
+            key = (type(value), repr(value))
+        else:
+            key = id(value)
+        nr = self.constant_ids.get(key)
+        if nr is None:
+            nr = len(self.constants)
+            self.constant_ids[key] = nr
+            self.constants.append(value)
+        return nr
+
+    def _compile_statement(self, statement):
+        if type(statement) is ReturnStatement:
+            self._compile_return(statement)
+            return
+        self.visit(statement)
+        if not isinstance(statement,
+                          (ValueAssignment, IfStatement, WhileStatement,
+                           ForStatement)):
+            # value of expression used as statement is dropped
+            self.code.emit(POP)
+
+    def _compile_return(self, statement):
+        if self.return_shadowed:
+            # return is variable, it's called like any function
+            self.visit(statement.call)
+            self.code.emit(POP)
+            return
+        for argument in statement.arguments:
+            self.visit(argument)
+        self.code.emit(RETURN, len(statement.arguments))
+
+    def visit_Block(self, node):
+        for statement in node.statements:
+            self._compile_statement(statement)
+
+    def visit_ValueAssignment(self, node):
+        self.visit(node.expression)
+        self.code.emit(STORE_NAME, self._constant(node.name))
+
+    def visit_IfStatement(self, node):
+        self.visit(node.condition)
+        jump_else = self.code.emit(JUMP_IF_FALSE)
+        self._compile_scoped_block(node.true_block)
+        if node.false_block:
+            jump_end = self.code.emit(JUMP)
+            self.code.patch(jump_else, len(self.code.code))
+            self._compile_scoped_block(node.false_block)
+            self.code.patch(jump_end, len(self.code.code))
+        else:
+            self.code.patch(jump_else, len(self.code.code))
+
+    def _compile_scoped_block(self, block):
+        "block not assigning variables runs in enclosing context"
+        if block.defines_variables:
+            self.code.emit(ENTER_SCOPE)
+        self.visit(block)
+        if block.defines_variables:
+            self.code.emit(EXIT_SCOPE)
+
+    def visit_WhileStatement(self, node):
+        # the first condition check is done in outer context, next ones in
+        # while context
+        scoped = node.block.defines_variables
+        self.visit(node.condition)
+        jump_end = self.code.emit(JUMP_IF_FALSE)
+        if scoped:
+            self.code.emit(ENTER_SCOPE)
+        loop_start = len(self.code.code)
+        self.visit(node.block)
+        self.visit(node.condition)
+        self.code.emit(JUMP_IF_TRUE, loop_start)
+        if scoped:
+            self.code.emit(EXIT_SCOPE)
+        self.code.patch(jump_end, len(self.code.code))
+
+    def visit_ForStatement(self, node):
+        # iterator of counter values stays on stack during the loop
+        self.visit(node.start)
+        self.visit(node.end)
+        self.visit(node.step)
+        self.code.emit(FOR_SETUP, self._constant(node.variable))
+        loop_start = self.code.emit(FOR_ITER)
+        self.visit(node.block)
+        self.code.emit(JUMP, loop_start)
+        self.code.patch(loop_start, len(self.code.code))
+        self.code.emit(EXIT_SCOPE)
+
+    def visit_LogicalExpression(self, node):
+        for condition in node.and_conditions:
+            self.visit(condition)
+        self.code.emit(OR, len(node.and_conditions))
+
+    def visit_AndCondition(self, node):
+        for relation in node.relations:
+            self.visit(relation)
+        self.code.emit(AND, len(node.relations))
+
+    def visit_Relation(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+        self.code.emit(COMPARE, COMPARE_OPERATORS.index(node.comp_sign))
+
+    def visit_MathExpression(self, node):
+        self.visit(node.add_expressions[0])
+        for sign, expression in zip(node.operators, node.add_expressions[1:]):
+            self.visit(expression)
+            self.code.emit(ADD if sign == "+" else SUBTRACT)
+
+    def visit_AddExpression(self, node):
+        self.visit(node.factors[0])
+        for sign, factor in zip(node.operators, node.factors[1:]):
+            self.visit(factor)
+            if sign == "*":
+                self.code.emit(MULTIPLY)
+            else:
+                self.code.emit(DIVIDE, self._constant(factor.location))
+
+    def visit_Factor(self, node):
+        self.visit(node.value)
+        if node.unary_op == "-":
+            self.code.emit(NEGATE)
+        elif node.unary_op == "!":
+            self.code.emit(NOT)
+
+    def visit_ConstValue(self, node):
+        self.code.emit(LOAD_CONST, self._constant(node.value))
+
+    def visit_Identifier(self, node):
+        self.code.emit(LOAD_NAME, self._constant((node.name, node.location)))
+
+    def visit_Value(self, node):
+        self.visit(node.id_value)
+        for operator in node.steps:
+            self.visit(operator)
+
+    def visit_FieldOperator(self, node):
+        self.code.emit(GET_FIELD, self._constant(node.name))
+
+    def visit_MethodCallOperator(self, node):
+        self.code.emit(GET_METHOD, self._constant(node.field.name))
+        for argument in node.call.arguments:
+            self.visit(argument)
+        self.code.emit(CALL_METHOD, len(node.call.arguments))
+
+    def visit_FunOperator(self, node):
+        for argument in node.arguments:
+            self.visit(argument)
+        self.code.emit(CALL, len(node.arguments))
+
+
+class VirtualMachine(object):
+    """Runs CodeObjects with value stack and list of call frames.
+
+    Calls of user functions don't use Python stack, so depth of recursion
+    is limited only by MAX_CALL_DEPTH.
+    """
+    MAX_CALL_DEPTH = 100000
+
+    def __init__(self, program):
+        self.program = program
+        self.compiler = BytecodeCompiler(program)
+        self.main_code = self.compiler.compile_program()
+
+    def run(self):
+        program = self.program
+        root_context = program.root_context
+        functions = self.compiler.functions
+        constants = self.compiler.constants
+        ReturnValue = FunctionDefinition.ReturnValue
+        max_depth = self.MAX_CALL_DEPTH
+        get_loop_values = ForStatement.get_values
+
+        # instructions are read from lists, indexing them is faster
+        function_code = {x: y.code.tolist() for x, y in functions.items()}
+        code = self.main_code.code.tolist()
+        context = root_context
+        pc = 0
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = []
+
+        while True:
+            opcode = code[pc]
+            argument = code[pc + 1]
+            pc += 2
+
+            if opcode == LOAD_NAME:
+                name, location = constants[argument]
+                owner = context
+                while owner is not None:
+                    value = owner.elements.get(name)
+                    if value is not None:
+                        break
+                    owner = owner.parent
+                else:
+                    value = context.get_definition(name)
+                if value is None:
+                    raise LogoRuntimeError(
+                        f"Trying to access undefined variable (named {name})",
+                        location)
+                push(value)
+            elif opcode == LOAD_CONST:
+                push(constants[argument])
+            elif opcode == STORE_NAME:
+                value = pop()
+                name = constants[argument]
+                if value is None:
+                    raise LogoRuntimeError(
+                        f"Trying to assign None value to {name}")
+                owner = context
+                while owner is not None and name not in owner.elements:
+                    owner = owner.parent
+                if owner is not None and name != "return":
+                    # same as define_element, only function contexts
+                    # between context and owner have definitions (return)
+                    owner.elements[name] = value
+                else:
+                    context.define_element(name, value)
+            elif opcode == ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif opcode == SUBTRACT:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif opcode == MULTIPLY:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif opcode == DIVIDE:
+                right = pop()
+                if right == 0:
+                    raise ZeroDivisionError(
+                        f"Dividing by zero at {constants[argument]}")
+                stack[-1] = stack[-1] / right
+            elif opcode == COMPARE:
+                right = pop()
+                stack[-1] = COMPARE_FUNCTIONS[argument](stack[-1], right)
+            elif opcode == JUMP_IF_FALSE:
+                if not pop():
+                    pc = argument
+            elif opcode == JUMP_IF_TRUE:
+                if pop():
+                    pc = argument
+            elif opcode == JUMP:
+                pc = argument
+            elif opcode == FOR_ITER:
+                values, name = stack[-1]
+                value = next(values, None)
+                if value is None:
+                    pop()
+                    pc = argument
+                else:
+                    context.elements[name] = value
+            elif opcode == FOR_SETUP:
+                step = pop()
+                end = pop()
+                stack[-1] = (get_loop_values(stack[-1], end, step),
+                             constants[argument])
+                context = Context.acquire(context)
+            elif opcode == ENTER_SCOPE:
+                context = Context.acquire(context)
+            elif opcode == EXIT_SCOPE:
+                block_context = context
+                context = context.parent
+                block_context.release()
+            elif opcode == CALL:
+                values = stack[len(stack) - argument:]
+                del stack[len(stack) - argument:]
+                callee = pop()
+                if type(callee) is FunctionDefinition:
+                    if len(values) != len(callee.arguments):
+                        raise LogoRuntimeError(
+                            "Numbers of arguments don't match")
+                    if len(frames) >= max_depth:
+                        raise LogoRuntimeError(
+                            "Maximum depth of function calls exceeded")
+                    memo_key = None
+                    memo = callee.memo
+                    if memo is not None:
+                        key = memo.get_key(values)
+                        if key is not None:
+                            result = memo.get(key)
+                            if result is not MISSING:
+                                push(result)
+                                continue
+                            memo_key = (memo, key)
+                    frames.append((code, pc, context, len(stack), memo_key))
+                    code = function_code[callee]
+                    pc = 0
+                    context = Context(
+                        elements=dict(zip(callee.arguments, values)),
+                        definitions=FUNCTION_DEFINITIONS,
+                        parent_context=root_context)
+                    continue
+                try:
+                    push(callee.execute(values, root_context))
+                    continue
+                except ReturnValue as ret:
+                    # return used other way than return(...) statement,
+                    # values pushed by function before it are dropped
+                    if not frames:
+                        raise
+                    value = ret.args[0]
+                code, pc, context, stack_size, memo_key = frames.pop()
+                del stack[stack_size:]
+                if memo_key is not None:
+                    memo_key[0].put(memo_key[1], value)
+                push(value)
+            elif opcode == RETURN:
+                if argument > 1:
+                    raise LogoRuntimeError(
+                        f"Wrong number of valuse passed to return: {argument}")
+                value = pop() if argument else None
+                code, pc, context, stack_size, memo_key = frames.pop()
+                # drops iterators of loops left by return
+                del stack[stack_size:]
+                if memo_key is not None:
+                    memo_key[0].put(memo_key[1], value)
+                push(value)
+            elif opcode == POP:
+                pop()
+            elif opcode == GET_FIELD:
+                source_element = stack[-1]
+                name = constants[argument]
+                if not isinstance(source_element, BaseObject):
+                    raise LogoRuntimeError(
+                        f"Trying to access field ({name}) of non-object element"
+                    )
+                try:
+                    stack[-1] = source_element.get_field(name)
+                except KeyError:
+                    raise LogoRuntimeError(
+                        f"Tried to access non-existing field ({name}) from {source_element.name}"
+                    )
+            elif opcode == GET_METHOD:
+                # pushes native method and object, or field value and None
+                source_element = stack[-1]
+                if isinstance(source_element, BaseObject):
+                    method = source_element.methods.get(constants[argument])
+                    if method is not None:
+                        stack[-1] = method
+                        push(source_element)
+                        continue
+                name = constants[argument]
+                if not isinstance(source_element, BaseObject):
+                    raise LogoRuntimeError(
+                        f"Trying to access field ({name}) of non-object element"
+                    )
+                try:
+                    stack[-1] = source_element.get_field(name)
+                except KeyError:
+                    raise LogoRuntimeError(
+                        f"Tried to access non-existing field ({name}) from {source_element.name}"
+                    )
+                push(None)
+            elif opcode == CALL_METHOD:
+                values = stack[len(stack) - argument:]
+                del stack[len(stack) - argument:]
+                source_element = pop()
+                method = pop()
+                if source_element is not None:
+                    push(method.call(source_element, values))
+                else:
+                    push(method.execute(values, root_context))
+            elif opcode == NEGATE:
+                stack[-1] = -stack[-1]
+            elif opcode == NOT:
+                stack[-1] = not stack[-1]
+            elif opcode == AND:
+                values = stack[len(stack) - argument:]
+                del stack[len(stack) - argument:]
+                push(all(values))
+            elif opcode == OR:
+                values = stack[len(stack) - argument:]
+                del stack[len(stack) - argument:]
+                push(any(values))
+            elif opcode == STATEMENT:
+                program.current_statement = constants[argument]
+            elif opcode == HALT:
+                return
+            else:
+                raise LogoRuntimeError(f"Unknown opcode: {opcode}")
+
+
+class VirtualMachineEngine(object):
+    "Runs program compiled to bytecode on VirtualMachine"
+
+    def execute(self, program):
+        VirtualMachine(program).run()
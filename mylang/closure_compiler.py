@@ -0,0 +1,498 @@
+import operator
+
+from .base_nodes import BaseObject, get_field
+from .context import RootContext
+from .definition_classes import RETURN_FUNCTION, FunctionDefinition
+from .language_errors import CompilationError, LogoRuntimeError
+from .node_classes import ForStatement, Relation, ReturnSignal
+from .node_visitor import NodeVisitor
+from .resolver import Resolver, get_root_lookup
+
+
+class ClosureCompiler(NodeVisitor):
+    """Compiles AST into tree of Python closures.
+
+    Every node becomes one closure taking frame and returning value of
+    the node. Operators are resolved at compile time, so no dispatch or
+    string comparison is done while program runs. Bodies of user defined
+    functions are compiled the first time they are called.
+
+    Variables of functions and blocks are kept in frames: lists with
+    tuple of outer frames (innermost first) at index 0, followed by slots
+    given by Resolver. So variable from any depth is read with two
+    indexings. Top level statements get None frame, their variables are in
+    root context.
+
+    Statement closures return ReturnSignal after return statement, blocks
+    stop and pass it up to function closure.
+    """
+    ADD_OPERATIONS = {"+": operator.add, "-": operator.sub}
+
+    def __init__(self, root_context: RootContext, resolver: Resolver):
+        self.root_context = root_context
+        self.resolver = resolver
+        self.lookup = get_root_lookup(root_context)
+        self.functions = {}
+        self.scope = None
+
+    def compile_function(self, definition: FunctionDefinition):
+        "returns closure taking list of arguments and returning result"
+        compiled = self.functions.get(definition)
+        if compiled is not None:
+            return compiled
+
+        scope = self.resolver.scopes[definition]
+        outer_scope, self.scope = self.scope, scope
+        body = self.visit(definition.block)
+        self.scope = outer_scope
+        arguments_count = len(definition.arguments)
+        local_slots = [None] * (len(scope.names) - arguments_count)
+        ReturnValue = FunctionDefinition.ReturnValue
+
+        def function(values):
+            if len(values) != arguments_count:
+                raise LogoRuntimeError("Numbers of arguments don't match")
+            try:
+                signal = body([(), *values, *local_slots])
+            except ReturnValue as ret:
+                return ret.args[0]
+            if type(signal) is ReturnSignal:
+                return signal.value
+            return None
+
+        memo = definition.memo
+        if memo is not None:
+            evaluate = function
+
+            def function(values):
+                return memo.call(values, evaluate, values)
+
+        self.functions[definition] = function
+        return function
+
+    def compile_statement(self, statement):
+        "compiles top level statement"
+        self.scope = None
+        return self.visit(statement)
+
+    def visit_Block(self, node):
+        statements = tuple(self.visit(x) for x in node.statements)
+        if len(statements) == 1:
+            return statements[0]
+
+        def block(frame):
+            for statement in statements:
+                result = statement(frame)
+                if type(result) is ReturnSignal:
+                    return result
+            return None
+
+        return block
+
+    def visit_ValueAssignment(self, node):
+        name = node.name
+        expression = self.visit(node.expression)
+        root_context = self.root_context
+        none_message = f"Trying to assign None value to {name}"
+
+        if self.scope is None:
+
+            def assignment(frame):
+                value = expression(frame)
+                if value is None:
+                    raise LogoRuntimeError(none_message)
+                root_context.define_element(name, value)
+        elif self.scope.is_function and name == "return":
+            # function context has definition of return
+
+            def assignment(frame):
+                if expression(frame) is None:
+                    raise LogoRuntimeError(none_message)
+                raise LogoRuntimeError("Redefinition of element")
+        else:
+            # like Context.define_element: innermost defined variable is
+            # changed, if there is none, root one or new local variable
+            slots = tuple((depth, slot + 1)
+                          for depth, slot in self.resolver.slots[node])
+            own_index = slots[0][1]
+            outer_slots = slots[1:]
+
+            def assignment(frame):
+                value = expression(frame)
+                if value is None:
+                    raise LogoRuntimeError(none_message)
+                if frame[own_index] is not None:
+                    frame[own_index] = value
+                    return
+                for depth, index in outer_slots:
+                    outer_frame = frame[0][depth - 1]
+                    if outer_frame[index] is not None:
+                        outer_frame[index] = value
+                        return
+                if root_context.get_element(name) is not None:
+                    root_context.define_element(name, value)
+                else:
+                    frame[own_index] = value
+
+        return assignment
+
+    def visit_IfStatement(self, node):
+        condition = self.visit(node.condition)
+        outer_scope = self.scope
+        scope = self.resolver.scopes.get(node)
+        if scope is not None:
+            self.scope = scope
+        true_block = self.visit(node.true_block)
+        false_block = self.visit(node.false_block) if node.false_block else None
+        self.scope = outer_scope
+
+        if scope is None:
+            # blocks don't define variables, they use enclosing frame
+
+            def if_statement(frame):
+                if condition(frame):
+                    return true_block(frame)
+                elif false_block:
+                    return false_block(frame)
+                return None
+        else:
+            new_frame = self._frame_constructor(scope)
+
+            def if_statement(frame):
+                if condition(frame):
+                    return true_block(new_frame(frame))
+                elif false_block:
+                    return false_block(new_frame(frame))
+                return None
+
+        return if_statement
+
+    def visit_WhileStatement(self, node):
+        outer_scope = self.scope
+        scope = self.resolver.scopes.get(node)
+        if scope is not None:
+            self.scope = scope
+        condition = self.visit(node.condition)
+        block = self.visit(node.block)
+        self.scope = outer_scope
+
+        if scope is None:
+
+            def while_statement(frame):
+                while condition(frame):
+                    result = block(frame)
+                    if type(result) is ReturnSignal:
+                        return result
+                return None
+        else:
+            new_frame = self._frame_constructor(scope)
+
+            def while_statement(frame):
+                while_frame = new_frame(frame)
+                while condition(while_frame):
+                    result = block(while_frame)
+                    if type(result) is ReturnSignal:
+                        return result
+                return None
+
+        return while_statement
+
+    def visit_ForStatement(self, node):
+        start = self.visit(node.start)
+        end = self.visit(node.end)
+        step = self.visit(node.step)
+        scope = self.resolver.scopes[node]
+        new_frame = self._frame_constructor(scope)
+        counter_index = scope.slots[node.variable] + 1
+        outer_scope, self.scope = self.scope, scope
+        block = self.visit(node.block)
+        self.scope = outer_scope
+        get_values = ForStatement.get_values
+
+        def for_statement(frame):
+            values = get_values(start(frame), end(frame), step(frame))
+            loop_frame = new_frame(frame)
+            for value in values:
+                loop_frame[counter_index] = value
+                result = block(loop_frame)
+                if type(result) is ReturnSignal:
+                    return result
+            return None
+
+        return for_statement
+
+    def visit_ReturnStatement(self, node):
+        call = self.visit(node.call)
+        target = self.visit(node.call.id_value)
+        arguments = tuple(self.visit(x) for x in node.arguments)
+        count = len(arguments)
+
+        def return_statement(frame):
+            if target(frame) is not RETURN_FUNCTION:
+                # return is shadowed by variable
+                call(frame)
+                return None
+            if count == 1:
+                return ReturnSignal(arguments[0](frame))
+            if count:
+                for argument in arguments:
+                    argument(frame)
+                raise LogoRuntimeError(
+                    f"Wrong number of valuse passed to return: {count}")
+            return ReturnSignal(None)
+
+        return return_statement
+
+    def _frame_constructor(self, scope):
+        "returns function creating frame of block inside current scope"
+        slots = [None] * len(scope.names)
+        if self.scope is None:
+            return lambda frame: [(), *slots]
+        return lambda frame: [(frame, *frame[0]), *slots]
+
+    def visit_LogicalExpression(self, node):
+        # all conditions are evaluated (no short-circuit) like in AST
+        conditions = tuple(self.visit(x) for x in node.and_conditions)
+        if len(conditions) == 2:
+            first, second = conditions
+
+            def logical_expression(frame):
+                left = first(frame)
+                right = second(frame)
+                return bool(left) or bool(right)
+        else:
+
+            def logical_expression(frame):
+                return not all([not x(frame) for x in conditions])
+
+        return logical_expression
+
+    def visit_AndCondition(self, node):
+        relations = tuple(self.visit(x) for x in node.relations)
+        if len(relations) == 2:
+            first, second = relations
+
+            def and_condition(frame):
+                left = first(frame)
+                right = second(frame)
+                return bool(left) and bool(right)
+        else:
+
+            def and_condition(frame):
+                return all([x(frame) for x in relations])
+
+        return and_condition
+
+    def visit_Relation(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        compare = Relation.COMP_OPERATIONS[node.comp_sign]
+
+        def relation(frame):
+            return compare(left(frame), right(frame))
+
+        return relation
+
+    def visit_MathExpression(self, node):
+        expressions = [self.visit(x) for x in node.add_expressions]
+        operations = [self.ADD_OPERATIONS[x] for x in node.operators]
+        first = expressions[0]
+        if len(operations) == 1:
+            second = expressions[1]
+            operation = operations[0]
+
+            def math_expression(frame):
+                return operation(first(frame), second(frame))
+        else:
+            rest = tuple(zip(operations, expressions[1:]))
+
+            def math_expression(frame):
+                result = first(frame)
+                for operation, expression in rest:
+                    result = operation(result, expression(frame))
+                return result
+
+        return math_expression
+
+    def visit_AddExpression(self, node):
+        factors = [self.visit(x) for x in node.factors]
+        first = factors[0]
+        steps = []
+        for operator_sign, factor, factor_node in zip(node.operators,
+                                                       factors[1:],
+                                                       node.factors[1:]):
+            if operator_sign == "*":
+                steps.append(factor)
+            else:
+                steps.append(self._compile_division(factor, factor_node))
+
+        if len(steps) == 1:
+            step = steps[0]
+            if node.operators[0] == "*":
+
+                def add_expression(frame):
+                    return first(frame) * step(frame)
+            else:
+
+                def add_expression(frame):
+                    return step(first(frame), frame)
+        else:
+            steps = tuple(zip(node.operators, steps))
+
+            def add_expression(frame):
+                result = first(frame)
+                for operator_sign, step in steps:
+                    if operator_sign == "*":
+                        result = result * step(frame)
+                    else:
+                        result = step(result, frame)
+                return result
+
+        return add_expression
+
+    @staticmethod
+    def _compile_division(factor, factor_node):
+        location = factor_node.location
+
+        def division(dividend, frame):
+            divisor = factor(frame)
+            if divisor == 0:
+                raise ZeroDivisionError(f"Dividing by zero at {location}")
+            return dividend / divisor
+
+        return division
+
+    def visit_Factor(self, node):
+        value = self.visit(node.value)
+        if node.unary_op == "-":
+            return lambda frame: -value(frame)
+        if node.unary_op == "!":
+            return lambda frame: not value(frame)
+        return value
+
+    def visit_ConstValue(self, node):
+        value = node.value
+        return lambda frame: value
+
+    def visit_Identifier(self, node):
+        name = node.name
+        location = node.location
+        slots = tuple((depth, slot + 1)
+                      for depth, slot in self.resolver.slots.get(node, ()))
+        if not slots and name in self.root_context.definitions:
+            # root context can't have element named like definition
+            definition = self.root_context.definitions[name]
+            return lambda frame: definition
+
+        lookup = self.lookup
+        in_function = self.scope is not None
+        if not slots:
+            return lambda frame: lookup(name, location, in_function)
+
+        if len(slots) == 1:
+            depth, index = slots[0]
+            if depth == 0:
+
+                def identifier(frame):
+                    value = frame[index]
+                    if value is None:
+                        return lookup(name, location, in_function)
+                    return value
+            else:
+                depth -= 1
+
+                def identifier(frame):
+                    value = frame[0][depth][index]
+                    if value is None:
+                        return lookup(name, location, in_function)
+                    return value
+        else:
+
+            def identifier(frame):
+                for depth, index in slots:
+                    value = (frame[0][depth - 1] if depth else frame)[index]
+                    if value is not None:
+                        return value
+                return lookup(name, location, in_function)
+
+        return identifier
+
+    def visit_Value(self, node):
+        result = self.visit(node.id_value)
+        for operator_node in node.steps:
+            result = self.visit(operator_node, result)
+        return result
+
+    def visit_MethodCallOperator(self, node, source):
+        name = node.field.name
+        arguments = tuple(self.visit(x) for x in node.call.arguments)
+        call = self._get_caller()
+
+        def method_call(frame):
+            source_element = source(frame)
+            if isinstance(source_element, BaseObject):
+                method = source_element.methods.get(name)
+                if method is not None:
+                    return method.call(source_element,
+                                       [x(frame) for x in arguments])
+            # field isn't native method, it's called as function value
+            field = get_field(source_element, name)
+            return call(field, [x(frame) for x in arguments])
+
+        return method_call
+
+    def visit_FieldOperator(self, node, source):
+        name = node.name
+        return lambda frame: get_field(source(frame), name)
+
+    def visit_FunOperator(self, node, source):
+        arguments = tuple(self.visit(x) for x in node.arguments)
+        functions = self.functions
+        compile_function = self.compile_function
+        root_context = self.root_context
+
+        def fun_operator(frame):
+            source_element = source(frame)
+            values = [x(frame) for x in arguments]
+            if type(source_element) is FunctionDefinition:
+                function = functions.get(source_element)
+                if function is None:
+                    function = compile_function(source_element)
+                return function(values)
+            return source_element.execute(values, root_context)
+
+        return fun_operator
+
+    def _get_caller(self):
+        "returns function calling function value with list of values"
+        functions = self.functions
+        compile_function = self.compile_function
+        root_context = self.root_context
+
+        def call(source_element, values):
+            if type(source_element) is FunctionDefinition:
+                function = functions.get(source_element)
+                if function is None:
+                    function = compile_function(source_element)
+                return function(values)
+            return source_element.execute(values, root_context)
+
+        return call
+
+
+class ClosureEngine(object):
+    "Runs program compiled with ClosureCompiler"
+
+    def execute(self, program):
+        try:
+            resolver = Resolver().resolve(program)
+            compiler = ClosureCompiler(program.root_context, resolver)
+            compiled = [(x, compiler.compile_statement(x))
+                        for x in program.statements]
+        except RecursionError as err:
+            raise CompilationError(
+                "Program is too deeply nested to be compiled to closures"
+            ) from err
+        for statement, closure in compiled:
+            program.current_statement = statement
+            closure(None)
@@ -3,11 +3,20 @@ from .language_errors import LogoRuntimeError
 
 
 class Context:
+    # number of released contexts of blocks kept for reuse by acquire
+    POOL_SIZE = 64
+
     def __init__(self,
                  definitions: dict = None,
                  elements: dict = None,
                  parent_context=None):
         self.parent = parent_context
+        # released contexts, shared by contexts of one root context, so
+        # they don't move between programs (or threads running them)
+        if parent_context is None:
+            self.pool = []
+        else:
+            self.pool = parent_context.pool
 
         if definitions:
             self.definitions = definitions
@@ -19,7 +28,27 @@ class Context:
         else:
             self.elements = {}
 
-        self.log = get_global_logger()
+    @property
+    def log(self):
+        return get_global_logger()
+
+    @staticmethod
+    def acquire(parent_context):
+        """Returns empty context for block, reusing one released in the
+        same root context if possible."""
+        if parent_context.pool:
+            context = parent_context.pool.pop()
+            context.parent = parent_context
+            return context
+        return Context(parent_context=parent_context)
+
+    def release(self):
+        """Returns context taken by acquire to pool, it can't be used
+        after that."""
+        self.elements.clear()
+        self.parent = None
+        if len(self.pool) < self.POOL_SIZE:
+            self.pool.append(self)
 
     def define_element(self, name, value):
         """define new element or redefine old one
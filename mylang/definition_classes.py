@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 from .base_nodes import BaseFunctionDefinition
 from .shared import Location
 from .context import Context, RootContext
@@ -45,21 +47,41 @@ class FunctionDefinition(BaseFunctionDefinition):
         ret += self.block.__str__(depth + 1)
         return ret
 
+    # FunctionMemo of pure function, set by Memoizer during execution
+    memo = None
+
     def execute(self, values, root_context: RootContext):
+        memo = self.memo
+        memo_key = None
+        if memo is not None:
+            memo_key = memo.get_key(values)
+            if memo_key is not None:
+                result = memo.get(memo_key)
+                if result is not memo.MISSING:
+                    return result
+
         passed_arguments = {}
         if len(values) != len(self.arguments):
             raise LogoRuntimeError("Numbers of arguments don't match")
         for name, value in zip(self.arguments, values):
             passed_arguments[name] = value
 
-        definitions = {"return": FunctionDefinition.ReturnFunction()}
         new_context = Context(elements=passed_arguments,
-                              definitions=definitions,
+                              definitions=FUNCTION_DEFINITIONS,
                               parent_context=root_context)
 
-        result = None
+        # return statements give ReturnSignal, ReturnValue is raised only
+        # when return function is called inside expression
         try:
-            self.block.evaluate(new_context)
+            signal = self.block.evaluate(new_context)
+            result = None if signal is None else signal.value
         except FunctionDefinition.ReturnValue as ret:
             result = ret.args[0]
+        if memo_key is not None:
+            memo.put(memo_key, result)
         return result
+
+
+# return function doesn't keep state, so all calls share it
+RETURN_FUNCTION = FunctionDefinition.ReturnFunction()
+FUNCTION_DEFINITIONS = MappingProxyType({"return": RETURN_FUNCTION})
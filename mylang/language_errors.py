@@ -25,3 +25,8 @@ class LogoSyntaxError(BaseLanguageException):
 class LogoRuntimeError(BaseLanguageException):
     def __init__(self, message, location: Location = None):
         super().__init__(message, location)
+
+
+class CompilationError(Exception):
+    """Raised by engine which compiles whole program before running it, when
+    program can't be compiled (it's too deeply nested), nothing is run yet"""
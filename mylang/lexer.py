@@ -1,10 +1,12 @@
+import re
+
 from .shared import ConsoleLogger, Token, TokenType, Location
 from .language_errors import UnexpectedCharacterError, ParseError
 from .text_reader import TextReader
 
 
 class Lexer():
-    RESTRICTED_WORDS = ["fun", "if", "while", "else"]
+    RESTRICTED_WORDS = ["fun", "if", "while", "else", "for", "repeat"]
 
     # One or two-character tokens
     SHORT_TOKENS = {
@@ -42,10 +44,12 @@ class Lexer():
         if self._get_char() == "=" else Token(TokenType.UNARY_OPERATOR, "!"),
         "|":
         lambda self: Token(TokenType.OR_OPERATOR, "||") if self._get_char(
-        ) == "|" else Lexer._raise_error(UnexpectedCharacterError),
+        ) == "|" else Lexer._raise_error(
+            UnexpectedCharacterError("Unexpected character after |")),
         "&":
         lambda self: Token(TokenType.AND_OPERATOR, "&&") if self._get_char() ==
-        "&" else Lexer._raise_error(UnexpectedCharacterError),
+        "&" else Lexer._raise_error(
+            UnexpectedCharacterError("Unexpected character after &")),
     }
 
     RESTRICTED_IDENTIFIERS = {
@@ -53,6 +57,8 @@ class Lexer():
         "while": lambda: Token(TokenType.WHILE, "while"),
         "if": lambda: Token(TokenType.IF, "if"),
         "else": lambda: Token(TokenType.ELSE, "else"),
+        "for": lambda: Token(TokenType.FOR, "for"),
+        "repeat": lambda: Token(TokenType.REPEAT, "repeat"),
     }
 
     def __init__(self, source: TextReader, logger=ConsoleLogger()):
@@ -174,3 +180,165 @@ class Lexer():
     @staticmethod
     def _raise_error(error):
         raise error
+
+
+class ScanningLexer():
+    """Lexer working on the whole source buffer at once.
+
+    Produces the same stream of tokens (with the same locations) as Lexer,
+    but instead of pulling single characters from the reader it matches
+    precompiled regular expressions directly on TextReader.get_text().
+    """
+    SPACES = re.compile(r"\s*")
+    TOKEN = re.compile(
+        r"""
+        (?P<identifier>[^\W\d_]\w*)
+      | (?P<number>\d+(?:\.\d+)?)
+      | (?P<operator><=|>=|==|!=|\|\||&&|[-+*/{}().,<>=!])
+      | (?P<string>"[^"\\]*(?:\\.[^"\\]*)*")
+        """, re.VERBOSE | re.DOTALL)
+
+    OPERATORS = {
+        "+": TokenType.ADD_OPERATOR,
+        "-": TokenType.ADD_OPERATOR,
+        "*": TokenType.MULT_OPERATOR,
+        "/": TokenType.MULT_OPERATOR,
+        "{": TokenType.OPEN_BLOCK,
+        "}": TokenType.CLOSE_BLOCK,
+        "(": TokenType.OPEN_PAREN,
+        ")": TokenType.CLOSE_PAREN,
+        ".": TokenType.FIELD_OPERATOR,
+        ",": TokenType.COMMA,
+        "<": TokenType.COMP_OPERATOR,
+        ">": TokenType.COMP_OPERATOR,
+        "<=": TokenType.COMP_OPERATOR,
+        ">=": TokenType.COMP_OPERATOR,
+        "==": TokenType.COMP_OPERATOR,
+        "!=": TokenType.COMP_OPERATOR,
+        "=": TokenType.ASSIGNMENT_OPERATOR,
+        "!": TokenType.UNARY_OPERATOR,
+        "||": TokenType.OR_OPERATOR,
+        "&&": TokenType.AND_OPERATOR,
+    }
+
+    RESTRICTED_IDENTIFIERS = {
+        "fun": TokenType.FUN,
+        "while": TokenType.WHILE,
+        "if": TokenType.IF,
+        "else": TokenType.ELSE,
+        "for": TokenType.FOR,
+        "repeat": TokenType.REPEAT,
+    }
+
+    def __init__(self, source: TextReader, logger=ConsoleLogger()):
+        self.source = source
+        self.logger = logger
+        self.current_location = Location(0, 0)
+        self._scanner = self.scan()
+
+    def get_token(self) -> Token:
+        token_type, value, line, char_number = next(self._scanner)
+        self.current_location = Location(line, char_number)
+        return Token(token_type, value, self.current_location)
+
+    def scan(self):
+        """Generator of (token_type, value, line, char_number) tuples.
+
+        After the end of source it keeps yielding EOF tokens placed
+        at the location of the last token (same as Lexer does).
+        """
+        text = self.source.get_text()
+        # Lexer treats 0x00 as the end of input
+        end = text.find("\0")
+        if end < 0:
+            end = len(text)
+
+        match_spaces = self.SPACES.match
+        match_token = self.TOKEN.match
+        operators = self.OPERATORS
+        restricted = self.RESTRICTED_IDENTIFIERS
+        identifier_type = TokenType.IDENTIFIER
+        const_type = TokenType.CONST
+
+        position = 0
+        line = 0
+        line_start = 0
+        # location of the last token, given also to EOF
+        token_line = 0
+        char_number = 0
+        while True:
+            spaces_end = match_spaces(text, position, end).end()
+            if spaces_end != position:
+                newlines = text.count("\n", position, spaces_end)
+                if newlines:
+                    line += newlines
+                    line_start = text.rfind("\n", position, spaces_end) + 1
+                position = spaces_end
+            if position >= end:
+                break
+
+            token_line = line
+            char_number = position - line_start
+            match = match_token(text, position, end)
+            if match is None:
+                self._raise_unexpected(text, position, end,
+                                       Location(line, char_number))
+            kind = match.lastgroup
+            value = match.group()
+            position = match.end()
+
+            if kind == "identifier":
+                yield restricted.get(value,
+                                     identifier_type), value, line, char_number
+            elif kind == "operator":
+                yield operators[value], value, line, char_number
+            elif kind == "number":
+                yield const_type, self._parse_number(
+                    value, text, position, end,
+                    Location(line, char_number)), line, char_number
+            else:
+                newlines = value.count("\n")
+                yield const_type, value[1:-1], line, char_number
+                if newlines:
+                    line += newlines
+                    line_start = text.rfind("\n", 0, position) + 1
+
+        while True:
+            yield TokenType.EOF, "", token_line, char_number
+
+    @staticmethod
+    def _parse_number(value_text, text, position, end, location):
+        if len(value_text) > 1 and value_text[0] == "0" and value_text[1] != ".":
+            raise ParseError("Not allowed number format (0xx)", location)
+        next_char = text[position] if position < end else "\0"
+
+        whole, _, fraction = value_text.partition(".")
+        if not fraction and next_char == ".":
+            raise ParseError("Non-digit after dot in number", location)
+        if next_char.isalpha():
+            raise UnexpectedCharacterError(
+                "Number shouldn't contain any letters.", location)
+
+        value = float(int(whole))
+        if fraction:
+            # same arithmetic as in Lexer, so both return identical floats
+            value = value + float(int(fraction)) / 10**len(fraction)
+        return value
+
+    @staticmethod
+    def _raise_unexpected(text, position, end, location):
+        char = text[position]
+        if char == '"':
+            raise EOFError(
+                f'Unexpected EOF during string parse: {text[position:end]}')
+        if char in "|&":
+            raise UnexpectedCharacterError(
+                f"Unexpected character after {char}", location)
+        raise UnexpectedCharacterError(
+            f"Unknown token, unexpected first character: {char}", location)
+
+
+LEXERS = {
+    "classic": Lexer,
+    "scanning": ScanningLexer,
+}
@@ -0,0 +1,239 @@
+from collections import OrderedDict
+
+from .definition_classes import FunctionDefinition
+from .node_classes import FieldOperator
+from .node_visitor import NodeVisitor
+from .optimizer import CONSTANT_NAMES, assigned_names
+
+# result of FunctionMemo.get when values aren't cached
+MISSING = object()
+
+
+class PurityAnalyzer(NodeVisitor):
+    """Finds user functions which results depend only on their arguments.
+
+    Function is pure if it:
+    - doesn't access fields (turtles and other objects),
+    - doesn't use root variables or definitions other than True, False
+      and pure functions (so no print, println or Turtle),
+    - doesn't assign variables which may be root ones.
+    Recursive functions are pure if all functions they use are.
+    """
+    def __init__(self, program):
+        self.program = program
+        # every variable of root context is assigned by top level statement,
+        # counters of loops are in contexts of loops
+        self.root_names = assigned_names(program.statements,
+                                         loop_counters=False)
+        self.functions = {x.name: x for x in program.definitions}
+        self.local_names = set()
+        self.used_functions = set()
+        self.is_pure = True
+
+    def analyze(self) -> set:
+        "returns set of pure FunctionDefinitions"
+        dependencies = {}
+        for definition in self.program.definitions:
+            if self._analyze_function(definition):
+                dependencies[definition] = self.used_functions
+
+        # functions using impure ones are impure too
+        pure = set(dependencies)
+        changed = True
+        while changed:
+            changed = False
+            for definition in list(pure):
+                if not dependencies[definition] <= pure:
+                    pure.discard(definition)
+                    changed = True
+        return pure
+
+    def _analyze_function(self, definition: FunctionDefinition) -> bool:
+        assigned = assigned_names(definition.block, loop_counters=False)
+        self.local_names = set(definition.arguments)
+        self.local_names |= assigned - self.root_names
+        self.used_functions = set()
+        self.is_pure = not (assigned & self.root_names)
+        self.visit(definition.block)
+        return self.is_pure
+
+    def visit_Block(self, node):
+        for statement in node.statements:
+            self.visit(statement)
+
+    def visit_ValueAssignment(self, node):
+        self.visit(node.expression)
+
+    def visit_IfStatement(self, node):
+        self.visit(node.condition)
+        self.visit(node.true_block)
+        if node.false_block:
+            self.visit(node.false_block)
+
+    def visit_WhileStatement(self, node):
+        self.visit(node.condition)
+        self.visit(node.block)
+
+    def visit_ForStatement(self, node):
+        self.visit(node.start)
+        self.visit(node.end)
+        self.visit(node.step)
+        # counter is local only inside the loop
+        outer_names = self.local_names
+        self.local_names = outer_names | {node.variable}
+        self.visit(node.block)
+        self.local_names = outer_names
+
+    def visit_ReturnStatement(self, node):
+        self.visit(node.call)
+
+    def visit_LogicalExpression(self, node):
+        for condition in node.and_conditions:
+            self.visit(condition)
+
+    def visit_AndCondition(self, node):
+        for relation in node.relations:
+            self.visit(relation)
+
+    def visit_Relation(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_MathExpression(self, node):
+        for expression in node.add_expressions:
+            self.visit(expression)
+
+    def visit_AddExpression(self, node):
+        for factor in node.factors:
+            self.visit(factor)
+
+    def visit_Factor(self, node):
+        self.visit(node.value)
+
+    def visit_ConstValue(self, node):
+        pass
+
+    def visit_Identifier(self, node):
+        name = node.name
+        if name in self.local_names:
+            return
+        if name == "return" or name in CONSTANT_NAMES:
+            if name in self.root_names:
+                self.is_pure = False
+            return
+        function = self.functions.get(name)
+        if function is None:
+            self.is_pure = False
+        else:
+            self.used_functions.add(function)
+
+    def visit_Value(self, node):
+        self.visit(node.id_value)
+        for operator in node.operators:
+            if isinstance(operator, FieldOperator):
+                self.is_pure = False
+            else:
+                for argument in operator.arguments:
+                    self.visit(argument)
+
+
+class FunctionMemo(object):
+    """Bounded LRU cache of results of one pure function.
+
+    Only calls with numbers and strings as arguments are cached, other
+    calls are counted as skipped.
+    """
+    KEY_TYPES = (float, str)
+    MISSING = MISSING
+
+    def __init__(self, name: str, max_size: int = 1024):
+        self.name = name
+        self.max_size = max_size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def get_key(self, values) -> tuple:
+        "returns key of arguments or None if they can't be cached"
+        for value in values:
+            if type(value) not in self.KEY_TYPES:
+                # bool isn't accepted, True would be equal to 1
+                self.skipped += 1
+                return None
+        return tuple(values)
+
+    def get(self, key: tuple):
+        result = self.results.get(key, MISSING)
+        if result is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key: tuple, result):
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def call(self, values, function, *arguments):
+        "returns function(*arguments), cached by values"
+        key = self.get_key(values)
+        if key is None:
+            return function(*arguments)
+        result = self.get(key)
+        if result is MISSING:
+            result = function(*arguments)
+            self.put(key, result)
+        return result
+
+    def get_stats(self) -> dict:
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "entries": len(self.results),
+            "hit_rate": self.hits / calls if calls else 0.0,
+        }
+
+
+class Memoizer(object):
+    """Memoizes pure functions of program while it's executed.
+
+    attach() sets memo attribute of pure FunctionDefinitions, engines use
+    it when calling them. detach() removes it, statistics are kept.
+    """
+    def __init__(self, program, max_size: int = 1024):
+        self.program = program
+        pure = PurityAnalyzer(program).analyze()
+        self.memos = {
+            x: FunctionMemo(x.name, max_size)
+            for x in program.definitions if x in pure
+        }
+
+    def attach(self):
+        for definition, memo in self.memos.items():
+            definition.memo = memo
+
+    def detach(self):
+        for definition in self.memos:
+            definition.memo = None
+
+    def get_stats(self) -> dict:
+        return {
+            x.name: memo.get_stats()
+            for x, memo in self.memos.items()
+        }
+
+    def report(self) -> str:
+        if not self.memos:
+            return "Memoization: no pure functions"
+        lines = ["Memoization:"]
+        for name, stats in self.get_stats().items():
+            lines.append(f"  {name}: {stats['hits']} hits, "
+                         f"{stats['misses']} misses, "
+                         f"{stats['skipped']} skipped "
+                         f"({100 * stats['hit_rate']:.1f}% hit rate)")
+        return "\n".join(lines)
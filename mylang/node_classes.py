@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import math
+import operator
+
 from .base_nodes import BaseFunctionDefinition, Statement, Expression, BaseObject, BaseValue
 from .shared import Location
 from .context import Context
@@ -145,6 +148,15 @@ class LogicalExpression(BaseLogicalExpression):
 
 
 class Relation(BaseLogicalExpression):
+    COMP_OPERATIONS = {
+        "==": operator.eq,
+        "!=": operator.ne,
+        ">=": operator.ge,
+        "<=": operator.le,
+        ">": operator.gt,
+        "<": operator.lt,
+    }
+
     def __init__(self, left: MathExpression, right: MathExpression, comp_sign):
         super().__init__(left.location)
         self.left = left
@@ -158,16 +170,9 @@ class Relation(BaseLogicalExpression):
         return res
 
     def evaluate(self, context: Context):
-        COMP_OPERATIONS = {
-            "==": lambda l, r: l == r,
-            ">=": lambda l, r: l >= r,
-            "<=": lambda l, r: l <= r,
-            ">": lambda l, r: l > r,
-            "<": lambda l, r: l < r,
-        }
         left = self.left.evaluate(context)
         right = self.right.evaluate(context)
-        return COMP_OPERATIONS[self.comp_sign](left, right)
+        return self.COMP_OPERATIONS[self.comp_sign](left, right)
 
 
 class AndCondition(BaseLogicalExpression):
@@ -240,6 +245,23 @@ class Identifier(BaseValue):
         return result
 
 
+class MethodCallOperator:
+    """Field operator followed by function operator (obj.m(...)), calls
+    native method without creating field value."""
+    def __init__(self, field: FieldOperator, call: FunOperator):
+        self.field = field
+        self.call = call
+
+    def evaluate(self, context: Context, source_element: BaseObject):
+        if isinstance(source_element, BaseObject):
+            method = source_element.methods.get(self.field.name)
+            if method is not None:
+                values = [x.evaluate(context) for x in self.call.arguments]
+                return method.call(source_element, values)
+        field = self.field.evaluate(context, source_element)
+        return self.call.evaluate(context, field)
+
+
 class Value(BaseValue):
     def __init__(self, id_value: Identifier, operators=None):
         super().__init__(id_value.location)
@@ -248,6 +270,19 @@ class Value(BaseValue):
             self.operators = operators
         else:
             self.operators = []
+        self.steps = self._fuse_method_calls(self.operators)
+
+    @staticmethod
+    def _fuse_method_calls(operators: list) -> list:
+        "returns operators with obj.m(...) replaced by MethodCallOperator"
+        steps = []
+        for operator in operators:
+            if (isinstance(operator, FunOperator) and steps
+                    and isinstance(steps[-1], FieldOperator)):
+                steps[-1] = MethodCallOperator(steps[-1], operator)
+            else:
+                steps.append(operator)
+        return steps
 
     def __str__(self, depth=0):
         res = ""
@@ -260,7 +295,7 @@ class Value(BaseValue):
     def evaluate(self, context: Context):
         result = self.id_value.evaluate(context)
 
-        for operator in self.operators:
+        for operator in self.steps:
             result = operator.evaluate(context, result)
 
         return result
@@ -278,9 +313,57 @@ class ConstValue(BaseValue):
         return self.value
 
 
+class ReturnSignal(object):
+    "result of executed return statement, passed up by blocks to function"
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class ReturnStatement(Statement):
+    """Statement return(...) in function body.
+
+    Unlike calling return function (raising ReturnValue) it returns
+    ReturnSignal, so function returns without exception. If variable named
+    return is defined, it's called like in any other statement.
+    """
+    def __init__(self, call: Value):
+        super().__init__(call.location)
+        self.call = call
+
+    @property
+    def arguments(self) -> list:
+        return self.call.operators[0].arguments
+
+    def __str__(self, depth=0):
+        return self.call.__str__(depth)
+
+    def evaluate(self, context: Context):
+        if context.get_element("return") is not None:
+            self.call.evaluate(context)
+            return None
+        arguments = self.call.operators[0].arguments
+        if len(arguments) == 1:
+            return ReturnSignal(arguments[0].evaluate(context))
+        if arguments:
+            for argument in arguments:
+                argument.evaluate(context)
+            raise LogoRuntimeError(
+                f"Wrong number of valuse passed to return: {len(arguments)}")
+        return ReturnSignal(None)
+
+
 class Block(object):
     def __init__(self, statements: list):
         self.statements = statements
+        self.update_defines_variables()
+
+    def update_defines_variables(self):
+        """Block without direct assignments doesn't need own context, must
+        be called after changing statements."""
+        self.defines_variables = any(
+            isinstance(x, ValueAssignment) for x in self.statements)
 
     def __str__(self, depth=0):
         res = depth * "\t" + "BLOCK\n"
@@ -289,8 +372,11 @@ class Block(object):
         return res
 
     def evaluate(self, context: Context):
+        "returns ReturnSignal if return statement was executed"
         for statement in self.statements:
-            statement.evaluate(context)
+            result = statement.evaluate(context)
+            if type(result) is ReturnSignal:
+                return result
 
 
 class IfStatement(Statement):
@@ -316,11 +402,16 @@ class IfStatement(Statement):
 
     def evaluate(self, context: Context):
         cond_value = self.condition.evaluate(context)
-        if_context = Context(parent_context=context)
-        if (cond_value):
-            self.true_block.evaluate(if_context)
-        elif self.false_block:
-            self.false_block.evaluate(if_context)
+        block = self.true_block if cond_value else self.false_block
+        if block is None:
+            return None
+        if not block.defines_variables:
+            return block.evaluate(context)
+        if_context = Context.acquire(context)
+        try:
+            return block.evaluate(if_context)
+        finally:
+            if_context.release()
 
 
 class WhileStatement(Statement):
@@ -338,7 +429,75 @@ class WhileStatement(Statement):
 
     def evaluate(self, context: Context):
         cond_value = self.condition.evaluate(context)
-        while_context = Context(parent_context=context)
-        while cond_value:
-            self.block.evaluate(while_context)
-            cond_value = self.condition.evaluate(while_context)
+        if not self.block.defines_variables:
+            while cond_value:
+                if (signal := self.block.evaluate(context)) is not None:
+                    return signal
+                cond_value = self.condition.evaluate(context)
+            return None
+        while_context = Context.acquire(context)
+        try:
+            while cond_value:
+                if (signal := self.block.evaluate(while_context)) is not None:
+                    return signal
+                cond_value = self.condition.evaluate(while_context)
+        finally:
+            while_context.release()
+
+
+class ForStatement(Statement):
+    """Counted loop: for (counter, start, end, step) and repeat(n).
+
+    Counter takes values start + k * step not passing end (end included),
+    it's kept in context of the loop and can't be assigned. Bounds are
+    evaluated once, before the loop. repeat(n) is loop with counter
+    repcount going from 1 to n.
+    """
+    REPEAT_COUNTER = "repcount"
+
+    def __init__(self, loc: Location, variable: str, start: Expression,
+                 end: Expression, step: Expression, block: Block):
+        super().__init__(loc)
+        self.variable = variable
+        self.start = start
+        self.end = end
+        self.step = step
+        self.block = block
+
+    def __str__(self, depth=0):
+        ret = "\t" * depth + f"For {self.variable}:\n"
+        ret += self.start.__str__(depth + 1)
+        ret += self.end.__str__(depth + 1)
+        ret += self.step.__str__(depth + 1)
+        ret += self.block.__str__(depth + 1)
+        return ret
+
+    @staticmethod
+    def get_values(start, end, step):
+        "returns iterator of counter values, checking bounds"
+        for value in (start, end, step):
+            if type(value) not in (float, int):
+                raise LogoRuntimeError(
+                    f"Bounds of loop must be numbers, not {value}")
+        if step == 0:
+            raise LogoRuntimeError("Step of loop can't be zero")
+        start = float(start)
+        step = float(step)
+        count = max(math.floor((end - start) / step) + 1, 0)
+        return (start + x * step for x in range(count))
+
+    def evaluate(self, context: Context):
+        values = self.get_values(self.start.evaluate(context),
+                                 self.end.evaluate(context),
+                                 self.step.evaluate(context))
+        name = self.variable
+        block = self.block
+        loop_context = Context.acquire(context)
+        elements = loop_context.elements
+        try:
+            for value in values:
+                elements[name] = value
+                if (signal := block.evaluate(loop_context)) is not None:
+                    return signal
+        finally:
+            loop_context.release()
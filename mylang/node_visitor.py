@@ -0,0 +1,26 @@
+class NodeVisitor(object):
+    """Base class of passes working on AST.
+
+    visit(node) calls method visit_<ClassName> of the node class, or of the
+    nearest base class having such method.
+    """
+    def visit(self, node, *args):
+        node_type = type(node)
+        method = self._methods.get(node_type)
+        if method is None:
+            method = self._find_method(node_type)
+        return method(self, node, *args)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._methods = {}
+
+    @classmethod
+    def _find_method(cls, node_type):
+        for base in node_type.__mro__:
+            method = getattr(cls, "visit_" + base.__name__, None)
+            if method is not None:
+                cls._methods[node_type] = method
+                return method
+        raise NotImplementedError(
+            f"{cls.__name__} doesn't handle {node_type.__name__} nodes")
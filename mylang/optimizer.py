@@ -0,0 +1,256 @@
+from .base_nodes import Definition, Statement
+from .definition_classes import FunctionDefinition
+from .node_classes import (AddExpression, Block, ConstValue, FieldOperator,
+                           ForStatement, FunOperator, MathExpression,
+                           ValueAssignment)
+from .node_visitor import NodeVisitor
+
+CONSTANT_NAMES = {"True": True, "False": False}
+# attributes holding nodes which are also held by other attributes
+DERIVED_ATTRIBUTES = {"steps"}  # Value.steps, fused Value.operators
+
+
+def _get_children(node) -> list:
+    return [
+        value for name, value in vars(node).items()
+        if name not in DERIVED_ATTRIBUTES
+    ]
+
+
+def count_nodes(node) -> int:
+    "returns number of AST nodes in node or list of nodes"
+    if isinstance(node, list):
+        return sum(count_nodes(x) for x in node)
+    if isinstance(node, (Statement, Block, FieldOperator, FunOperator,
+                         Definition)):
+        return 1 + sum(count_nodes(x) for x in _get_children(node))
+    return 0
+
+
+def assigned_names(node, loop_counters: bool = True) -> set:
+    """returns names of variables assigned or used as arguments (and loop
+    counters, if loop_counters is set) in node"""
+    if isinstance(node, list):
+        return set().union(*(assigned_names(x, loop_counters) for x in node))
+    result = set()
+    if isinstance(node, ValueAssignment):
+        result.add(node.name)
+    if isinstance(node, FunctionDefinition):
+        result.update(node.arguments)
+    if loop_counters and isinstance(node, ForStatement):
+        result.add(node.variable)
+    if isinstance(node, (Statement, Block, FieldOperator, FunOperator,
+                         Definition)):
+        for value in _get_children(node):
+            result |= assigned_names(value, loop_counters)
+    return result
+
+
+class AstOptimizer(NodeVisitor):
+    """Simplifies AST of parsed Program before execution.
+
+    Passes (each can be turned off):
+    - fold_constants: subtrees with constant operands become ConstValue,
+      leading constants of longer expressions are folded too. Subtrees
+      raising errors are left, so the error is raised at runtime.
+    - eliminate_branches: if with constant condition is replaced by its
+      taken block, while with false condition is removed.
+    - flatten: removes wrappers not changing value (unary +, one element
+      expressions).
+    """
+    def __init__(self,
+                 fold_constants: bool = True,
+                 eliminate_branches: bool = True,
+                 flatten: bool = True):
+        self.fold_constants = fold_constants
+        self.eliminate_branches = eliminate_branches
+        self.flatten = flatten
+        self.constant_names = {}
+        self.nodes_before = 0
+        self.nodes_after = 0
+
+    def optimize(self, program):
+        "optimizes program in place and returns it"
+        self.nodes_before = count_nodes(program.definitions) + count_nodes(
+            program.statements)
+        # True and False are definitions, but function may shadow them
+        shadowed = assigned_names(program.definitions) | assigned_names(
+            program.statements)
+        self.constant_names = {
+            name: value
+            for name, value in CONSTANT_NAMES.items() if name not in shadowed
+        }
+
+        for definition in program.definitions:
+            definition.block = self.visit(definition.block)
+        # top level statements aren't inlined, program.current_statement
+        # gives location of errors
+        statements = []
+        for statement in program.statements:
+            result = self.visit(statement)
+            if isinstance(result, list):
+                if result:
+                    statements.append(statement)
+            elif result is not None:
+                statements.append(result)
+        program.statements = statements
+
+        self.nodes_after = count_nodes(program.definitions) + count_nodes(
+            program.statements)
+        return program
+
+    def report(self) -> str:
+        removed = self.nodes_before - self.nodes_after
+        percent = 100 * removed / self.nodes_before if self.nodes_before else 0
+        return (f"AST nodes: {self.nodes_before} -> {self.nodes_after} "
+                f"({percent:.1f}% removed)")
+
+    @staticmethod
+    def _evaluate(node):
+        "returns value of constant node or None if evaluation fails"
+        try:
+            return node.evaluate(None)
+        except Exception:
+            return None
+
+    def _fold(self, node):
+        "replaces node with its constant value if possible"
+        if not self.fold_constants:
+            return node
+        value = self._evaluate(node)
+        if value is None:
+            return node
+        return ConstValue(node.location, value)
+
+    @staticmethod
+    def _is_constant(nodes: list) -> bool:
+        return all(type(x) is ConstValue for x in nodes)
+
+    def visit_Block(self, node):
+        statements = []
+        for statement in node.statements:
+            result = self.visit(statement)
+            if isinstance(result, list):
+                statements.extend(result)
+            elif result is not None:
+                statements.append(result)
+        node.statements = statements
+        node.update_defines_variables()
+        return node
+
+    def visit_ValueAssignment(self, node):
+        node.expression = self.visit(node.expression)
+        return node
+
+    def visit_IfStatement(self, node):
+        node.condition = self.visit(node.condition)
+        node.true_block = self.visit(node.true_block)
+        if node.false_block:
+            node.false_block = self.visit(node.false_block)
+        if not self.eliminate_branches or type(node.condition) is not ConstValue:
+            return node
+
+        block = node.true_block if node.condition.value else node.false_block
+        if block is None or not block.statements:
+            return None
+        if block.defines_variables:
+            # variables assigned in block are local to its context
+            node.condition = ConstValue(node.condition.location, True)
+            node.true_block = block
+            node.false_block = None
+            return node
+        return block.statements
+
+    def visit_WhileStatement(self, node):
+        node.condition = self.visit(node.condition)
+        node.block = self.visit(node.block)
+        if (self.eliminate_branches and type(node.condition) is ConstValue
+                and not node.condition.value):
+            return None
+        return node
+
+    def visit_ForStatement(self, node):
+        node.start = self.visit(node.start)
+        node.end = self.visit(node.end)
+        node.step = self.visit(node.step)
+        node.block = self.visit(node.block)
+        return node
+
+    def visit_LogicalExpression(self, node):
+        node.and_conditions = [self.visit(x) for x in node.and_conditions]
+        if self._is_constant(node.and_conditions):
+            return self._fold(node)
+        return node
+
+    def visit_AndCondition(self, node):
+        node.relations = [self.visit(x) for x in node.relations]
+        if self._is_constant(node.relations):
+            return self._fold(node)
+        return node
+
+    def visit_Relation(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        if self._is_constant([node.left, node.right]):
+            return self._fold(node)
+        return node
+
+    def visit_MathExpression(self, node):
+        node.add_expressions = [self.visit(x) for x in node.add_expressions]
+        node.add_expressions, node.operators = self._fold_prefix(
+            MathExpression, node.add_expressions, node.operators)
+        return self._finish_expression(node, node.add_expressions)
+
+    def visit_AddExpression(self, node):
+        node.factors = [self.visit(x) for x in node.factors]
+        node.factors, node.operators = self._fold_prefix(
+            AddExpression, node.factors, node.operators)
+        return self._finish_expression(node, node.factors)
+
+    def _fold_prefix(self, node_class, operands: list, operators: list):
+        """Folds leading constant operands, expressions are evaluated from
+        left to right, so it doesn't change result."""
+        count = 0
+        while count < len(operands) and type(operands[count]) is ConstValue:
+            count += 1
+        if count < 2 or not self.fold_constants:
+            return operands, operators
+        prefix = node_class(operands[:count], operators[:count - 1])
+        value = self._evaluate(prefix)
+        if value is None:
+            return operands, operators
+        return ([ConstValue(prefix.location, value)] + operands[count:],
+                operators[count - 1:])
+
+    def _finish_expression(self, node, operands: list):
+        if len(operands) == 1 and self.flatten:
+            return operands[0]
+        return node
+
+    def visit_Factor(self, node):
+        node.value = self.visit(node.value)
+        if node.unary_op not in ("-", "!") and self.flatten:
+            return node.value
+        if type(node.value) is ConstValue:
+            return self._fold(node)
+        return node
+
+    def visit_ConstValue(self, node):
+        return node
+
+    def visit_ReturnStatement(self, node):
+        node.call = self.visit_Value(node.call)
+        return node
+
+    def visit_Identifier(self, node):
+        if self.fold_constants and node.name in self.constant_names:
+            return ConstValue(node.location, self.constant_names[node.name])
+        return node
+
+    def visit_Value(self, node):
+        for operator in node.operators:
+            if isinstance(operator, FunOperator):
+                operator.arguments = [
+                    self.visit(x) for x in operator.arguments
+                ]
+        return node
@@ -0,0 +1,154 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+from . import __version__
+from .lexer import Lexer
+from .parser_logo import Parser
+from .program import Program
+from .shared import ConsoleLogger, Logger
+from .text_reader import TextReader
+
+# raised by unpickling truncated or corrupted file from cache_dir
+CORRUPTED_FILE_ERRORS = (pickle.UnpicklingError, EOFError, AttributeError,
+                         ImportError, ValueError)
+
+
+class ParseCache(object):
+    """Cache of parsed programs, keyed by hash of source text, lexer and
+    interpreter version.
+
+    Pickled definitions and statements of recently parsed programs are
+    kept in memory (LRU) and optionally in cache_dir on disk, similar to
+    __pycache__. Each hit unpickles a new AST and wraps it in a new Program,
+    so executions never share nodes or root context.
+    """
+    FILE_SUFFIX = ".logoc"
+
+    def __init__(self,
+                 max_entries: int = 128,
+                 cache_dir: str = None,
+                 lexer_class=Lexer,
+                 logger: Logger = ConsoleLogger()):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.lexer_class = lexer_class
+        self.logger = logger
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_key(self, reader: TextReader) -> str:
+        """returns hash of source, read in chunks (file isn't decoded), and
+        of lexer, lexers may tokenize some sources differently"""
+        digest = hashlib.sha256(f"{__version__}\0{reader.encoding}\0"
+                                f"{self.lexer_class.__name__}\0".encode())
+        for chunk in reader.iter_bytes():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def parse_program(self, reader: TextReader) -> Program:
+        """Returns program read from reader, lexer and parser are used
+        only if program isn't cached yet.
+        """
+        key = self.get_key(reader)
+
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self._load(data)
+
+        data = self._read_file(key)
+        if data is not None:
+            try:
+                program = self._load(data)
+            except CORRUPTED_FILE_ERRORS:
+                # it's parsed again and written instead of the bad file
+                self._remove_file(self._get_path(key))
+            else:
+                self.disk_hits += 1
+                self._store(key, data)
+                return program
+
+        self.misses += 1
+        program = Parser(self.lexer_class(reader, self.logger),
+                         self.logger).parse_program()
+        try:
+            data = pickle.dumps((program.definitions, program.statements),
+                                pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            # too deeply nested AST, it just won't be cached
+            return program
+        self._store(key, data)
+        self._write_file(key, data)
+        return program
+
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+        }
+
+    def clear(self):
+        self.entries.clear()
+
+    @staticmethod
+    def _load(data: bytes) -> Program:
+        # unpickling creates lots of objects at once, which otherwise makes
+        # cyclic garbage collector run over and over
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            definitions, statements = pickle.loads(data)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return Program(definitions, statements)
+
+    def _store(self, key: str, data: bytes):
+        self.entries[key] = data
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.FILE_SUFFIX)
+
+    def _read_file(self, key: str) -> bytes:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._get_path(key), "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, data: bytes):
+        "writes data to cache_dir if it can, cache on disk is optional"
+        if self.cache_dir is None:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to temporary file first, so readers never see partial data
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, self._get_path(key))
+        except OSError:
+            if tmp_path is not None:
+                self._remove_file(tmp_path)
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -3,36 +3,52 @@ from .shared import Token, TokenType, ConsoleLogger, Logger
 from .language_errors import LogoSyntaxError
 from .base_nodes import Definition, Expression
 from .definition_classes import FunctionDefinition
-from .node_classes import Relation, Statement, ValueAssignment, MathExpression, Factor, Value, AndCondition, FieldOperator, FunOperator, Identifier, ConstValue, Block, IfStatement, WhileStatement, LogicalExpression, AddExpression, BaseValue
+from .node_classes import Relation, Statement, ValueAssignment, MathExpression, Factor, Value, AndCondition, FieldOperator, FunOperator, Identifier, ConstValue, Block, IfStatement, ReturnStatement, WhileStatement, ForStatement, LogicalExpression, AddExpression
 from .program import Program
+from .token_buffer import TokenBuffer
 
 
 class Parser(object):
     def __init__(self,
                  token_source: Lexer = None,
                  logger: Logger = ConsoleLogger()):
+        """token_source can be a lexer or an already filled TokenBuffer,
+        tokens from lexer are read into buffer as parsing goes on.
+        """
+        if not isinstance(token_source, TokenBuffer):
+            token_source = TokenBuffer(token_source)
+        self.tokens = token_source
+        self.position = 0
         self.current_token = None
-        self.token_source = token_source
+        self.in_function = False
+        # counters of loops being parsed, they can't be assigned
+        self.loop_counters = []
 
     def __get_token(self) -> Token:
-        if not self.current_token:
-            self.current_token = self.token_source.get_token()
+        if self.current_token is None:
+            self.current_token = self.tokens[self.position]
         return self.current_token
 
     def __pop_token(self):
-        if self.current_token:
-            res = self.current_token
-            self.current_token = None
-            return res
-        else:
-            return self.token_source.get_token()
+        res = self.__get_token()
+        self.current_token = None
+        self.position += 1
+        return res
+
+    def __pop_value(self):
+        "pops token returning only its value, without creating Token object"
+        value = self.tokens.get_value(self.position)
+        self.current_token = None
+        self.position += 1
+        return value
 
     def _check_token_type(self,
                           token_type: TokenType,
                           pop_if_true: bool = False) -> bool:
-        result = token_type == self.__get_token().symbol_type
+        result = token_type is self.tokens.get_type(self.position)
         if pop_if_true and result:
-            self.__pop_token()
+            self.current_token = None
+            self.position += 1
         return result
 
     def _handle_exception(decorated_fun, *args, **kwargs):
@@ -73,6 +89,9 @@ class Parser(object):
         if result:
             return result
         result = self.__parse_if()
+        if result:
+            return result
+        result = self.__parse_for()
         if result:
             return result
 
@@ -80,12 +99,24 @@ class Parser(object):
         if result:
             assignment = self.__parse_assignment(result)
             result = assignment if assignment else result
+        if self.in_function and self.__is_return_call(result):
+            result = ReturnStatement(result)
         return result
 
+    @staticmethod
+    def __is_return_call(statement) -> bool:
+        return (type(statement) is Value
+                and statement.id_value.name == "return"
+                and len(statement.operators) == 1
+                and type(statement.operators[0]) is FunOperator)
+
     def __parse_assignment(self, target: Identifier):
         if target:
-            if type(target) == Identifier and self.__get_token(
-            ).symbol_type == TokenType.ASSIGNMENT_OPERATOR:
+            if type(target) == Identifier and self._check_token_type(
+                    TokenType.ASSIGNMENT_OPERATOR):
+                if target.name in self.loop_counters:
+                    raise LogoSyntaxError(
+                        f"Assignment to loop counter {target.name}")
                 self.__pop_token()
                 return ValueAssignment(target.location, target.name,
                                        self.__parse_expression())
@@ -95,156 +126,145 @@ class Parser(object):
         return self.__parse_function_def()
 
     def __parse_expression(self) -> Expression:
-        return self.__parse_logical_expression()
-
-    def __parse_logical_expression(self):
-        first_exp = self.__parse_and_condition()
-        if not first_exp:
-            return None
-
-        other_exp = []
-        while self._check_token_type(TokenType.OR_OPERATOR, True):
-            other_exp.append(self.__parse_and_condition())
-
-        if other_exp:
-            other_exp.insert(0, first_exp)
-            return LogicalExpression(other_exp)
-        else:
-            return first_exp
-
-    def __parse_and_condition(self) -> Expression:
-
-        first_relation = self.__parse_relation()
-        if not first_relation:
-            return None
+        """Operator precedence parser of expressions.
 
-        other_relations = []
-
-        while self._check_token_type(TokenType.AND_OPERATOR, True):
-            rel = self.__check_none(self.__parse_relation(),
-                                    "Missing relation after and operator")
-            other_relations.append(rel)
-
-        if other_relations:
-            other_relations.insert(0, first_relation)
-            return AndCondition(other_relations)
-        else:
-            return first_relation
-
-    def __parse_relation(self) -> Relation:
-        first_math_expression = self.__parse_math_expression()
-
-        if self._check_token_type(
-                TokenType.COMP_OPERATOR) and first_math_expression:
-            comp = self.__pop_token().value
-            return Relation(first_math_expression,
-                            self.__parse_math_expression(), comp)
-        else:
-            return first_math_expression
-
-    def __parse_math_expression(self) -> MathExpression:
-        first_add_expr = self.__parse_add_expr()
-
-        operators = []
-        add_expressions = [first_add_expr]
-        if first_add_expr:
-            while self._check_token_type(TokenType.ADD_OPERATOR):
-                operators.append(self.__pop_token().value)
-                add_exp = self.__check_none(self.__parse_add_expr(),
-                                            "No factor after add operator")
-                add_expressions.append(add_exp)
-
-        if operators:
-            return MathExpression(add_expressions, operators)
-        else:
-            return first_add_expr
-
-    def __parse_add_expr(self) -> AddExpression:
-        first_factor = self.__parse_factor()
-        operators = []
-        factors = [first_factor]
-
-        if first_factor:
-            while self._check_token_type(TokenType.MULT_OPERATOR):
-                operators.append(self.__pop_token().value)
-                factor = self.__check_none(self.__parse_factor(),
-                                           "No factor after add operator")
-                factors.append(factor)
-
-        if operators:
-            return AddExpression(factors, operators)
-        else:
-            return first_factor
-
-    def __parse_factor(self) -> Factor:
-        result = None
-
-        unary_token = None
-        if self.__get_token().symbol_type in [
-                TokenType.UNARY_OPERATOR, TokenType.ADD_OPERATOR
-        ]:
-            unary_token = self.__pop_token().value
-
-        if self._check_token_type(TokenType.OPEN_PAREN, True):
-            result = self.__check_none(self.__parse_logical_expression(),
-                                       "No expression in paren")
-            self.__validate_next_token(TokenType.CLOSE_PAREN,
-                                       "No ending parenthesis.")
-        else:
-            result = self.__parse_value()
-
-        if result and unary_token:
-            result = Factor(result, unary_token)
-        return result
-
-    def __parse_value(self) -> BaseValue:
-        if self._check_token_type(TokenType.CONST):
-            token = self.__pop_token()
-            return ConstValue(token.location, token.value)
-        elif self._check_token_type(TokenType.IDENTIFIER):
-            id_token = self.__pop_token()
-            id_value = Identifier(id_token.location, id_token.value)
-            operators = []
-
-            operator = True
-            while operator:
-                operator = self.__parse_function_operator()
-                if not operator:
-                    operator = self.__parse_field_operator()
-                if operator:
-                    operators.append(operator)
-            if operators:
-                return Value(id_value, operators=operators)
+        Instead of recursive call for every precedence level it keeps an
+        explicit stack of frames (one per open parenthesis or argument
+        list), so depth of nested expressions is not limited by recursion.
+        Returns None when there is no expression at current token.
+        """
+        get_type = self.tokens.get_type
+        frame = _ExpressionFrame(_ExpressionFrame.TOP)
+        frames = [frame]
+        while True:
+            # operand: [unary operator] (value | "(" expression ")")
+            unary_op = None
+            token_type = get_type(self.position)
+            if token_type is TokenType.UNARY_OPERATOR or token_type is TokenType.ADD_OPERATOR:
+                unary_op = self.__pop_value()
+                token_type = get_type(self.position)
+
+            if token_type is TokenType.OPEN_PAREN:
+                self.__pop_value()
+                frame = _ExpressionFrame(_ExpressionFrame.PAREN, unary_op)
+                frames.append(frame)
+                continue
+            elif token_type is TokenType.CONST:
+                location = self.tokens.get_location(self.position)
+                operand = ConstValue(location, self.__pop_value())
+                if unary_op:
+                    operand = Factor(operand, unary_op)
+            elif token_type is TokenType.IDENTIFIER:
+                location = self.tokens.get_location(self.position)
+                operand = self.__parse_value_operators(
+                    frames, Identifier(location, self.__pop_value()), [],
+                    unary_op)
+                if operand is None:
+                    frame = frames[-1]
+                    continue
             else:
-                return id_value
-
-        return None
-
-    def __parse_function_operator(self) -> FunOperator:
-        if not self._check_token_type(TokenType.OPEN_PAREN):
-            return None
-        location = self.__pop_token().location
-
-        # Parsing arguments
-
-        argument = self.__parse_expression()
-        arguments = []
-        if argument:
-            arguments = [argument]
-            while self._check_token_type(TokenType.COMMA):
-                self.__pop_token()
-                argument = self.__parse_expression()
-                if argument:
-                    arguments.append(argument)
+                operand = None
+
+            # operators following operand, closing of finished frames
+            while True:
+                if operand is None:
+                    if frame.missing_operand_msg:
+                        raise LogoSyntaxError(frame.missing_operand_msg)
+                    result = None
+                elif self.__parse_binary_operator(frame, operand):
+                    break
                 else:
-                    raise LogoSyntaxError("Problem with parsing arguments")
-            self.__validate_next_token(TokenType.CLOSE_PAREN,
-                                       "Missing close paren", False)
-        self.__pop_token()
-        return FunOperator(location, arguments)
+                    result = frame.close_logical_expression()
+
+                if frame.kind is _ExpressionFrame.TOP:
+                    return result
+
+                if frame.kind is _ExpressionFrame.PAREN:
+                    frames.pop()
+                    self.__check_none(result, "No expression in paren")
+                    self.__validate_next_token(TokenType.CLOSE_PAREN,
+                                               "No ending parenthesis.")
+                    operand = Factor(result,
+                                     frame.unary_op) if frame.unary_op else result
+                    frame = frames[-1]
+                    continue
+
+                # argument list of function operator
+                if result is None:
+                    if frame.arguments:
+                        raise LogoSyntaxError("Problem with parsing arguments")
+                else:
+                    frame.arguments.append(result)
+                    if self._check_token_type(TokenType.COMMA, True):
+                        frame.missing_operand_msg = None
+                        break
+                self.__validate_next_token(TokenType.CLOSE_PAREN,
+                                           "Missing close paren")
+                frames.pop()
+                frame.value_operators.append(
+                    FunOperator(frame.location, frame.arguments))
+                operand = self.__parse_value_operators(frames, frame.id_value,
+                                                       frame.value_operators,
+                                                       frame.unary_op)
+                frame = frames[-1]
+                if operand is None:
+                    break
+
+    def __parse_binary_operator(self, frame, operand) -> bool:
+        """Adds operand to frame and reads operator after it.
+        Returns True if operator was consumed (so next operand is expected).
+        """
+        frame.factors.append(operand)
+        token_type = self.tokens.get_type(self.position)
+        if token_type is TokenType.MULT_OPERATOR:
+            frame.mult_operators.append(self.__pop_value())
+            frame.missing_operand_msg = "No factor after add operator"
+        elif token_type is TokenType.ADD_OPERATOR:
+            frame.close_add_expression()
+            frame.add_operators.append(self.__pop_value())
+            frame.missing_operand_msg = "No factor after add operator"
+        elif token_type is TokenType.COMP_OPERATOR and frame.comp_sign is None:
+            frame.relation_left = frame.close_math_expression()
+            frame.comp_sign = self.__pop_value()
+            frame.missing_operand_msg = "Missing expression after comparison operator"
+        elif token_type is TokenType.AND_OPERATOR:
+            frame.close_relation()
+            self.__pop_value()
+            frame.missing_operand_msg = "Missing relation after and operator"
+        elif token_type is TokenType.OR_OPERATOR:
+            frame.close_and_condition()
+            self.__pop_value()
+            frame.missing_operand_msg = "Missing condition after or operator"
+        else:
+            return False
+        return True
+
+    def __parse_value_operators(self, frames: list, id_value: Identifier,
+                                operators: list, unary_op):
+        """Reads field operators following identifier. Returns finished
+        value, or None if function operator started (new frame for its
+        arguments is pushed on frames then).
+        """
+        while True:
+            if self._check_token_type(TokenType.OPEN_PAREN):
+                location = self.tokens.get_location(self.position)
+                self.__pop_value()
+                frames.append(
+                    _ExpressionFrame(_ExpressionFrame.ARGUMENTS, unary_op,
+                                     id_value, operators, location))
+                return None
+            operator = self.__parse_field_operator()
+            if not operator:
+                break
+            operators.append(operator)
+
+        result = Value(id_value, operators=operators) if operators else id_value
+        if unary_op:
+            result = Factor(result, unary_op)
+        return result
 
     def __parse_while(self) -> WhileStatement:
-        if self.__get_token().symbol_type != TokenType.WHILE:
+        if not self._check_token_type(TokenType.WHILE):
             return None
         loc = self.__pop_token().location
         self.__validate_next_token(TokenType.OPEN_PAREN,
@@ -257,6 +277,56 @@ class Parser(object):
         block = self.__parse_block()
         return WhileStatement(loc, logical_exp, block)
 
+    def __parse_for(self) -> ForStatement:
+        """for tree:
+            FOR:
+            - counter name
+            - start, end, step (1 if not given)
+            - block
+        repeat(n) is for loop with repcount counter from 1 to n.
+        """
+        if self._check_token_type(TokenType.REPEAT):
+            loc = self.__pop_token().location
+            self.__validate_next_token(TokenType.OPEN_PAREN,
+                                       "No opening paren after repeat")
+            count = self.__check_none(self.__parse_expression(),
+                                      "No number of repetitions in repeat")
+            self.__validate_next_token(TokenType.CLOSE_PAREN,
+                                       "No closing paren after repeat")
+            return self.__parse_loop_block(ForStatement.REPEAT_COUNTER, loc,
+                                           ConstValue(loc, 1.0), count,
+                                           ConstValue(loc, 1.0))
+
+        if not self._check_token_type(TokenType.FOR):
+            return None
+        loc = self.__pop_token().location
+        self.__validate_next_token(TokenType.OPEN_PAREN,
+                                   "No opening paren after for")
+        self.__validate_next_token(TokenType.IDENTIFIER,
+                                   "No loop counter in for", False)
+        counter = self.__pop_token().value
+        bounds = []
+        while self._check_token_type(TokenType.COMMA, True):
+            bounds.append(
+                self.__check_none(self.__parse_expression(),
+                                  "Missing loop bound in for"))
+        if len(bounds) == 2:
+            bounds.append(ConstValue(loc, 1.0))
+        elif len(bounds) != 3:
+            raise LogoSyntaxError(
+                "For needs counter, start, end and optional step")
+        self.__validate_next_token(TokenType.CLOSE_PAREN,
+                                   "No closing paren after for")
+        return self.__parse_loop_block(counter, loc, *bounds)
+
+    def __parse_loop_block(self, counter: str, loc, start, end, step):
+        self.loop_counters.append(counter)
+        try:
+            block = self.__parse_block()
+        finally:
+            self.loop_counters.pop()
+        return ForStatement(loc, counter, start, end, step, block)
+
     def __parse_function_def(self) -> FunctionDefinition:
         '''
         function tree:
@@ -288,7 +358,11 @@ class Parser(object):
         self.__validate_next_token(TokenType.CLOSE_PAREN,
                                    "Missing close paren")
 
-        block = self.__parse_block()
+        self.in_function = True
+        try:
+            block = self.__parse_block()
+        finally:
+            self.in_function = False
         return FunctionDefinition(fun.location, fun.value, block, arguments)
 
     def __parse_block(self) -> Block:
@@ -358,3 +432,82 @@ class Parser(object):
         if not element:
             raise LogoSyntaxError(err_msg)
         return element
+
+
+class _ExpressionFrame(object):
+    """Partially parsed expression (of given precedence levels),
+    used by Parser instead of recursive calls.
+    """
+    TOP = 0
+    PAREN = 1
+    ARGUMENTS = 2
+
+    def __init__(self,
+                 kind: int,
+                 unary_op: str = None,
+                 id_value: Identifier = None,
+                 value_operators: list = None,
+                 location=None):
+        self.kind = kind
+        # unary operator applied to whole parenthesis / called value
+        self.unary_op = unary_op
+        # called value, for argument list only
+        self.id_value = id_value
+        self.value_operators = value_operators
+        self.location = location
+        self.arguments = []
+
+        self.missing_operand_msg = None
+        self.factors = []
+        self.mult_operators = []
+        self.add_expressions = []
+        self.add_operators = []
+        self.relation_left = None
+        self.comp_sign = None
+        self.relations = []
+        self.and_conditions = []
+
+    def close_add_expression(self):
+        if self.mult_operators:
+            result = AddExpression(self.factors, self.mult_operators)
+            self.mult_operators = []
+        else:
+            result = self.factors[0]
+        self.factors = []
+        self.add_expressions.append(result)
+
+    def close_math_expression(self):
+        self.close_add_expression()
+        if self.add_operators:
+            result = MathExpression(self.add_expressions, self.add_operators)
+            self.add_operators = []
+        else:
+            result = self.add_expressions[0]
+        self.add_expressions = []
+        return result
+
+    def close_relation(self):
+        result = self.close_math_expression()
+        if self.comp_sign is not None:
+            result = Relation(self.relation_left, result, self.comp_sign)
+            self.relation_left = None
+            self.comp_sign = None
+        self.relations.append(result)
+
+    def close_and_condition(self):
+        self.close_relation()
+        if len(self.relations) > 1:
+            result = AndCondition(self.relations)
+        else:
+            result = self.relations[0]
+        self.relations = []
+        self.and_conditions.append(result)
+
+    def close_logical_expression(self):
+        self.close_and_condition()
+        if len(self.and_conditions) > 1:
+            result = LogicalExpression(self.and_conditions)
+        else:
+            result = self.and_conditions[0]
+        self.and_conditions = []
+        return result
@@ -1,6 +1,35 @@
 from .shared import get_global_logger
 from .root_context import LogoRootContext
-from .language_errors import LogoRuntimeError
+from .language_errors import CompilationError, LogoRuntimeError
+from .bytecode_vm import VirtualMachineEngine
+from .closure_compiler import ClosureEngine
+from .memoization import Memoizer
+from .quickening import QuickeningEngine
+from .transpiler import TranspilerEngine
+
+
+class TreeWalkingEngine(object):
+    "Runs program by evaluating AST nodes directly"
+
+    def execute(self, program):
+        for statement in program.statements:
+            program.current_statement = statement
+            statement.evaluate(program.root_context)
+
+
+EXECUTION_ENGINES = {
+    "tree": TreeWalkingEngine,
+    "closure": ClosureEngine,
+    "python": TranspilerEngine,
+    "vm": VirtualMachineEngine,
+    "quick": QuickeningEngine,
+}
+
+# engine running program which can't be compiled by the given one
+FALLBACK_ENGINES = {
+    "python": "closure",
+    "closure": "tree",
+}
 
 
 class Program(object):
@@ -15,6 +44,8 @@ class Program(object):
 
         self.log = get_global_logger()
         self.current_statement = None
+        self.memoizer = None
+        self.quickening_stats = None
 
     def __str__(self):
         ret = "Definitions:\n"
@@ -33,6 +64,10 @@ class Program(object):
                 if err.location is None:
                     err.location = args[0].current_statement.location
                 raise err
+            except RecursionError as err:
+                raise LogoRuntimeError("Maximum depth of recursion exceeded",
+                                       args[0].current_statement.location
+                                       ) from err
             except TypeError as err:
                 TYPES = [
                     "str", "bool", "Turtle", "float", "FunctionDefinition"
@@ -53,10 +88,30 @@ class Program(object):
         return output_fun
 
     @_decorate_exception
-    def execute(self):
-        for statement in self.statements:
-            self.current_statement = statement
-            statement.evaluate(self.root_context)
+    def execute(self, engine: str = "tree", memoize: bool = False):
+        """Runs program using one of EXECUTION_ENGINES, programs which it
+        can't compile are run by engine from FALLBACK_ENGINES. If memoize
+        is set, results of pure functions are cached, self.memoizer gives
+        statistics after execution."""
+        if not memoize:
+            self._run(engine)
+            return
+        self.memoizer = Memoizer(self)
+        self.memoizer.attach()
+        try:
+            self._run(engine)
+        finally:
+            self.memoizer.detach()
+
+    def _run(self, engine: str):
+        try:
+            EXECUTION_ENGINES[engine]().execute(self)
+        except CompilationError:
+            self._run(FALLBACK_ENGINES[engine])
 
     def get_canvas(self):
         return self.root_context.canvas
+
+    def set_canvas(self, canvas):
+        "sets canvas (one of CANVAS_MODES) used by turtles, before execution"
+        self.root_context.canvas = canvas
@@ -0,0 +1,400 @@
+import operator
+
+from .node_classes import (AddExpression, FieldOperator, FunOperator,
+                           MathExpression, Relation, Value)
+from .node_visitor import NodeVisitor
+from .standard_library.turtle_object import Turtle
+
+
+class QuickeningStats(object):
+    def __init__(self):
+        self.adaptive = 0
+        self.specialized = 0
+        self.deoptimized = 0
+
+    def get_stats(self) -> dict:
+        return {
+            "adaptive": self.adaptive,
+            "specialized": self.specialized,
+            "deoptimized": self.deoptimized,
+        }
+
+    def report(self) -> str:
+        return (f"Quickening: {self.adaptive} adaptive nodes, "
+                f"{self.specialized} specializations, "
+                f"{self.deoptimized} deoptimizations")
+
+
+class Quickener(NodeVisitor):
+    """Makes hot AST nodes specialize themselves, like quickening of
+    CPython 3.11.
+
+    Binary arithmetic and comparison nodes and turtle method calls
+    (t.fd(...) and others) become adaptive: after WARMUP executions they
+    change their class to variant specialized for types of operands seen
+    then. Specialized node checks types on every execution, on mismatch
+    it returns to adaptive class (deoptimization) and waits twice as long
+    as before until next specialization. Arithmetic with more operands
+    gets its operators resolved to functions, it doesn't depend on types.
+    Node classes are replaced only by subclasses, so other passes see nodes
+    of the same types.
+    """
+    WARMUP = 8
+    MAX_BACKOFF = 1024
+
+    def __init__(self):
+        self.stats = QuickeningStats()
+
+    def quicken(self, program):
+        for definition in program.definitions:
+            self.visit(definition.block)
+        for statement in program.statements:
+            self.visit(statement)
+        return self.stats
+
+    def _is_quickened(self, node) -> bool:
+        "checks if node was quickened before, then it reports to new stats"
+        if getattr(node, "quick_stats", None) is None:
+            return False
+        node.quick_stats = self.stats
+        self.stats.adaptive += 1
+        return True
+
+    def _make_adaptive(self, node, adaptive_class):
+        node.__class__ = adaptive_class
+        node.quick_stats = self.stats
+        node.quick_counter = self.WARMUP
+        node.quick_backoff = self.WARMUP
+        self.stats.adaptive += 1
+
+    def _make_binary(self, node, left, right, operation, float_class=None):
+        node.quick_left = left
+        node.quick_right = right
+        node.quick_operation = operation
+        node.quick_float_class = float_class
+        node.quick_left_type = node.quick_right_type = None
+        self._make_adaptive(node, ADAPTIVE_BINARY[type(node)])
+
+    def _make_chain(self, node, operands, operations, chain_class):
+        node.quick_first = operands[0]
+        node.quick_steps = tuple(zip(operations, operands[1:]))
+        node.quick_chain_class = chain_class
+        self._make_adaptive(node, ADAPTIVE_CHAIN[type(node)])
+
+    def visit_Block(self, node):
+        for statement in node.statements:
+            self.visit(statement)
+
+    def visit_ValueAssignment(self, node):
+        self.visit(node.expression)
+
+    def visit_IfStatement(self, node):
+        self.visit(node.condition)
+        self.visit(node.true_block)
+        if node.false_block:
+            self.visit(node.false_block)
+
+    def visit_WhileStatement(self, node):
+        self.visit(node.condition)
+        self.visit(node.block)
+
+    def visit_ForStatement(self, node):
+        self.visit(node.start)
+        self.visit(node.end)
+        self.visit(node.step)
+        self.visit(node.block)
+
+    def visit_ReturnStatement(self, node):
+        self.visit(node.call)
+
+    def visit_LogicalExpression(self, node):
+        for condition in node.and_conditions:
+            self.visit(condition)
+
+    def visit_AndCondition(self, node):
+        for relation in node.relations:
+            self.visit(relation)
+
+    def visit_Relation(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+        if not self._is_quickened(node):
+            self._make_binary(node, node.left, node.right,
+                              Relation.COMP_OPERATIONS[node.comp_sign])
+
+    def visit_MathExpression(self, node):
+        for expression in node.add_expressions:
+            self.visit(expression)
+        if self._is_quickened(node):
+            return
+        if len(node.operators) > 1:
+            operations = [
+                operator.add if x == "+" else operator.sub
+                for x in node.operators
+            ]
+            self._make_chain(node, node.add_expressions, operations,
+                             ChainMathExpression)
+        else:
+            if node.operators[0] == "+":
+                operation, float_class = operator.add, FloatAddExpression
+            else:
+                operation, float_class = operator.sub, FloatSubtractExpression
+            self._make_binary(node, *node.add_expressions, operation,
+                              float_class)
+
+    def visit_AddExpression(self, node):
+        for factor in node.factors:
+            self.visit(factor)
+        if self._is_quickened(node):
+            return
+        if len(node.operators) > 1:
+            operations = [
+                operator.mul if x == "*" else _get_division(y.location)
+                for x, y in zip(node.operators, node.factors[1:])
+            ]
+            self._make_chain(node, node.factors, operations,
+                             ChainAddExpression)
+            return
+        if node.operators[0] == "*":
+            operation, float_class = operator.mul, FloatMultiplyExpression
+        else:
+            operation = _get_division(node.factors[1].location)
+            float_class = FloatDivideExpression
+        self._make_binary(node, *node.factors, operation, float_class)
+
+    def visit_Factor(self, node):
+        self.visit(node.value)
+
+    def visit_ConstValue(self, node):
+        pass
+
+    def visit_Identifier(self, node):
+        pass
+
+    def visit_Value(self, node):
+        for operator_node in node.operators:
+            if isinstance(operator_node, FunOperator):
+                for argument in operator_node.arguments:
+                    self.visit(argument)
+
+        operators = node.operators
+        if self._is_quickened(node):
+            return
+        if (len(operators) == 2
+                and type(operators[0]) is FieldOperator
+                and type(operators[1]) is FunOperator):
+            method = Turtle.methods.get(operators[0].name)
+            if method and method.arguments == len(operators[1].arguments):
+                node.quick_name = method.name
+                node.quick_arguments = operators[1].arguments
+                self._make_adaptive(node, AdaptiveTurtleCall)
+
+
+def _get_division(location):
+    def divide(dividend, divisor):
+        if divisor == 0:
+            raise ZeroDivisionError(f"Dividing by zero at {location}")
+        return dividend / divisor
+
+    return divide
+
+
+def _deoptimize(node, adaptive_class):
+    node.__class__ = adaptive_class
+    node.quick_stats.deoptimized += 1
+    node.quick_backoff = min(2 * node.quick_backoff, Quickener.MAX_BACKOFF)
+    node.quick_counter = node.quick_backoff
+
+
+def _adaptive_binary_evaluate(self, context):
+    left = self.quick_left.evaluate(context)
+    right = self.quick_right.evaluate(context)
+    self.quick_counter -= 1
+    if not self.quick_counter:
+        self.quick_left_type = type(left)
+        self.quick_right_type = type(right)
+        if (self.quick_float_class and type(left) is float
+                and type(right) is float):
+            self.__class__ = self.quick_float_class
+        else:
+            self.__class__ = SPECIALIZED_BINARY[type(self).__base__]
+        self.quick_stats.specialized += 1
+    return self.quick_operation(left, right)
+
+
+def _specialized_binary_evaluate(self, context):
+    left = self.quick_left.evaluate(context)
+    right = self.quick_right.evaluate(context)
+    if (type(left) is not self.quick_left_type
+            or type(right) is not self.quick_right_type):
+        _deoptimize(self, ADAPTIVE_BINARY[type(self).__base__])
+    return self.quick_operation(left, right)
+
+
+class AdaptiveMathExpression(MathExpression):
+    evaluate = _adaptive_binary_evaluate
+
+
+class SpecializedMathExpression(MathExpression):
+    evaluate = _specialized_binary_evaluate
+
+
+class AdaptiveAddExpression(AddExpression):
+    evaluate = _adaptive_binary_evaluate
+
+
+class SpecializedAddExpression(AddExpression):
+    evaluate = _specialized_binary_evaluate
+
+
+class AdaptiveRelation(Relation):
+    evaluate = _adaptive_binary_evaluate
+
+
+class SpecializedRelation(Relation):
+    evaluate = _specialized_binary_evaluate
+
+
+class FloatAddExpression(MathExpression):
+    def evaluate(self, context):
+        left = self.quick_left.evaluate(context)
+        right = self.quick_right.evaluate(context)
+        if type(left) is float and type(right) is float:
+            return left + right
+        _deoptimize(self, AdaptiveMathExpression)
+        return self.quick_operation(left, right)
+
+
+class FloatSubtractExpression(MathExpression):
+    def evaluate(self, context):
+        left = self.quick_left.evaluate(context)
+        right = self.quick_right.evaluate(context)
+        if type(left) is float and type(right) is float:
+            return left - right
+        _deoptimize(self, AdaptiveMathExpression)
+        return self.quick_operation(left, right)
+
+
+class FloatMultiplyExpression(AddExpression):
+    def evaluate(self, context):
+        left = self.quick_left.evaluate(context)
+        right = self.quick_right.evaluate(context)
+        if type(left) is float and type(right) is float:
+            return left * right
+        _deoptimize(self, AdaptiveAddExpression)
+        return self.quick_operation(left, right)
+
+
+class FloatDivideExpression(AddExpression):
+    def evaluate(self, context):
+        left = self.quick_left.evaluate(context)
+        right = self.quick_right.evaluate(context)
+        if type(left) is float and type(right) is float and right:
+            return left / right
+        if type(left) is not float or type(right) is not float:
+            _deoptimize(self, AdaptiveAddExpression)
+        # raises ZeroDivisionError with location
+        return self.quick_operation(left, right)
+
+
+# generic class -> its adaptive and specialized variant
+ADAPTIVE_BINARY = {
+    MathExpression: AdaptiveMathExpression,
+    AddExpression: AdaptiveAddExpression,
+    Relation: AdaptiveRelation,
+}
+SPECIALIZED_BINARY = {
+    MathExpression: SpecializedMathExpression,
+    AddExpression: SpecializedAddExpression,
+    Relation: SpecializedRelation,
+}
+
+
+def _adaptive_chain_evaluate(self, context):
+    self.quick_counter -= 1
+    if not self.quick_counter:
+        self.__class__ = self.quick_chain_class
+        self.quick_stats.specialized += 1
+    return type(self).__base__.evaluate(self, context)
+
+
+def _chain_evaluate(self, context):
+    result = self.quick_first.evaluate(context)
+    for operation, operand in self.quick_steps:
+        result = operation(result, operand.evaluate(context))
+    return result
+
+
+class AdaptiveChainMathExpression(MathExpression):
+    evaluate = _adaptive_chain_evaluate
+
+
+class ChainMathExpression(MathExpression):
+    "a + b - c ... with operators resolved to functions"
+    evaluate = _chain_evaluate
+
+
+class AdaptiveChainAddExpression(AddExpression):
+    evaluate = _adaptive_chain_evaluate
+
+
+class ChainAddExpression(AddExpression):
+    "a * b / c ... with operators resolved to functions"
+    evaluate = _chain_evaluate
+
+
+ADAPTIVE_CHAIN = {
+    MathExpression: AdaptiveChainMathExpression,
+    AddExpression: AdaptiveChainAddExpression,
+}
+
+
+class AdaptiveTurtleCall(Value):
+    "t.method(...) waiting for specialization"
+
+    def evaluate(self, context):
+        self.quick_counter -= 1
+        if not self.quick_counter:
+            source = self.id_value.evaluate(context)
+            if isinstance(source, Turtle):
+                # turtles of deferred canvas have own methods
+                self.quick_type = type(source)
+                self.quick_method = source.methods[self.quick_name].function
+                self.__class__ = TurtleCall
+                self.quick_stats.specialized += 1
+            else:
+                # source isn't turtle, try again later
+                self.quick_backoff = min(2 * self.quick_backoff,
+                                         Quickener.MAX_BACKOFF)
+                self.quick_counter = self.quick_backoff
+            return self._call(context, source)
+        return Value.evaluate(self, context)
+
+    def _call(self, context, source):
+        result = source
+        for operator_node in self.steps:
+            result = operator_node.evaluate(context, result)
+        return result
+
+
+class TurtleCall(AdaptiveTurtleCall):
+    "t.method(...) calling Python function of turtle method directly"
+
+    def evaluate(self, context):
+        source = self.id_value.evaluate(context)
+        if type(source) is not self.quick_type:
+            _deoptimize(self, AdaptiveTurtleCall)
+            return self._call(context, source)
+        return self.quick_method(
+            source, *[x.evaluate(context) for x in self.quick_arguments])
+
+
+class QuickeningEngine(object):
+    """Runs program by evaluating AST nodes like tree engine, with nodes
+    specialized by Quickener"""
+
+    def execute(self, program):
+        program.quickening_stats = Quickener().quicken(program)
+        for statement in program.statements:
+            program.current_statement = statement
+            statement.evaluate(program.root_context)
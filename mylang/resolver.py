@@ -0,0 +1,203 @@
+from .definition_classes import RETURN_FUNCTION
+from .language_errors import LogoRuntimeError
+from .node_classes import FunOperator, ValueAssignment
+from .node_visitor import NodeVisitor
+
+
+class Scope(object):
+    """Variables of function or block, every name has its slot.
+
+    Variables assigned directly in block belong to its scope (like elements
+    of Context created for the block), nested blocks have own scopes.
+    """
+    def __init__(self, nr: int, parent=None, is_function: bool = False):
+        self.nr = nr
+        self.parent = parent
+        self.is_function = is_function
+        self.names = []
+        self.slots = {}
+
+    def declare(self, name: str) -> int:
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = len(self.names)
+            self.slots[name] = slot
+            self.names.append(name)
+        return slot
+
+    def declare_assigned(self, statements: list):
+        for statement in statements:
+            if isinstance(statement, ValueAssignment):
+                self.declare(statement.name)
+
+    def find(self, name: str) -> tuple:
+        """returns (depth, slot) pairs of variables which name can refer to,
+        from innermost scope"""
+        result = []
+        scope = self
+        depth = 0
+        while scope is not None:
+            slot = scope.slots.get(name)
+            if slot is not None:
+                result.append((depth, slot))
+            scope = scope.parent
+            depth += 1
+        return tuple(result)
+
+    def get_scope(self, depth: int):
+        scope = self
+        for _ in range(depth):
+            scope = scope.parent
+        return scope
+
+
+class Resolver(NodeVisitor):
+    """Binds variables of functions and blocks to slots of scopes.
+
+    Which scope has variable defined is known only at runtime (variable
+    is undefined until assigned), so every Identifier and ValueAssignment
+    gets all (depth, slot) pairs its name can refer to, from innermost
+    scope. If none of them is defined, name refers to root context.
+    Depth is counted from scope containing the node, top level statements
+    don't have scope (they use root context).
+
+    Results are kept in dictionaries keyed by nodes:
+    - scopes: FunctionDefinition, IfStatement, WhileStatement and
+      ForStatement to Scope, arguments of function and loop counter take
+      first slots of its scope. Blocks not
+      assigning variables get no scope, they can run in enclosing one.
+    - slots: Identifier and ValueAssignment to tuple of (depth, slot)
+    """
+    def __init__(self):
+        self.scopes = {}
+        self.slots = {}
+        self.scope = None
+        self.scope_count = 0
+
+    def resolve(self, program):
+        for definition in program.definitions:
+            self.visit(definition)
+        for statement in program.statements:
+            self.visit(statement)
+        return self
+
+    def _enter_scope(self, node, statements: list, is_function=False):
+        self.scope_count += 1
+        self.scope = Scope(self.scope_count, self.scope, is_function)
+        self.scopes[node] = self.scope
+        self.scope.declare_assigned(statements)
+        return self.scope
+
+    def _find(self, name: str) -> tuple:
+        return self.scope.find(name) if self.scope else ()
+
+    def visit_FunctionDefinition(self, node):
+        self.scope = None
+        scope = self._enter_scope(node, [], is_function=True)
+        for name in node.arguments:
+            scope.declare(name)
+        scope.declare_assigned(node.block.statements)
+        self.visit(node.block)
+        self.scope = None
+
+    def visit_Block(self, node):
+        for statement in node.statements:
+            self.visit(statement)
+
+    def visit_ValueAssignment(self, node):
+        self.visit(node.expression)
+        self.slots[node] = self._find(node.name)
+
+    def visit_IfStatement(self, node):
+        self.visit(node.condition)
+        blocks = [node.true_block]
+        if node.false_block:
+            blocks.append(node.false_block)
+        outer_scope = self.scope
+        if any(x.defines_variables for x in blocks):
+            self._enter_scope(
+                node, [y for x in blocks for y in x.statements])
+        for block in blocks:
+            self.visit(block)
+        self.scope = outer_scope
+
+    def visit_WhileStatement(self, node):
+        # the first condition check is done in outer context, but variables
+        # of while scope are undefined then, so it gives the same result
+        outer_scope = self.scope
+        if node.block.defines_variables:
+            self._enter_scope(node, node.block.statements)
+        self.visit(node.condition)
+        self.visit(node.block)
+        self.scope = outer_scope
+
+    def visit_ForStatement(self, node):
+        # bounds are evaluated in outer scope, loop always has own scope
+        # with counter
+        self.visit(node.start)
+        self.visit(node.end)
+        self.visit(node.step)
+        outer_scope = self.scope
+        scope = self._enter_scope(node, [])
+        scope.declare(node.variable)
+        scope.declare_assigned(node.block.statements)
+        self.visit(node.block)
+        self.scope = outer_scope
+
+    def visit_LogicalExpression(self, node):
+        for condition in node.and_conditions:
+            self.visit(condition)
+
+    def visit_AndCondition(self, node):
+        for relation in node.relations:
+            self.visit(relation)
+
+    def visit_Relation(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_MathExpression(self, node):
+        for expression in node.add_expressions:
+            self.visit(expression)
+
+    def visit_AddExpression(self, node):
+        for factor in node.factors:
+            self.visit(factor)
+
+    def visit_Factor(self, node):
+        self.visit(node.value)
+
+    def visit_ConstValue(self, node):
+        pass
+
+    def visit_ReturnStatement(self, node):
+        self.visit(node.call)
+
+    def visit_Identifier(self, node):
+        self.slots[node] = self._find(node.name)
+
+    def visit_Value(self, node):
+        self.visit(node.id_value)
+        for operator in node.operators:
+            if isinstance(operator, FunOperator):
+                for argument in operator.arguments:
+                    self.visit(argument)
+
+
+def get_root_lookup(root_context):
+    """Returns function looking up name not bound to any slot, like
+    Context.get called in function or block (function context defines
+    return)."""
+    def lookup(name: str, location, in_function: bool):
+        result = root_context.get_element(name)
+        if result is None and in_function and name == "return":
+            result = RETURN_FUNCTION
+        if result is None:
+            result = root_context.get_definition(name)
+        if result is None:
+            raise LogoRuntimeError(
+                f"Trying to access undefined variable (named {name})",
+                location)
+        return result
+
+    return lookup
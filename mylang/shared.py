@@ -80,6 +80,8 @@ class TokenType(Enum):
     IF = auto()
     ELSE = auto()
     WHILE = auto()
+    FOR = auto()
+    REPEAT = auto()
     OPEN_BLOCK = auto()
     CLOSE_BLOCK = auto()
     OPEN_PAREN = auto()
@@ -99,6 +101,7 @@ class TokenType(Enum):
 
 @dataclass
 class Location:
+    __slots__ = ("line", "char_number")
     line: int
     char_number: int
 
@@ -109,6 +112,7 @@ class Location:
 
 @dataclass
 class Token(object):
+    __slots__ = ("symbol_type", "value", "location")
     symbol_type: TokenType
     value: str
     location: Location
@@ -117,7 +121,7 @@ class Token(object):
                  token_type: TokenType,
                  input_value: str,
                  location: Location = None):
-        if type(token_type) != TokenType:
+        if token_type.__class__ is not TokenType:
             raise TypeError
 
         self.value = input_value
@@ -1,10 +1,24 @@
+import mmap
+import struct
+import tempfile
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass
+from functools import reduce
+from itertools import accumulate, islice
+from math import cos, radians, sin
+from operator import add
+
+from ...language_errors import LogoRuntimeError
+from .spatial_index import SegmentGrid
 
 
 @dataclass
 class TurtlePaths():
     turtle_lines: dict
     turtle_angles: dict
+    # turtles only record commands (see CommandLogPaths)
+    deferred = False
 
     def __init__(self):
         self.turtle_lines = {}
@@ -22,6 +36,414 @@ class TurtlePaths():
         old_x, old_y = self.turtle_lines[turtle_id][-1]
         self.turtle_lines[turtle_id].append((old_x + x, old_y + y))
 
+    def move_turtle_many(self, turtle_id: int, xs: list, ys: list):
+        "moves turtle by every (xs[i], ys[i]) vector, adding points at once"
+        line = self.turtle_lines[turtle_id]
+        old_x, old_y = line[-1]
+        points = zip(accumulate(xs, initial=old_x),
+                     accumulate(ys, initial=old_y))
+        # the first point is the old one
+        line.extend(islice(points, 1, None))
+
     def rotate_turtle(self, turtle_id: int, angle: float):
         """rotates turtle, for angle=None turtle is considered as destroyed."""
         self.turtle_angles[turtle_id] = angle
+
+    def get_columns(self, turtle_id: int) -> tuple:
+        "returns x and y coordinates of points of turtle as two arrays"
+        line = self.turtle_lines[turtle_id]
+        return (array("d", [x for x, _ in line]),
+                array("d", [y for _, y in line]))
+
+    def iter_chunks(self, turtle_id: int):
+        """yields points of turtle as (xs, ys) columns of consecutive
+        chunks, so renderers don't need all points at once"""
+        yield self.get_columns(turtle_id)
+
+    def get_bounds(self) -> tuple:
+        "returns min_x, min_y, max_x, max_y of all points"
+        bounds = None
+        for turtle_id in self.turtle_lines:
+            for xs, ys in self.iter_chunks(turtle_id):
+                chunk = (min(xs), min(ys), max(xs), max(ys))
+                if bounds is None:
+                    bounds = chunk
+                else:
+                    bounds = (min(bounds[0], chunk[0]),
+                              min(bounds[1], chunk[1]),
+                              max(bounds[2], chunk[2]),
+                              max(bounds[3], chunk[3]))
+        return bounds or (0, 0, 0, 0)
+
+    def to_dict(self) -> dict:
+        "returns lines and angles of turtles, ready for JSON serialization"
+        return {
+            "turtle_lines": {
+                x: list(y)
+                for x, y in self.turtle_lines.items()
+            },
+            "turtle_angles": dict(self.turtle_angles),
+        }
+
+
+class PointsView(Sequence):
+    "read-only sequence of (x, y) points, stored in two columns"
+
+    def __init__(self, xs: array, ys: array):
+        self.xs = xs
+        self.ys = ys
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(self.xs[index], self.ys[index]))
+        return (self.xs[index], self.ys[index])
+
+    def __iter__(self):
+        return zip(self.xs, self.ys)
+
+
+class ColumnarPaths(TurtlePaths):
+    """Canvas keeping coordinates of points of every turtle in two
+    array('d') columns: 16 bytes per point, list of (x, y) tuples takes
+    about 112. turtle_lines gives PointsView of columns, get_columns gives
+    columns themselves (they support buffer protocol, so they can be read
+    without copying)."""
+
+    def __init__(self):
+        self.xs = {}
+        self.ys = {}
+        self.turtle_angles = {}
+        self.next_id = 0
+
+    @property
+    def turtle_lines(self) -> dict:
+        return {x: PointsView(self.xs[x], self.ys[x]) for x in self.xs}
+
+    def add_turtle(self, x1: int = 0, y1: int = 0) -> int:
+        turtle_id = self.next_id
+        self.xs[turtle_id] = array("d", (x1, ))
+        self.ys[turtle_id] = array("d", (y1, ))
+        self.turtle_angles[turtle_id] = 0
+        self.next_id += 1
+        return turtle_id
+
+    def move_turtle(self, turtle_id: int, x: float, y: float):
+        # arrays grow by about 1/16 of their size, appending is amortized O(1)
+        xs = self.xs[turtle_id]
+        ys = self.ys[turtle_id]
+        xs.append(xs[-1] + x)
+        ys.append(ys[-1] + y)
+
+    def move_turtle_many(self, turtle_id: int, xs: list, ys: list):
+        column_x = self.xs[turtle_id]
+        column_y = self.ys[turtle_id]
+        column_x.extend(islice(accumulate(xs, initial=column_x[-1]), 1, None))
+        column_y.extend(islice(accumulate(ys, initial=column_y[-1]), 1, None))
+
+    def get_columns(self, turtle_id: int) -> tuple:
+        return self.xs[turtle_id], self.ys[turtle_id]
+
+
+class IndexedPaths(ColumnarPaths):
+    """Columnar canvas with segments of lines in SegmentGrid (index), which
+    is updated with every move, so drawing can be queried for segments in
+    rectangle, nearest segment or intersections while program runs."""
+
+    def __init__(self, cell_size: float = 10, max_cells: int = 64):
+        super().__init__()
+        self.index = SegmentGrid(self, cell_size, max_cells)
+
+    def move_turtle(self, turtle_id: int, x: float, y: float):
+        super().move_turtle(turtle_id, x, y)
+        self._update_index(turtle_id)
+
+    def move_turtle_many(self, turtle_id: int, xs: list, ys: list):
+        super().move_turtle_many(turtle_id, xs, ys)
+        self._update_index(turtle_id)
+
+    def _update_index(self, turtle_id: int):
+        try:
+            self.index.update(turtle_id)
+        except ValueError as err:
+            raise LogoRuntimeError(f"Canvas can't index line: {err}") from err
+
+
+class SpilledLine(Sequence):
+    """Points of one turtle: full chunks in memory-mapped temporary file,
+    the rest in small tail buffer. Coordinates are doubles x, y, x, y...
+
+    File is created by the first spill, so turtles with short lines don't
+    take file descriptors. Only the map keeps the file open (with its own
+    descriptor), the file is removed when the map is closed."""
+
+    def __init__(self, x: float, y: float, chunk_size: int, directory=None):
+        self.directory = directory
+        self.map = None
+        self.chunk_size = chunk_size
+        self.chunks = 0
+        self.tail = array("d", (x, y))
+        self.last_x = x
+        self.last_y = y
+
+    def move(self, x: float, y: float):
+        self.last_x += x
+        self.last_y += y
+        tail = self.tail
+        tail.append(self.last_x)
+        tail.append(self.last_y)
+        if len(tail) == 2 * self.chunk_size:
+            self.spill()
+
+    def spill(self):
+        "moves full tail to the end of file"
+        with memoryview(self.tail).cast("B") as chunk:
+            end = (self.chunks + 1) * len(chunk)
+            if self.map is None or len(self.map) < end:
+                self._grow(end)
+            self.map[end - len(chunk):end] = chunk
+        self.chunks += 1
+        del self.tail[:]
+
+    def _grow(self, size: int):
+        # file grows twice, so it's remapped only log(n) times
+        if self.map is not None:
+            self.map.resize(max(size, 2 * len(self.map)))
+            return
+        with tempfile.TemporaryFile(dir=self.directory) as file:
+            file.truncate(size)
+            self.map = mmap.mmap(file.fileno(), size)
+
+    def iter_chunks(self):
+        """yields (xs, ys) columns of chunks, ones from file are views of
+        the map and must be released before next chunk is spilled"""
+        if self.chunks:
+            size = 2 * self.chunk_size
+            with memoryview(self.map).cast("d") as values:
+                for start in range(0, self.chunks * size, size):
+                    chunk = values[start:start + size]
+                    yield chunk[0::2], chunk[1::2]
+        if self.tail:
+            yield self.tail[0::2], self.tail[1::2]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+
+    def __len__(self) -> int:
+        return self.chunks * self.chunk_size + len(self.tail) // 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[x] for x in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("point index out of range")
+        spilled = self.chunks * self.chunk_size
+        if index < spilled:
+            return struct.unpack_from("dd", self.map, 16 * index)
+        index = 2 * (index - spilled)
+        return (self.tail[index], self.tail[index + 1])
+
+    def __iter__(self):
+        for xs, ys in self.iter_chunks():
+            yield from zip(xs, ys)
+
+
+class SpillingPaths(TurtlePaths):
+    """Canvas for drawings bigger than memory, every turtle has SpilledLine
+    written to temporary file in directory in chunks of chunk_size points.
+    Drawing more than max_points points (16 bytes each) raises
+    LogoRuntimeError."""
+
+    def __init__(self, directory: str = None, chunk_size: int = 65536,
+                 max_points: int = None):
+        super().__init__()
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_points = max_points
+        self.points = 0
+
+    def add_turtle(self, x1: int = 0, y1: int = 0) -> int:
+        self._count_points(1)
+        turtle_id = self.next_id
+        self.turtle_lines[turtle_id] = SpilledLine(x1, y1, self.chunk_size,
+                                                   self.directory)
+        self.turtle_angles[turtle_id] = 0
+        self.next_id += 1
+        return turtle_id
+
+    def move_turtle(self, turtle_id: int, x: float, y: float):
+        self._count_points(1)
+        try:
+            self.turtle_lines[turtle_id].move(x, y)
+        except OSError as err:
+            raise _spill_error(err) from err
+
+    def move_turtle_many(self, turtle_id: int, xs: list, ys: list):
+        self._count_points(len(xs))
+        line = self.turtle_lines[turtle_id]
+        try:
+            for x, y in zip(xs, ys):
+                line.move(x, y)
+        except OSError as err:
+            raise _spill_error(err) from err
+
+    def get_columns(self, turtle_id: int) -> tuple:
+        "loads all points of turtle, iter_chunks should be preferred"
+        xs = array("d")
+        ys = array("d")
+        for chunk_xs, chunk_ys in self.iter_chunks(turtle_id):
+            xs.extend(chunk_xs)
+            ys.extend(chunk_ys)
+        return xs, ys
+
+    def iter_chunks(self, turtle_id: int):
+        return self.turtle_lines[turtle_id].iter_chunks()
+
+    def close(self):
+        "removes files of all turtles"
+        for line in self.turtle_lines.values():
+            line.close()
+
+    def _count_points(self, count: int):
+        self.points += count
+        if self.max_points is not None and self.points > self.max_points:
+            raise LogoRuntimeError(
+                f"Canvas limit of {self.max_points} points exceeded")
+
+
+def _spill_error(err: OSError) -> LogoRuntimeError:
+    "error of program for failed writing to file (no space, no descriptors)"
+    return LogoRuntimeError(
+        f"Canvas can't write points to temporary file: {err.strerror}")
+
+
+# opcodes of commands recorded by turtles on CommandLogPaths, SET_X, SET_Y
+# and SET_ANGLE are also indexes of turtle state [x, y, angle]
+SET_X, SET_Y, SET_ANGLE, FORWARD, ROTATE = range(5)
+
+
+class CommandLogPaths(TurtlePaths):
+    """Canvas on which turtles only record commands.
+
+    Every turtle has flat list of opcode, argument pairs. Points of its line
+    and its state (x, y, angle) are computed from them when they are read:
+    by turtle_lines or turtle_angles (renderers), or by get_state (turtle
+    reading its position). Additions are done in the same order as by
+    Turtle, so results are identical to eager drawing.
+    """
+    deferred = True
+
+    def __init__(self):
+        super().__init__()
+        self.commands = {}
+        # [x, y, angle] of every turtle
+        self.states = {}
+
+    @property
+    def turtle_lines(self) -> dict:
+        self.materialize()
+        return self._lines
+
+    @turtle_lines.setter
+    def turtle_lines(self, value: dict):
+        self._lines = value
+
+    @property
+    def turtle_angles(self) -> dict:
+        self.materialize()
+        return self._angles
+
+    @turtle_angles.setter
+    def turtle_angles(self, value: dict):
+        self._angles = value
+
+    def add_turtle(self, x1: int = 0, y1: int = 0) -> int:
+        turtle_id = self.next_id
+        self._lines[turtle_id] = [(x1, y1)]
+        self._angles[turtle_id] = 0
+        self.commands[turtle_id] = []
+        self.states[turtle_id] = [0, 0, 0]
+        self.next_id += 1
+        return turtle_id
+
+    def get_commands(self, turtle_id: int) -> list:
+        "returns list to which turtle appends its commands"
+        return self.commands[turtle_id]
+
+    def get_state(self, turtle_id: int) -> list:
+        "returns current [x, y, angle] of turtle"
+        self.materialize(turtle_id)
+        return self.states[turtle_id]
+
+    def move_turtle_many(self, turtle_id: int, xs: list, ys: list):
+        "moves turtle (also its state) by every (xs[i], ys[i]) vector"
+        self.materialize(turtle_id)
+        self._add_moves(turtle_id, xs, ys)
+
+    def rotate_turtle(self, turtle_id: int, angle: float):
+        self.materialize(turtle_id)
+        self.states[turtle_id][SET_ANGLE] = angle
+        self._angles[turtle_id] = angle
+
+    def materialize(self, turtle_id: int = None):
+        "runs recorded commands of one or all turtles"
+        ids = self.commands if turtle_id is None else (turtle_id, )
+        for turtle_id in ids:
+            if self.commands[turtle_id]:
+                self._run_commands(turtle_id)
+
+    def _run_commands(self, turtle_id: int):
+        # same arithmetic as Turtle, in one pass (staged computation over
+        # whole lists is slower in pure Python, it allocates more floats)
+        commands = self.commands[turtle_id]
+        state = self.states[turtle_id]
+        x, y, angle = state
+        line = self._lines[turtle_id]
+        add_point = line.append
+        point_x, point_y = line[-1]
+        arguments = iter(commands)
+        for opcode, argument in zip(arguments, arguments):
+            if opcode == FORWARD:
+                move_x = argument * sin(-radians(angle))
+                move_y = argument * cos(-radians(angle))
+                point_x += move_x
+                point_y += move_y
+                add_point((point_x, point_y))
+                x += move_x
+                y += move_y
+            elif opcode == ROTATE:
+                angle = angle + argument
+            elif opcode == SET_ANGLE:
+                angle = argument
+            elif opcode == SET_X:
+                x = argument
+            else:
+                y = argument
+        state[:] = x, y, angle
+        self._angles[turtle_id] = angle
+        commands.clear()
+
+    def _add_moves(self, turtle_id: int, xs: list, ys: list):
+        state = self.states[turtle_id]
+        state[SET_X] = reduce(add, xs, state[SET_X])
+        state[SET_Y] = reduce(add, ys, state[SET_Y])
+        line = self._lines[turtle_id]
+        old_x, old_y = line[-1]
+        points = zip(accumulate(xs, initial=old_x),
+                     accumulate(ys, initial=old_y))
+        line.extend(islice(points, 1, None))
+
+
+# canvas classes which can be used by LogoRootContext
+CANVAS_MODES = {
+    "eager": TurtlePaths,
+    "deferred": CommandLogPaths,
+    "columnar": ColumnarPaths,
+    "spill": SpillingPaths,
+    "indexed": IndexedPaths,
+}
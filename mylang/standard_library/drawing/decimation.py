@@ -0,0 +1,187 @@
+from array import array
+from itertools import islice
+
+from .canvas import ColumnarPaths, TurtlePaths
+
+
+def merge_collinear(xs, ys) -> tuple:
+    """returns lists of coordinates without points lying exactly on the
+    straight move from previous to next one and without repeated points,
+    drawing stays the same"""
+    if len(xs) < 3:
+        return list(xs), list(ys)
+    out_x = [xs[0]]
+    out_y = [ys[0]]
+    last_x, last_y = xs[0], ys[0]
+    middle_x, middle_y = xs[1], ys[1]
+    for x, y in zip(islice(xs, 2, None), islice(ys, 2, None)):
+        ux = middle_x - last_x
+        uy = middle_y - last_y
+        vx = x - middle_x
+        vy = y - middle_y
+        if vx == 0 and vy == 0:
+            continue
+        if (ux == 0 and uy == 0) or (ux * vy == uy * vx
+                                     and ux * vx + uy * vy > 0):
+            middle_x, middle_y = x, y
+            continue
+        out_x.append(middle_x)
+        out_y.append(middle_y)
+        last_x, last_y = middle_x, middle_y
+        middle_x, middle_y = x, y
+    out_x.append(middle_x)
+    out_y.append(middle_y)
+    return out_x, out_y
+
+
+def simplify(xs, ys, tolerance: float, window: int = 1024) -> tuple:
+    """returns lists of coordinates simplified by Douglas-Peucker algorithm,
+    every removed point is closer than tolerance to the new line.
+
+    Line is simplified in parts of window points (their ends are kept),
+    on long curved lines whole line would be scanned again for nearly
+    every kept point.
+    """
+    count = len(xs)
+    if count < 3:
+        return list(xs), list(ys)
+    keep = bytearray(count)
+    limit = tolerance * tolerance
+    ranges = [(x, min(x + window, count - 1))
+              for x in range(0, count - 1, window)]
+    for first, last in ranges:
+        keep[first] = keep[last] = 1
+    while ranges:
+        first, last = ranges.pop()
+        if last - first < 2:
+            continue
+        ax, ay = xs[first], ys[first]
+        dx = xs[last] - ax
+        dy = ys[last] - ay
+        length = dx * dx + dy * dy or 1.0
+        # squared distances to segment (not to line, turtles go back often)
+        distances = []
+        for x, y in zip(xs[first + 1:last], ys[first + 1:last]):
+            t = ((x - ax) * dx + (y - ay) * dy) / length
+            t = 0.0 if t < 0 else 1.0 if t > 1 else t
+            distances.append((x - ax - t * dx)**2 + (y - ay - t * dy)**2)
+        farthest = max(distances)
+        if farthest > limit:
+            index = first + 1 + distances.index(farthest)
+            keep[index] = 1
+            ranges.append((first, index))
+            ranges.append((index, last))
+    return ([x for x, k in zip(xs, keep) if k],
+            [y for y, k in zip(ys, keep) if k])
+
+
+def clip(xs, ys, viewport: tuple) -> list:
+    """returns parts of line without segments lying outside of viewport
+    (min_x, min_y, max_x, max_y) as list of (xs, ys), the last part always
+    ends with the last point"""
+    min_x, min_y, max_x, max_y = viewport
+
+    def outcode(x, y):
+        return ((x < min_x) | (x > max_x) << 1 | (y < min_y) << 2
+                | (y > max_y) << 3)
+
+    parts = []
+    part_x = [xs[0]]
+    part_y = [ys[0]]
+    last_code = outcode(xs[0], ys[0])
+    for x, y in zip(islice(xs, 1, None), islice(ys, 1, None)):
+        code = outcode(x, y)
+        if last_code & code:
+            # both ends on the same outer side
+            if len(part_x) > 1:
+                parts.append((part_x, part_y))
+            part_x = [x]
+            part_y = [y]
+        else:
+            part_x.append(x)
+            part_y.append(y)
+        last_code = code
+    parts.append((part_x, part_y))
+    return parts
+
+
+class DecimatedPaths(ColumnarPaths):
+    """Copy of canvas with simplified lines: collinear moves are merged,
+    lines are simplified with tolerance (in units of drawing) and, if
+    viewport is given, segments outside of it are removed. Parts of line
+    split by clipping get new IDs, without turtles (angle None)."""
+
+    def __init__(self, paths: TurtlePaths, tolerance: float = 0,
+                 viewport: tuple = None):
+        super().__init__()
+        self.tolerance = tolerance
+        self.source_points = 0
+        ids = list(paths.turtle_lines)
+        self.next_id = max(ids) + 1 if ids else 0
+        for turtle_id in ids:
+            xs, ys = paths.get_columns(turtle_id)
+            self.source_points += len(xs)
+            xs, ys = merge_collinear(xs, ys)
+            if tolerance:
+                xs, ys = simplify(xs, ys, tolerance)
+            parts = clip(xs, ys, viewport) if viewport else [(xs, ys)]
+            for part_x, part_y in parts[:-1]:
+                self._add_line(self.next_id, part_x, part_y, None)
+                self.next_id += 1
+            self._add_line(turtle_id, *parts[-1],
+                           paths.turtle_angles[turtle_id])
+
+    def _add_line(self, turtle_id: int, xs: list, ys: list, angle):
+        self.xs[turtle_id] = array("d", xs)
+        self.ys[turtle_id] = array("d", ys)
+        self.turtle_angles[turtle_id] = angle
+
+    def count_points(self) -> int:
+        return sum(len(x) for x in self.xs.values())
+
+
+class LevelsOfDetail(object):
+    """Decimated versions of canvas for displaying it at different scales
+    (pixels per unit of drawing).
+
+    The finest level is exact to pixel_tolerance when the whole drawing
+    is max_size pixels big, tolerance of every next level is twice as big.
+    Levels are built when they are needed, each from the finer one with
+    tolerance of their difference, so errors don't add up beyond
+    tolerance of level.
+    """
+
+    def __init__(self, paths: TurtlePaths, levels: int = 8,
+                 pixel_tolerance: float = 0.5, max_size: int = 8192):
+        self.paths = paths
+        self.pixel_tolerance = pixel_tolerance
+        min_x, min_y, max_x, max_y = paths.get_bounds()
+        finest = pixel_tolerance * max(max_x - min_x, max_y - min_y,
+                                       1) / max_size
+        self.tolerances = [finest * 2**x for x in range(levels)]
+        self.levels = [None] * levels
+
+    def get_level(self, level: int) -> DecimatedPaths:
+        if self.levels[level] is None:
+            if level == 0:
+                self.levels[0] = DecimatedPaths(self.paths,
+                                                self.tolerances[0])
+            else:
+                self.levels[level] = DecimatedPaths(
+                    self.get_level(level - 1),
+                    self.tolerances[level] - self.tolerances[level - 1])
+        return self.levels[level]
+
+    def select(self, scale: float = None,
+               viewport: tuple = None) -> TurtlePaths:
+        """returns the coarsest level exact to pixel_tolerance at scale
+        (any level for scale 0, canvas itself for None or too big scale),
+        clipped to viewport"""
+        paths = self.paths
+        if scale is not None:
+            for level, tolerance in enumerate(self.tolerances):
+                if tolerance * scale <= self.pixel_tolerance:
+                    paths = self.get_level(level)
+        if viewport:
+            paths = DecimatedPaths(paths, 0, viewport)
+        return paths
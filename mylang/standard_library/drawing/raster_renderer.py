@@ -0,0 +1,171 @@
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil, floor
+
+from .canvas import TurtlePaths
+from .renderer import Renderer
+
+BACKGROUND = 255
+
+
+class RasterRenderer(Renderer):
+    """Draws lines of turtles with anti-aliasing (Xiaolin Wu's algorithm)
+    on grayscale image and writes it as PNG, doesn't need display.
+
+    Image is scaled so bigger side of drawing has size pixels. It's split
+    into tiles of tile_size pixels, which are rendered in parallel by pool
+    of workers processes (workers=1 renders in this process). Every pixel
+    is computed from segment itself, so tiles have no seams.
+    """
+    MARGIN = 10
+
+    def __init__(self, paths: TurtlePaths, output: str, size: int = 1024,
+                 tile_size: int = 512, workers: int = None):
+        super().__init__(paths)
+        self.output = output
+        self.size = size
+        self.tile_size = tile_size
+        self.workers = workers
+
+    def render(self):
+        width, height, segments = self.get_segments()
+        write_png(self.output, width, height,
+                  self.rasterize(width, height, segments))
+
+    def get_segments(self) -> tuple:
+        "returns width and height of image and segments in its pixels"
+        lines = []
+        for id in self.paths.turtle_lines:
+            xs = []
+            ys = []
+            for chunk_xs, chunk_ys in self.paths.iter_chunks(id):
+                xs.extend(chunk_xs)
+                ys.extend(chunk_ys)
+            lines.append((xs, ys))
+
+        min_x = min(min(xs) for xs, _ in lines) if lines else 0
+        min_y = min(min(ys) for _, ys in lines) if lines else 0
+        max_x = max(max(xs) for xs, _ in lines) if lines else 0
+        max_y = max(max(ys) for _, ys in lines) if lines else 0
+        scale = (self.size - 2 * self.MARGIN) / max(max_x - min_x,
+                                                    max_y - min_y, 1)
+        width = ceil((max_x - min_x) * scale) + 2 * self.MARGIN
+        height = ceil((max_y - min_y) * scale) + 2 * self.MARGIN
+
+        segments = []
+        for xs, ys in lines:
+            xs = [(x - min_x) * scale + self.MARGIN for x in xs]
+            ys = [(y - min_y) * scale + self.MARGIN for y in ys]
+            segments.extend(zip(xs, ys, xs[1:], ys[1:]))
+        return width, height, segments
+
+    def rasterize(self, width: int, height: int, segments: list) -> bytes:
+        "returns rows of pixels of image"
+        size = self.tile_size
+        columns = ceil(width / size)
+        tiles = {}
+        for segment in segments:
+            # tiles with bounding box of segment, ends of segment are
+            # extended by up to half pixel and drawn 2 pixels wide
+            x0, y0, x1, y1 = segment
+            left = max(floor(min(x0, x1)) - 2, 0) // size
+            right = min(floor(max(x0, x1)) + 2, width - 1) // size
+            top = max(floor(min(y0, y1)) - 2, 0) // size
+            bottom = min(floor(max(y0, y1)) + 2, height - 1) // size
+            for row in range(top, bottom + 1):
+                for column in range(left, right + 1):
+                    tiles.setdefault((row, column), []).append(segment)
+
+        tasks = [(column * size, row * size, min(size, width - column * size),
+                  min(size, height - row * size), tiles.get((row, column), []))
+                 for row in range(ceil(height / size))
+                 for column in range(columns)]
+        if self.workers == 1 or len(tasks) == 1:
+            pixels = [draw_tile(*x) for x in tasks]
+        else:
+            with ProcessPoolExecutor(self.workers) as executor:
+                pixels = list(executor.map(draw_tile, *zip(*tasks)))
+
+        image = bytearray(width * height)
+        for (left, top, tile_width, tile_height, _), tile in zip(tasks, pixels):
+            for y in range(tile_height):
+                start = (top + y) * width + left
+                image[start:start + tile_width] = \
+                    tile[y * tile_width:(y + 1) * tile_width]
+        return bytes(image)
+
+
+def draw_tile(left: int, top: int, width: int, height: int,
+              segments: list) -> bytearray:
+    "returns pixels of tile with its part of segments"
+    pixels = bytearray([BACKGROUND]) * (width * height)
+
+    def plot(x, y, coverage, steep):
+        if steep:
+            x, y = y, x
+        x -= left
+        y -= top
+        if 0 <= x < width and 0 <= y < height:
+            value = BACKGROUND - int(coverage * BACKGROUND + 0.5)
+            if value < pixels[y * width + x]:
+                pixels[y * width + x] = value
+
+    for x0, y0, x1, y1 in segments:
+        steep = abs(y1 - y0) > abs(x1 - x0)
+        if steep:
+            x0, y0, x1, y1 = y0, x0, y1, x1
+            first, last = top, top + height
+        else:
+            first, last = left, left + width
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        gradient = (y1 - y0) / (x1 - x0) if x1 != x0 else 1.0
+
+        # ends of segment
+        start = floor(x0 + 0.5)
+        start_y = y0 + gradient * (start - x0)
+        gap = 1 - (x0 + 0.5 - floor(x0 + 0.5))
+        plot(start, floor(start_y), (1 - start_y % 1) * gap, steep)
+        plot(start, floor(start_y) + 1, start_y % 1 * gap, steep)
+        end = floor(x1 + 0.5)
+        end_y = y1 + gradient * (end - x1)
+        gap = x1 + 0.5 - floor(x1 + 0.5)
+        plot(end, floor(end_y), (1 - end_y % 1) * gap, steep)
+        plot(end, floor(end_y) + 1, end_y % 1 * gap, steep)
+
+        # only columns (rows of steep segment) of this tile, plot inlined
+        if steep:
+            minor_start, minor_size, step, stride = left, width, width, 1
+        else:
+            minor_start, minor_size, step, stride = top, height, 1, width
+        for x in range(max(start + 1, first), min(end, last)):
+            y = start_y + gradient * (x - start)
+            minor = floor(y) - minor_start
+            index = (x - first) * step + minor * stride
+            fraction = y % 1
+            if 0 <= minor < minor_size:
+                value = BACKGROUND - int((1 - fraction) * BACKGROUND + 0.5)
+                if value < pixels[index]:
+                    pixels[index] = value
+            if -1 <= minor < minor_size - 1:
+                value = BACKGROUND - int(fraction * BACKGROUND + 0.5)
+                if value < pixels[index + stride]:
+                    pixels[index + stride] = value
+    return pixels
+
+
+def write_png(path: str, width: int, height: int, pixels: bytes):
+    "writes 8-bit grayscale image"
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data +
+                struct.pack(">I", zlib.crc32(kind + data)))
+
+    rows = b"".join(b"\x00" + pixels[x * width:(x + 1) * width]
+                    for x in range(height))
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(chunk(b"IHDR",
+                         struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+        file.write(chunk(b"IDAT", zlib.compress(rows)))
+        file.write(chunk(b"IEND", b""))
@@ -2,6 +2,10 @@ from abc import ABC, abstractmethod
 
 from .canvas import TurtlePaths
 
+# modes of drawing lines by WindowRenderer, path is much faster for big
+# drawings
+RENDER_MODES = ("path", "segments")
+
 
 class Renderer(ABC):
     def __init__(self, paths: TurtlePaths):
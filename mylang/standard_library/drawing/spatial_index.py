@@ -0,0 +1,274 @@
+from math import ceil, floor, hypot, isfinite
+
+
+class SegmentGrid(object):
+    """Uniform grid of segments of lines of turtles.
+
+    Segment is keyed by (turtle_id, index), it goes from point index to
+    point index + 1 of line. It's registered in every cell of size
+    cell_size which it crosses, so queries only test segments from cells
+    near the area they ask about. Segments which would be in more than
+    max_cells cells are kept in overflow list instead, and every query
+    tests them, so a long move costs as much as a short one. Coordinates
+    are read from canvas (paths), update() indexes segments added since
+    its previous call.
+    """
+
+    def __init__(self, paths, cell_size: float = 10, max_cells: int = 64):
+        self.paths = paths
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells = {}  # (column, row): list of (turtle_id, index)
+        self.overflow = []  # (turtle_id, index) of long segments
+        self.counts = {}  # turtle_id: number of indexed points
+        # columns and rows of used cells, min_column, min_row, max_...
+        self.bounds = None
+
+    def update(self, turtle_id: int = None):
+        "indexes new segments of one or all turtles"
+        ids = self.paths.turtle_lines if turtle_id is None else (turtle_id, )
+        for turtle_id in ids:
+            xs, ys = self.paths.get_columns(turtle_id)
+            first = max(self.counts.get(turtle_id, 1) - 1, 0)
+            for index in range(first, len(xs) - 1):
+                self.add_segment(turtle_id, index, xs[index], ys[index],
+                                 xs[index + 1], ys[index + 1])
+            self.counts[turtle_id] = len(xs)
+
+    def add_segment(self, turtle_id: int, index: int, x0: float, y0: float,
+                    x1: float, y1: float):
+        "raises ValueError for infinite or NaN coordinates"
+        if not (isfinite(x0) and isfinite(y0) and isfinite(x1)
+                and isfinite(y1)):
+            raise ValueError(
+                f"segment ({x0}, {y0}) - ({x1}, {y1}) isn't finite")
+        size = self.cell_size
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        key = (turtle_id, index)
+        try:
+            first_column = floor(x0 / size)
+            last_column = floor(x1 / size)
+            # straight segment crosses at most that many cells
+            cells = (last_column - first_column + 1
+                     + abs(floor(y1 / size) - floor(y0 / size)))
+        except OverflowError:
+            # too far to number cells
+            cells = None
+        if cells is None or cells > self.max_cells:
+            self.overflow.append(key)
+            return
+        slope = (y1 - y0) / (x1 - x0) if x1 != x0 else None
+        for column in range(first_column, last_column + 1):
+            if x1 == x0:
+                start_y, end_y = y0, y1
+            else:
+                # part of segment in the column
+                start_y = y0 + slope * (max(column * size, x0) - x0)
+                end_y = y0 + slope * (min((column + 1) * size, x1) - x0)
+            first_row = floor(min(start_y, end_y) / size)
+            last_row = floor(max(start_y, end_y) / size)
+            for row in range(first_row, last_row + 1):
+                self.cells.setdefault((column, row), []).append(key)
+            self._extend_bounds(column, first_row, last_row)
+
+    def _extend_bounds(self, column: int, first_row: int, last_row: int):
+        if self.bounds is None:
+            self.bounds = (column, first_row, column, last_row)
+        else:
+            min_column, min_row, max_column, max_row = self.bounds
+            self.bounds = (min(min_column, column), min(min_row, first_row),
+                           max(max_column, column), max(max_row, last_row))
+
+    def get_segment(self, key: tuple) -> tuple:
+        "returns x0, y0, x1, y1 of segment"
+        turtle_id, index = key
+        xs, ys = self.paths.get_columns(turtle_id)
+        return xs[index], ys[index], xs[index + 1], ys[index + 1]
+
+    def query(self, viewport: tuple) -> list:
+        """returns sorted keys of segments which have any point in viewport
+        (min_x, min_y, max_x, max_y)"""
+        found = {
+            key for key in self.overflow
+            if segment_in_rectangle(*self.get_segment(key), *viewport)
+        }
+        if self.bounds is None:
+            return sorted(found)
+        size = self.cell_size
+        min_x, min_y, max_x, max_y = viewport
+        min_column, min_row, max_column, max_row = self.bounds
+        tested = set()
+        for column in range(max(floor(min_x / size), min_column),
+                            min(floor(max_x / size), max_column) + 1):
+            for row in range(max(floor(min_y / size), min_row),
+                             min(floor(max_y / size), max_row) + 1):
+                for key in self.cells.get((column, row), ()):
+                    if key in tested:
+                        continue
+                    tested.add(key)
+                    if segment_in_rectangle(*self.get_segment(key),
+                                            *viewport):
+                        found.add(key)
+        return sorted(found)
+
+    def nearest(self, x: float, y: float, max_distance: float = None):
+        """returns (distance, turtle_id, index) of segment nearest to point,
+        or None if there is no segment (closer than max_distance)"""
+        best = None
+        for key in self.overflow:
+            distance = distance_to_segment(x, y, *self.get_segment(key))
+            if best is None or (distance, *key) < best:
+                best = (distance, *key)
+        if self.bounds is not None:
+            best = self._nearest_in_cells(x, y, max_distance, best)
+        if best is None or (max_distance is not None
+                            and best[0] > max_distance):
+            return None
+        return best
+
+    def _nearest_in_cells(self, x: float, y: float, max_distance: float,
+                          best: tuple) -> tuple:
+        "returns segment from cells nearer than best, if there is one"
+        size = self.cell_size
+        column = floor(x / size)
+        row = floor(y / size)
+        min_column, min_row, max_column, max_row = self.bounds
+        last_ring = max(abs(column - min_column), abs(column - max_column),
+                        abs(row - min_row), abs(row - max_row))
+        if max_distance is not None:
+            last_ring = min(last_ring, ceil(max_distance / size) + 1)
+        tested = set()
+        for ring in range(last_ring + 1):
+            # cells of ring are at least ring - 1 cells away from point
+            if best is not None and best[0] <= (ring - 1) * size:
+                break
+            for cell in self._ring_cells(column, row, ring):
+                for key in self.cells.get(cell, ()):
+                    if key in tested:
+                        continue
+                    tested.add(key)
+                    distance = distance_to_segment(x, y,
+                                                   *self.get_segment(key))
+                    if best is None or (distance, *key) < best:
+                        best = (distance, *key)
+        return best
+
+    def _ring_cells(self, column: int, row: int, ring: int):
+        "yields used cells in distance of ring cells from (column, row)"
+        min_column, min_row, max_column, max_row = self.bounds
+        if ring == 0:
+            yield column, row
+            return
+        columns = range(max(column - ring, min_column),
+                        min(column + ring, max_column) + 1)
+        for side_row in (row - ring, row + ring):
+            if min_row <= side_row <= max_row:
+                for x in columns:
+                    yield x, side_row
+        for side_column in (column - ring, column + ring):
+            if min_column <= side_column <= max_column:
+                for y in range(max(row - ring + 1, min_row),
+                               min(row + ring - 1, max_row) + 1):
+                    yield side_column, y
+
+    def count_intersections(self, turtle_id: int = None) -> int:
+        """returns number of pairs of segments having common point, without
+        consecutive segments of line, only pairs of segments of turtle if
+        turtle_id is given"""
+        pairs = set()
+        for keys in self.cells.values():
+            if turtle_id is not None:
+                keys = [x for x in keys if x[0] == turtle_id]
+            for position, first in enumerate(keys):
+                for second in keys[position + 1:]:
+                    self._add_pair(pairs, first, second)
+        overflow = [
+            x for x in self.overflow if turtle_id is None or x[0] == turtle_id
+        ]
+        if overflow:
+            # long segments are tested with all other segments
+            others = set(overflow)
+            for keys in self.cells.values():
+                others.update(x for x in keys
+                              if turtle_id is None or x[0] == turtle_id)
+            for first in overflow:
+                for second in others:
+                    if first != second:
+                        self._add_pair(pairs, first, second)
+        return len(pairs)
+
+    def _add_pair(self, pairs: set, first: tuple, second: tuple):
+        "adds pair of segments to pairs if they intersect"
+        pair = (first, second) if first < second else (second, first)
+        if pair in pairs or self._consecutive(*pair):
+            return
+        if segments_intersect(*self.get_segment(first),
+                              *self.get_segment(second)):
+            pairs.add(pair)
+
+    def _consecutive(self, first: tuple, second: tuple) -> bool:
+        "checks if there are only moves by 0 between segments of line"
+        if first[0] != second[0]:
+            return False
+        xs, ys = self.paths.get_columns(first[0])
+        end = first[1] + 1
+        return all(xs[x] == xs[end] and ys[x] == ys[end]
+                   for x in range(end + 1, second[1] + 1))
+
+
+def segment_in_rectangle(x0: float, y0: float, x1: float, y1: float,
+                         min_x: float, min_y: float, max_x: float,
+                         max_y: float) -> bool:
+    "checks if segment has any point in rectangle (Liang-Barsky clipping)"
+    start, end = 0.0, 1.0
+    dx = x1 - x0
+    dy = y1 - y0
+    for direction, space in ((-dx, x0 - min_x), (dx, max_x - x0),
+                             (-dy, y0 - min_y), (dy, max_y - y0)):
+        if direction == 0:
+            if space < 0:
+                return False
+            continue
+        t = space / direction
+        if direction < 0:
+            start = max(start, t)
+        else:
+            end = min(end, t)
+        if start > end:
+            return False
+    return True
+
+
+def distance_to_segment(x: float, y: float, x0: float, y0: float, x1: float,
+                        y1: float) -> float:
+    dx = x1 - x0
+    dy = y1 - y0
+    length = dx * dx + dy * dy
+    t = ((x - x0) * dx + (y - y0) * dy) / length if length else 0.0
+    t = 0.0 if t < 0 else 1.0 if t > 1 else t
+    return hypot(x - x0 - t * dx, y - y0 - t * dy)
+
+
+def segments_intersect(ax: float, ay: float, bx: float, by: float, cx: float,
+                       cy: float, dx: float, dy: float) -> bool:
+    "checks if segments AB and CD have common point"
+    def side(px, py, qx, qy, rx, ry):
+        value = (qx - px) * (ry - py) - (qy - py) * (rx - px)
+        return (value > 0) - (value < 0)
+
+    def between(px, py, qx, qy, rx, ry):
+        "checks if R, collinear with PQ, lies on it"
+        return (min(px, qx) <= rx <= max(px, qx)
+                and min(py, qy) <= ry <= max(py, qy))
+
+    c_side = side(ax, ay, bx, by, cx, cy)
+    d_side = side(ax, ay, bx, by, dx, dy)
+    a_side = side(cx, cy, dx, dy, ax, ay)
+    b_side = side(cx, cy, dx, dy, bx, by)
+    if c_side != d_side and a_side != b_side:
+        return True
+    return ((c_side == 0 and between(ax, ay, bx, by, cx, cy))
+            or (d_side == 0 and between(ax, ay, bx, by, dx, dy))
+            or (a_side == 0 and between(cx, cy, dx, dy, ax, ay))
+            or (b_side == 0 and between(cx, cy, dx, dy, bx, by)))
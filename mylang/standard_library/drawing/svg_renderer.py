@@ -0,0 +1,101 @@
+import sys
+
+from .canvas import TurtlePaths
+from .renderer import Renderer
+
+
+class SvgRenderer(Renderer):
+    """Writes drawing as SVG document, with one <path> per turtle.
+
+    Coordinates are rounded to precision decimal digits. Relative
+    commands (l) are differences of rounded coordinates, so errors of
+    rounding don't accumulate. iter_svg() generates document in parts of
+    points_per_chunk points, whole document is never kept in memory.
+    """
+    MARGIN = 10
+    # the same shape as in WindowRenderer
+    TURTLE_PATH = "M0 0 5-5 0 5-5-5z"
+
+    def __init__(self, paths: TurtlePaths, stream=None, precision: int = 2,
+                 relative: bool = True, points_per_chunk: int = 1000):
+        super().__init__(paths)
+        self.stream = stream or sys.stdout
+        self.precision = precision
+        self.relative = relative
+        self.points_per_chunk = points_per_chunk
+        self.scale = 10**precision
+
+    def render(self):
+        for part in self.iter_svg():
+            self.stream.write(part)
+
+    def iter_svg(self):
+        "yields parts of SVG document"
+        min_x, min_y, max_x, max_y = self.paths.get_bounds()
+        view_box = " ".join(
+            self.format(round(x * self.scale))
+            for x in (min_x - self.MARGIN, min_y - self.MARGIN,
+                      max_x - min_x + 2 * self.MARGIN,
+                      max_y - min_y + 2 * self.MARGIN))
+        yield (f'<svg xmlns="http://www.w3.org/2000/svg" '
+               f'viewBox="{view_box}">\n<g fill="none" stroke="black">\n')
+        turtles = []
+        for id in self.paths.turtle_lines:
+            yield '<path vector-effect="non-scaling-stroke" d="'
+            end = yield from self.iter_path_data(id)
+            yield '"/>\n'
+            angle = self.paths.turtle_angles[id]
+            if angle is not None:
+                turtles.append((*end, angle))
+        yield '</g>\n<g fill="red" stroke="blue">\n'
+        for x, y, angle in turtles:
+            yield (f'<path d="{self.TURTLE_PATH}" transform="translate('
+                   f'{self.format(x)} {self.format(y)}) rotate({angle})"/>\n')
+        yield "</g>\n</svg>\n"
+
+    def iter_path_data(self, id) -> tuple:
+        """yields path data of line of turtle, returns its last point in
+        rounded coordinates"""
+        scale = self.scale
+        format = self.format
+        command = "l" if self.relative else "L"
+        numbers = []
+        last_x = last_y = None
+        for xs, ys in self.paths.iter_chunks(id):
+            for x, y in zip(xs, ys):
+                x = round(x * scale)
+                y = round(y * scale)
+                if last_x is None:
+                    yield f"M{format(x)} {format(y)}"
+                elif x == last_x and y == last_y:
+                    # move not visible with this precision
+                    continue
+                elif self.relative:
+                    numbers.append(format(x - last_x))
+                    numbers.append(format(y - last_y))
+                else:
+                    numbers.append(format(x))
+                    numbers.append(format(y))
+                last_x = x
+                last_y = y
+                if len(numbers) >= 2 * self.points_per_chunk:
+                    yield command + " ".join(numbers)
+                    command = " "
+                    numbers = []
+        if numbers:
+            yield command + " ".join(numbers)
+        return last_x, last_y
+
+    def format(self, value: int) -> str:
+        "returns shortest text of value / 10**precision"
+        if not self.precision:
+            return str(value)
+        text = f"{value / self.scale:.{self.precision}f}".rstrip("0")
+        if text.endswith("."):
+            return text[:-1]
+        # 0.5 -> .5
+        if text.startswith("0"):
+            return text[1:]
+        if text.startswith("-0"):
+            return "-" + text[2:]
+        return text
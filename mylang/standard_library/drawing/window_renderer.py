@@ -1,10 +1,11 @@
 import sys
 
 from .canvas import TurtlePaths
-from .renderer import Renderer
+from .decimation import LevelsOfDetail
+from .renderer import RENDER_MODES, Renderer
 
 from PyQt5.QtCore import Qt, QPointF
-from PyQt5.QtGui import QPen, QBrush, QPainterPath
+from PyQt5.QtGui import QPen, QBrush, QPainterPath, QPolygonF
 from PyQt5.QtWidgets import QGraphicsScene, QWidget, QGraphicsView, QVBoxLayout
 
 from PyQt5.QtWidgets import QApplication
@@ -21,10 +22,33 @@ class CanvasWidget(QGraphicsScene):
     def draw_line(self, x1, y1, x2, y2):
         self.addLine(x1, y1, x2, y2, self.pen)
 
+    def draw_polyline(self, points: list):
+        "draws lines through QPointFs as one item"
+        path = QPainterPath()
+        path.addPolygon(QPolygonF(points))
+        self.addPath(path, self.pen)
+
+    def fit_to_items(self, margin: float):
+        "makes scene rect the bounds of drawing, if there is any"
+        rect = self.itemsBoundingRect()
+        if not rect.isEmpty():
+            self.setSceneRect(rect.adjusted(-margin, -margin, margin, margin))
+
 
 class WindowRenderer(Renderer):
-    def __init__(self, paths: TurtlePaths):
+    # points in one QPainterPath, long lines are split into few paths
+    PATH_CHUNK = 10000
+    MARGIN = 10
+
+    def __init__(self, paths: TurtlePaths, mode: str = "path",
+                 lod: bool = True):
         super().__init__(paths)
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {mode}")
+        self.mode = mode
+        # draws decimated lines, the coarsest ones exact at scale of view
+        self.levels = None
+        self.lod = lod
 
     def render(self):
         app = QApplication(sys.argv)
@@ -33,31 +57,74 @@ class WindowRenderer(Renderer):
         w = QWidget()
         view = QGraphicsView()
         view.setScene(scene)
-        view.resizeEvent = lambda x: view.fitInView(scene.sceneRect(), Qt.
-                                                    KeepAspectRatio)
+        view.resizeEvent = lambda x: self.fit_view(view, scene)
 
         layout = QVBoxLayout()
         layout.addWidget(view)
         w.setLayout(layout)
 
+        if self.lod:
+            self.levels = LevelsOfDetail(self.paths)
+            # the coarsest level, until scale of view is known
+            self.paths = self.levels.select(0)
         self.draw_lines(scene)
+        scene.fit_to_items(self.MARGIN)
 
         w.show()
         sys.exit(app.exec_())
 
+    def fit_view(self, view: QGraphicsView, scene: CanvasWidget):
+        "scales drawing to view and redraws it with level of detail for scale"
+        view.fitInView(scene.sceneRect(), Qt.KeepAspectRatio)
+        if self.levels is None:
+            return
+        paths = self.levels.select(view.transform().m11())
+        if paths is not self.paths:
+            self.paths = paths
+            scene.clear()
+            self.draw_lines(scene)
+
     def draw_lines(self, scene: CanvasWidget):
         for id, turtle_lines in self.paths.turtle_lines.items():
-            start_x = None
-            start_y = None
-            for x, y in turtle_lines:
-                if start_x is not None:
-                    scene.draw_line(start_x, start_y, x, y)
-                start_x = x
-                start_y = y
-            self.draw_turtle(scene, id, start_x, start_y)
+            if self.mode == "path":
+                x, y = self.draw_path(scene, id)
+            else:
+                x, y = self.draw_segments(scene, turtle_lines)
+            self.draw_turtle(scene, id, x, y)
+
+    def draw_path(self, scene: CanvasWidget, id) -> tuple:
+        """draws line of turtle as paths of PATH_CHUNK points, returns its
+        last point (None, None if line has no points)"""
+        points = []
+        for xs, ys in self.paths.iter_chunks(id):
+            for x, y in zip(xs, ys):
+                points.append(QPointF(x, y))
+                if len(points) == self.PATH_CHUNK:
+                    scene.draw_polyline(points)
+                    # next path starts where this one ends
+                    points = [points[-1]]
+        if not points:
+            return None, None
+        if len(points) > 1:
+            scene.draw_polyline(points)
+        return points[-1].x(), points[-1].y()
+
+    def draw_segments(self, scene: CanvasWidget, turtle_lines) -> tuple:
+        "draws every segment of line as separate item, returns last point"
+        start_x = None
+        start_y = None
+        for x, y in turtle_lines:
+            if start_x is not None:
+                scene.draw_line(start_x, start_y, x, y)
+            start_x = x
+            start_y = y
+        return start_x, start_y
 
     def draw_turtle(self, scene: CanvasWidget, id, x, y):
-        if angle := self.paths.turtle_angles[id] is not None:
+        if x is None:
+            # turtle without points of line has no position to draw at
+            return
+        if (angle := self.paths.turtle_angles[id]) is not None:
             path = QPainterPath(QPointF(0, 0))
             path.lineTo(QPointF(5, -5))
             path.lineTo(QPointF(0, 5))
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from math import sin, cos, radians
+from math import floor, sin, cos, radians
 
-from ..base_nodes import BaseFunctionDefinition, BaseObject
+from ..base_nodes import BaseFunctionDefinition, BaseObject, native_method
 from ..context import RootContext, Context
+from ..language_errors import LogoRuntimeError
 from ..shared import Location
 
-from .drawing.canvas import TurtlePaths
+from .drawing.canvas import (FORWARD, ROTATE, SET_ANGLE, SET_X, SET_Y,
+                             CommandLogPaths, TurtlePaths)
 
 
 class Turtle(BaseObject):
+    # bound methods would make reference cycles, delaying __del__
+    cache_bound_methods = False
+
     def __init__(self, canvas: TurtlePaths = None):
         self.x = 0
         self.y = 0
@@ -19,89 +24,202 @@ class Turtle(BaseObject):
         self.name = "Turtle"
 
     def __del__(self):
-        self.angle = None
-        self.canvas.rotate_turtle(self.turtle_id, None)
-
-    def get_field(self, name: str):
-        FIELDS = {
-            "get_x": GetterFunction(self, "x"),
-            "get_y": GetterFunction(self, "y"),
-            "get_angle": GetterFunction(self, "angle"),
-            "fd": MovementFunction(self),
-            "rotate": SetFunction(self, "rotate"),
-            "set_angle": SetFunction(self, "angle"),
-            "set_x": SetFunction(self, "x"),
-            "set_y": SetFunction(self, "y"),
-        }
-        return FIELDS[name]
+        # adding turtle to canvas could fail in __init__
+        if hasattr(self, "turtle_id"):
+            self.angle = None
+            self.canvas.rotate_turtle(self.turtle_id, None)
 
     def evaluate(self, context: Context):
         return self
 
+    @native_method("get_x")
+    def get_x(self):
+        return self.x
+
+    @native_method("get_y")
+    def get_y(self):
+        return self.y
+
+    @native_method("get_angle")
+    def get_angle(self):
+        return self.angle
+
+    @native_method("fd", 1)
+    def forward(self, distance):
+        if type(distance) is not float:
+            _check_number(distance)
+        x = distance * sin(-radians(self.angle))
+        y = distance * cos(-radians(self.angle))
+        self.canvas.move_turtle(self.turtle_id, x, y)
+        self.x += x
+        self.y += y
+
+    @native_method("rotate", 1)
+    def rotate(self, angle):
+        if type(angle) is not float:
+            _check_number(angle)
+        self.set_angle(self.angle + angle)
+
+    @native_method("set_angle", 1)
+    def set_angle(self, angle):
+        if type(angle) is not float:
+            _check_number(angle)
+        self.angle = angle
+        self.canvas.rotate_turtle(self.turtle_id, angle)
+
+    @native_method("set_x", 1)
+    def set_x(self, x):
+        if type(x) is not float:
+            _check_number(x)
+        self.x = x
+
+    @native_method("set_y", 1)
+    def set_y(self, y):
+        if type(y) is not float:
+            _check_number(y)
+        self.y = y
+
+    @native_method("poly", 2)
+    def poly(self, sides, side):
+        "same as repeat(sides) { fd(side) rotate(360 / sides) }"
+        _check_numbers(sides, side)
+        if sides <= 0:
+            raise LogoRuntimeError(
+                f"Number of sides of polygon must be positive, not {sides}")
+        turn = 360 / sides
+        count = floor(sides)
+        self._trace([side] * count,
+                    [self.angle + x * turn for x in range(count)],
+                    self.angle + count * turn)
+
+    @native_method("arc", 3)
+    def arc(self, radius, degrees, steps):
+        """draws arc of circle with given radius as steps chords, same as
+        repeat(steps) { rotate(w / 2) fd(chord) rotate(w / 2) }
+        where w = degrees / steps"""
+        _check_numbers(radius, degrees, steps)
+        if steps <= 0:
+            raise LogoRuntimeError(
+                f"Number of steps of arc must be positive, not {steps}")
+        turn = degrees / steps
+        count = floor(steps)
+        chord = 2 * radius * sin(radians(turn) / 2)
+        self._trace([chord] * count,
+                    [self.angle + (x + 0.5) * turn for x in range(count)],
+                    self.angle + count * turn)
+
+    @native_method("polyline", None)
+    def polyline(self, *moves):
+        """takes pairs of distance and angle, same as fd(distance)
+        rotate(angle) for every pair"""
+        if len(moves) % 2:
+            raise LogoRuntimeError(
+                "polyline takes pairs of distance and angle, got "
+                f"{len(moves)} arguments")
+        _check_numbers(*moves)
+        distances = moves[0::2]
+        angles = [self.angle]
+        for turn in moves[1::2]:
+            angles.append(angles[-1] + turn)
+        self._trace(distances, angles[:-1], angles[-1])
+
+    def _trace(self, distances: list, angles: list, end_angle):
+        """moves turtle forward by every distance, with direction given
+        by angles, all points are added to canvas at once"""
+        if distances:
+            xs = [d * sin(-radians(a)) for d, a in zip(distances, angles)]
+            ys = [d * cos(-radians(a)) for d, a in zip(distances, angles)]
+            self.canvas.move_turtle_many(self.turtle_id, xs, ys)
+            self.x += sum(xs)
+            self.y += sum(ys)
+        self.set_angle(end_angle)
+
     def __str__(self, depth=0):
         return "\t" * depth + f"Turtle (x: {self.x}, y: {self.y} angle: {self.angle})"
 
 
-class TurtleConstructor(BaseFunctionDefinition):
-    def __init__(self, logo_context):
-        super().__init__(Location(0, 0), "Turtle")
-        self.logo_context = logo_context
+class DeferredTurtle(Turtle):
+    """Turtle drawing on CommandLogPaths. Its methods only append commands
+    to list of canvas, reading position or angle makes canvas run them."""
 
-    def execute(self, values: list, root_context: RootContext):
-        self.validate_arguments(values, 0)
-        return Turtle(canvas=self.logo_context.canvas)
+    def __init__(self, canvas: CommandLogPaths):
+        self.canvas = canvas
+        self.turtle_id = self.canvas.add_turtle()
+        self.commands = self.canvas.get_commands(self.turtle_id)
+        self.name = "Turtle"
 
+    def __del__(self):
+        if hasattr(self, "turtle_id"):
+            self.canvas.rotate_turtle(self.turtle_id, None)
 
-class GetterFunction(BaseFunctionDefinition):
-    GETTERS = {
-        "x": lambda turtle: turtle.x,
-        "y": lambda turtle: turtle.y,
-        "angle": lambda turtle: turtle.angle
-    }
+    @property
+    def x(self):
+        return self.canvas.get_state(self.turtle_id)[SET_X]
 
-    def __init__(self, turtle: Turtle, var_name: str):
-        super().__init__(name=var_name)
-        self.turtle = turtle
+    @x.setter
+    def x(self, x):
+        self.commands.extend((SET_X, x))
 
-    def execute(self, values: list, root_context: RootContext):
-        self.validate_arguments(values, 0)
-        return self.GETTERS[self.name](self.turtle)
+    @property
+    def y(self):
+        return self.canvas.get_state(self.turtle_id)[SET_Y]
 
+    @y.setter
+    def y(self, y):
+        self.commands.extend((SET_Y, y))
 
-class SetFunction(BaseFunctionDefinition):
-    def __init__(self, turtle: Turtle, var_name: str):
-        super().__init__(name=var_name)
-        self.turtle = turtle
+    @property
+    def angle(self):
+        return self.canvas.get_state(self.turtle_id)[SET_ANGLE]
 
-    def execute(self, values: list, root_context: RootContext):
-        self.validate_arguments(values, 1)
-
-        if self.name == "x":
-            self.turtle.x = values[0]
-        elif self.name == "y":
-            self.turtle.y = values[0]
-        elif self.name == "angle":
-            self.turtle.angle = values[0]
-            self.turtle.canvas.rotate_turtle(self.turtle.turtle_id,
-                                             self.turtle.angle)
-        elif self.name == "rotate":
-            self.turtle.angle = self.turtle.angle + values[0]
-            self.turtle.canvas.rotate_turtle(self.turtle.turtle_id,
-                                             self.turtle.angle)
-
-
-class MovementFunction(BaseFunctionDefinition):
-    def __init__(self, turtle: Turtle):
-        super().__init__(name="fd")
-        self.turtle = turtle
+    @native_method("fd", 1)
+    def forward(self, distance):
+        if type(distance) is not float:
+            _check_number(distance)
+        self.commands.extend((FORWARD, distance))
+
+    @native_method("rotate", 1)
+    def rotate(self, angle):
+        if type(angle) is not float:
+            _check_number(angle)
+        self.commands.extend((ROTATE, angle))
+
+    @native_method("set_angle", 1)
+    def set_angle(self, angle):
+        if type(angle) is not float:
+            _check_number(angle)
+        self.commands.extend((SET_ANGLE, angle))
+
+    def _trace(self, distances: list, angles: list, end_angle):
+        if distances:
+            xs = [d * sin(-radians(a)) for d, a in zip(distances, angles)]
+            ys = [d * cos(-radians(a)) for d, a in zip(distances, angles)]
+            # canvas moves state of turtle too
+            self.canvas.move_turtle_many(self.turtle_id, xs, ys)
+        self.set_angle(end_angle)
+
+
+def _check_number(value):
+    """deferred commands are run later, so wrong argument must be found when
+    recorded, eager turtle checks it too to raise the same error"""
+    if not isinstance(value, (int, float)):
+        raise LogoRuntimeError(f"Turtle expects number, not {value}")
+
+
+def _check_numbers(*values):
+    for value in values:
+        if type(value) is not float:
+            _check_number(value)
+
+
+class TurtleConstructor(BaseFunctionDefinition):
+    def __init__(self, logo_context):
+        super().__init__(Location(0, 0), "Turtle")
+        self.logo_context = logo_context
 
     def execute(self, values: list, root_context: RootContext):
-        self.validate_arguments(values, 1)
-        id = self.turtle.turtle_id
-        canvas = self.turtle.canvas
-        distance = values[0]
-        x = distance * sin(-radians(self.turtle.angle))
-        y = distance * cos(-radians(self.turtle.angle))
-        canvas.move_turtle(id, x, y)
-        self.turtle.x += x
-        self.turtle.y += y
+        self.validate_arguments(values, 0)
+        canvas = self.logo_context.canvas
+        if canvas.deferred:
+            return DeferredTurtle(canvas)
+        return Turtle(canvas=canvas)
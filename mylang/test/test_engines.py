@@ -0,0 +1,592 @@
+#!/usr/bin/python3
+
+import itertools
+import os
+import pytest
+
+from ..base_nodes import BaseFunctionDefinition, BaseObject, native_method
+from ..language_errors import BaseLanguageException, LogoRuntimeError
+from ..memoization import FunctionMemo, PurityAnalyzer
+from ..optimizer import AstOptimizer, count_nodes
+from ..parser_logo import Parser
+from ..program import EXECUTION_ENGINES
+from ..resolver import Resolver
+from ..shared import (Location, StringLogger, get_global_logger,
+                      set_global_logger)
+from ..standard_library.drawing.canvas import (CANVAS_MODES, ColumnarPaths,
+                                              CommandLogPaths, SpillingPaths)
+from ..standard_library.turtle_object import Turtle
+from ..transpiler import PythonTranspiler
+from .testing_utils import generate_lexer
+
+TESTFILE_PATH = os.path.dirname(
+    os.path.realpath(__file__)) + "/../../testfile.logo"
+
+PROGRAMS = [
+    "x=6234 y=x*2-1 z=!32>43-32||3 w=1!=2 v=43/32",
+    'a = "text" + "s" b = a == "texts" && 2 >= 2 c = -(3 - 5) * 2',
+    """x = 0
+    y = 0
+    while(x < 10)
+    {
+        inner = x
+        y = y + inner
+        x = x + 1
+    }""",
+    "x=0 if(23+3>1){x=1 local=3} else{x=2} if(x==5){x=7}else{x=8 z=1}",
+    """glob=0
+    x=-3
+    fun foo(x)
+    {
+        x=x+3
+        glob=x
+    }
+    foo(11)
+    """,
+    """fun fib(num)
+    {
+        if(num<=1){
+            return(1)
+        }
+        return(fib(num-1)+fib(num-2))
+    }
+    x5=fib(5)
+    x10=fib(10)
+    print("Result of fib(10): ")
+    println(x10)
+    """,
+    """fun draw_square(len)
+    {
+        i = 0
+        t = Turtle()
+        while(i<=3)
+        {
+            t.fd(len)
+            t.rotate(90)
+            i=i+1
+        }
+        pole = len*len
+        return(pole)
+    }
+    print("Obrysowane pole ")
+    pole=draw_square(10)
+    if(pole > 10 && pole <200)
+    {
+        println("jest wieksze od 12 i mniejsze od 200")
+    }else
+    {
+        println("jest inne niz przewidywane")
+    }
+    """,
+    """fun twice(f, x) { return(f(f(x))) }
+    fun inc(x) { return(x + 1) }
+    g = inc
+    r = twice(g, 5)
+    fun nothing() { return() }
+    fun early(n) { while(True) { if(n > 3) { return(n) } n = n + 1 } }
+    e = early(0)
+    """,
+    """t=Turtle() x=t.get_x() t.fd(10) t.set_angle(10) t.rotate(30)
+    an=t.get_angle() t.set_x(5) t.set_y(-5) t.fd(1) pos = t.get_x() + t.get_y()
+    t2 = Turtle() t2.rotate(45) t2.fd(20)""",
+    """t = Turtle() move = t.fd move(3) get = t.get_y y = get() + t.get_y()
+    fun apply(f, v) { return(f(v)) } apply(t.rotate, 15) a = t.get_angle()""",
+    """fun spiral(t, len, depth) {
+        if(depth > 0) {
+            t.fd(len)
+            t.rotate(25)
+            spiral(t, len * 0.9, depth - 1)
+            t.rotate(-50)
+            spiral(t, len * 0.8, depth - 2)
+        }
+    }
+    spiral(Turtle(), 20, 6)""",
+    """g = 1
+    fun f(a) {
+        b = 0
+        while (a > 0) {
+            if (a > 2) { b = b + a c = 1 } else { g = g + 1 print = 5 }
+            a = a - 1
+        }
+        return(b + g)
+    }
+    r = f(5) s = f(1)""",
+    """fun f(x) { y = 1 + return(x * 2) } r = f(4)
+    fun h(f) { if (f) { q = 2 } return(q) } s = h(True)""",
+    """fun f(n) {
+        if (n > 0) { m = n r = f(n - 1) return(m + r) }
+        while (n < 3) { k = n n = n + 1 if (k == 1) { q = k } }
+        return(n)
+    }
+    x = f(5)""",
+    """t = Turtle()
+    fun mv(d) { t.fd(d) }
+    fun g(d) { if (d > 0) { return = mv return(d) } return(d + 1) }
+    fun h(return) { return(3) }
+    a = g(2) b = g(-4) h(mv)""",
+    """t = Turtle()
+    fun mv(d) { t.fd(d) }
+    fun g(d) { return(d) n = 1 }
+    return = mv
+    g(7)""",
+    """fun f(x) { y = 1 + return(x * 2) } r = 2 * f(4) + 1""",
+    """fun fib(n) { if (n < 2) { return(n) } return(fib(n - 1) + fib(n - 2)) }
+    fun same(x) { return(x) }
+    a = fib(15) b = same(True) c = same(1) d = same("1") e = fib(15)""",
+    """t = Turtle() i = 100 s = 0
+    for (i, 1, 5) { t.fd(i) s = s + i last = i }
+    for (k, 10, 0, -2.5) { repeat(k) { t.rotate(repcount) } }
+    repeat(3) { repeat(2) { s = s + repcount } s = s * repcount }
+    for (j, 1, 0) { s = -1 }
+    for (x, 0, 1, 0.25) { println(x) }""",
+    """fun find(n) { for (i, 1, n) { if (i * i > n) { return(i) } } return(0) }
+    fun pure(n) { s = 0 for (i, 1, n) { s = s + i } return(s) }
+    fun total(n) { c = 0 repeat(n) { c = c + repcount } return(c) }
+    a = 1 + find(20) + find(0) b = pure(10) + pure(10) i = 2
+    fun shadow(f) { y = 0 for (return, 1, 2) { y = y + return } return(y) }
+    c = total(4.5) d = shadow(i)""",
+    # errors
+    "x = 1 y = z + 1",
+    "x = 1 y = x / (x - 1)",
+    'x = "a" - 1',
+    "fun f(a) { return(a) } f(1, 2)",
+    "t = 4 t.f()",
+    "t=Turtle() t.non",
+    "t=Turtle() t.non(1)",
+    "t=Turtle() t.fd(1, 2)",
+    "t=Turtle() t.poly(0, 10)",
+    "t=Turtle() t.polyline(10, 90, 5)",
+    "x = 2 x.fd(1)",
+    "print=43",
+    "fun f() { return(1, 2) } f()",
+    "fun f() { } x = f()",
+    "fun h(f) { return(f(1, 2)) } fun k(a) { return(a) } r = h(k)",
+    "fun f() { return = 2 } f()",
+    "i = 0 while(i < 5) { i = i + 1 if (i == 3) { y = undefined_var } }",
+    'for (i, 1, "10") { }',
+    "for (i, 1, 10, 1 - 1) { }",
+    "for (i, 1, 3) { x = i } y = i",
+    "fun f() { for (i, 1, 3) { x = undefined_var } } f()",
+]
+
+OPTIMIZER_PROGRAMS = [
+    """x = 2 * 3 / 4 + 1 - (5 - 1) y = x * 2 * 3 z = -(2 + 1) > 1 == False
+    w = !(1 < 2) || 2 == 2 && "a" + "b" == "ab" v = +x""",
+    """if (True) { a = 1 } if (1 > 2) { b = 1 } else { c = 2 }
+    while (False) { d = 1 }
+    fun f(n) { if (True) { print(n) } if (True) { m = n } return(m) }
+    r = f(3)""",
+    "fun f(True) { return(True) } r = f(5) s = True",
+    "x = 1 / 0",
+    "x = 1 + 2 + y",
+    'x = 1 + "a" - 2',
+]
+
+
+def summarize(value):
+    if isinstance(value, Turtle):
+        return ("Turtle", value.x, value.y, value.angle)
+    if isinstance(value, BaseFunctionDefinition):
+        return ("Function", value.name)
+    return value
+
+
+def run_program(code: str,
+                engine: str,
+                optimizer: AstOptimizer = None,
+                memoize: bool = False,
+                canvas: str = "eager"):
+    old_logger = get_global_logger()
+    set_global_logger(StringLogger())
+    try:
+        program = Parser(token_source=generate_lexer(code)).parse_program()
+        program.set_canvas(CANVAS_MODES[canvas]())
+        if optimizer:
+            optimizer.optimize(program)
+        program.execute(engine, memoize=memoize)
+    except (BaseLanguageException, ZeroDivisionError, TypeError) as err:
+        return ("error", type(err), str(err), getattr(err, "location", None))
+    finally:
+        log = get_global_logger().out_string
+        set_global_logger(old_logger)
+
+    elements = {
+        name: summarize(value)
+        for name, value in program.root_context.elements.items()
+    }
+    canvas = program.get_canvas()
+    # copies, turtles destroyed later by garbage collector change canvas
+    lines = {key: list(value) for key, value in canvas.turtle_lines.items()}
+    return (elements, log, lines, dict(canvas.turtle_angles))
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+def test_engines_match_tree_walker(engine):
+    for code in PROGRAMS:
+        print(f"Running program: {code}")
+        assert run_program(code, engine) == run_program(code, "tree")
+
+
+def test_vm_deep_recursion():
+    code = """fun depth(n) {
+        if (n > 0) {
+            return(depth(n - 1) + 1)
+        }
+        return(0)
+    }
+    result = depth(20000)
+    """
+    elements, *_ = run_program(code, "vm")
+    assert elements["result"] == 20000
+
+    code = "fun forever(n) { forever(n + 1) } forever(0)"
+    error, error_type, message, _ = run_program(code, "vm")
+    assert message == "Maximum depth of function calls exceeded"
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+def test_deeply_nested_expressions(engine):
+    # Python allows 200 levels of parentheses and closures can't be compiled
+    # from about 400 levels, such programs are run by fallback engines
+    for code in ["x = " + "(" * 450 + "1" + " + 1)" * 450,
+                 "x = " + "-(" * 450 + "2" + ")" * 450,
+                 "x = " + " + ".join(["1"] * 3000) + " y = " +
+                 " * ".join(["2", "3", "4"] * 300)]:
+        assert run_program(code, engine) == run_program(code, "tree")
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+def test_infinite_recursion(engine):
+    code = "fun f(a){\n  return f(a) + 1\n}\nx = f(1)"
+    result = run_program(code, engine)
+    assert result[:2] == ("error", LogoRuntimeError)
+    assert result[3] == Location(3, 0)
+
+
+def test_transpiled_chains_are_flat():
+    code = "x = " + " - ".join(["1"] * 2000) + " y = " + " / ".join(
+        ["2", "3", "4"] * 300)
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    PythonTranspiler(program).compile()()
+    assert program.root_context.get_element("x") == 1 - 1999
+    assert program.root_context.get_element("y") == run_program(
+        code, "tree")[0]["y"]
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+def test_optimized_programs_match_tree_walker(engine):
+    for code in PROGRAMS + OPTIMIZER_PROGRAMS:
+        print(f"Running program: {code}")
+        optimized = run_program(code, engine, AstOptimizer())
+        assert optimized == run_program(code, "tree")
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+def test_memoized_programs_match_tree_walker(engine):
+    for code in PROGRAMS:
+        print(f"Running program: {code}")
+        memoized = run_program(code, engine, memoize=True)
+        assert memoized == run_program(code, "tree")
+
+
+def test_purity_analysis():
+    code = """fun fib(n) { if (n < 2) { return(n) } return(fib(n - 1) + fib(n - 2)) }
+    fun uses_fib(n) { k = fib(n) return(k * 2) }
+    fun draws(t) { t.fd(1) }
+    fun prints(n) { print(n) return(n) }
+    fun calls_prints(n) { return(prints(n)) }
+    fun reads_root(n) { return(n + g) }
+    fun writes_root(n) { g = n }
+    fun local(n) { h = n while (h > 0) { h = h - 1 } return(h) }
+    g = 1"""
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    pure = {x.name for x in PurityAnalyzer(program).analyze()}
+    assert pure == {"fib", "uses_fib", "local"}
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+def test_memoization_stats(engine):
+    code = """fun fib(n) { if (n < 2) { return(n) } return(fib(n - 1) + fib(n - 2)) }
+    a = fib(20) b = fib(20)"""
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    program.execute(engine, memoize=True)
+    assert program.root_context.elements["a"] == 6765
+    stats = program.memoizer.get_stats()["fib"]
+    # every value computed once
+    assert stats["misses"] == 21
+    assert stats["hits"] == 19
+    assert program.definitions[0].memo is None
+
+
+def test_function_memo_lru():
+    memo = FunctionMemo("f", max_size=2)
+    for value in [1.0, 2.0, 1.0, 3.0, 2.0]:
+        memo.call([value], lambda x: x * 2, value)
+    assert memo.get_stats()["hits"] == 1
+    # 2.0 was least recently used when 3.0 was added
+    assert list(memo.results) == [(3.0,), (2.0,)]
+    assert memo.call([True], lambda: 5) == 5
+    assert memo.skipped == 1
+
+
+def test_quickening_stats():
+    code = """t = Turtle() v = 1 i = 0
+    while (i < 40) {
+        if (i == 20) { v = "s" }
+        w = v + v
+        t.fd(i * 2 / 3)
+        t.rotate(1 - i)
+        i = i + 1
+    }"""
+    expected = run_program(code, "tree")
+    assert run_program(code, "quick") == expected
+
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    program.execute("quick")
+    stats = program.quickening_stats.get_stats()
+    # v + v deoptimized after v became string, then specialized again
+    assert stats["deoptimized"] == 1
+    assert stats["specialized"] == 9
+    loop = program.statements[3]
+    assert type(loop.condition).__name__ == "SpecializedRelation"
+    assert type(loop.block.statements[2]).__name__ == "TurtleCall"
+
+
+def test_native_methods():
+    class Counter(BaseObject):
+        def __init__(self):
+            self.count = 0
+            self.name = "Counter"
+
+        def evaluate(self, context):
+            return self
+
+        @native_method("add", 1)
+        def add(self, value):
+            self.count += value
+            return self.count
+
+    Counter.register_method("get", lambda counter: counter.count)
+    counter = Counter()
+    assert set(Counter.methods) == {"add", "get"}
+    assert "add" not in Turtle.methods
+    assert counter.call_method("add", [2]) == 2
+    # bound methods are cached, except for turtles
+    assert counter.get_field("add") is counter.get_field("add")
+    assert counter.get_field("get").execute([], None) == 2
+    with pytest.raises(KeyError):
+        counter.get_field("fd")
+    with pytest.raises(LogoRuntimeError, match="1 instead of expected 0"):
+        counter.call_method("get", [1])
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+@pytest.mark.parametrize("canvas",
+                         ["deferred", "columnar", "spill", "indexed"])
+def test_canvas_modes_match_eager(engine, canvas):
+    for code in PROGRAMS:
+        print(f"Running program: {code}")
+        expected = run_program(code, engine)
+        assert run_program(code, engine, canvas=canvas) == expected
+
+
+@pytest.mark.parametrize("engine", EXECUTION_ENGINES.keys())
+@pytest.mark.parametrize("canvas", CANVAS_MODES.keys())
+def test_canvas_modes_check_arguments(engine, canvas):
+    calls = [f'{x}("a")' for x in ["fd", "rotate", "set_angle", "set_x",
+                                   "set_y"]]
+    calls += ['poly("a", 3)', 'poly(3, "a")', 'arc("a", 90, 3)',
+              'arc(10, "a", 3)', 'arc(10, 90, "a")', 'polyline(1, "a")',
+              'polyline("a", 1, 2, 3)']
+    for call in calls:
+        code = f"t = Turtle() t.fd(1)\nt.{call} t.fd(1)"
+        result = run_program(code, engine, canvas=canvas)
+        assert result == ("error", LogoRuntimeError,
+                          "Turtle expects number, not a", Location(1, 0))
+
+
+def test_deferred_canvas_materialization():
+    canvas = CommandLogPaths()
+    program = Parser(token_source=generate_lexer(
+        "t = Turtle() t.fd(10) t.rotate(90) t.fd(5) t.set_x(3)")).parse_program()
+    program.set_canvas(canvas)
+    program.execute()
+    # nothing is computed until canvas or turtle is read
+    assert len(canvas.commands[0]) == 8
+    assert canvas._lines[0] == [(0, 0)]
+    turtle = program.root_context.elements["t"]
+    assert (turtle.x, turtle.y, turtle.angle) == (3, 10, 90)
+    assert not canvas.commands[0]
+    assert canvas.turtle_lines[0] == [(0, 0), (0, 10), (-5, 10)]
+    assert canvas.turtle_angles == {0: 90}
+
+
+def test_columnar_canvas():
+    canvas = ColumnarPaths()
+    program = Parser(token_source=generate_lexer(
+        "t = Turtle() t.fd(10) t.rotate(90) t.poly(4, 5)")).parse_program()
+    program.set_canvas(canvas)
+    program.execute()
+    xs, ys = canvas.get_columns(0)
+    assert (xs.typecode, ys.typecode) == ("d", "d")
+    assert memoryview(xs).nbytes == 6 * 8
+    points = canvas.turtle_lines[0]
+    assert len(points) == 6
+    assert points[1] == (0, 10)
+    assert points[-2:] == [(xs[4], ys[4]), (xs[5], ys[5])]
+    assert list(points) == list(zip(xs, ys))
+    assert canvas.to_dict()["turtle_lines"][0] == list(points)
+    assert canvas.to_dict()["turtle_angles"] == {0: 450}
+
+
+def test_spilling_canvas(tmp_path):
+    code = "t = Turtle() repeat(10) { t.fd(1) t.rotate(36) } t.poly(5, 2)"
+    expected = run_program(code, "tree")[2][0]
+    canvas = SpillingPaths(directory=tmp_path, chunk_size=4)
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    program.set_canvas(canvas)
+    program.execute()
+    line = canvas.turtle_lines[0]
+    assert (len(line), line.chunks, len(line.tail)) == (16, 4, 0)
+    assert list(line) == expected
+    assert line[-1] == expected[-1] and line[3:6] == expected[3:6]
+    chunks = list(canvas.iter_chunks(0))
+    assert [len(xs) for xs, _ in chunks] == [4, 4, 4, 4]
+    assert [y for _, ys in chunks for y in ys] == [y for _, y in expected]
+    del chunks
+    canvas.close()
+
+    limited = SpillingPaths(directory=tmp_path, chunk_size=4, max_points=10)
+    program.set_canvas(limited)
+    with pytest.raises(LogoRuntimeError, match="limit of 10 points"):
+        program.execute()
+    limited.close()
+
+
+def test_spilling_canvas_open_files(tmp_path):
+    resource = pytest.importorskip("resource")
+    limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (100, limits[1]))
+    try:
+        # files are created only for turtles which spill points
+        canvas = SpillingPaths(directory=tmp_path, chunk_size=3)
+        program = Parser(token_source=generate_lexer(
+            "repeat(500) { t = Turtle() t.fd(1) }")).parse_program()
+        program.set_canvas(canvas)
+        program.execute()
+        assert all(x.map is None for x in canvas.turtle_lines.values())
+        canvas.close()
+
+        canvas = SpillingPaths(directory=tmp_path, chunk_size=3)
+        program = Parser(token_source=generate_lexer(
+            "repeat(500) { t = Turtle() t.fd(1) t.fd(1) t.fd(1) }"
+        )).parse_program()
+        program.set_canvas(canvas)
+        with pytest.raises(LogoRuntimeError,
+                           match="Too many open files") as error:
+            program.execute()
+        assert error.value.location is not None
+        canvas.close()
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, limits)
+
+
+def test_turtle_drawing_primitives():
+    # the same drawing made by native methods and by loops
+    native = """t = Turtle() t.rotate(10) t.poly(7, 10) t.arc(20, -90, 9)
+    t.polyline(5, 30, 10, -45, 3, 0) t.polyline() t.poly(2.5, 1)"""
+    loops = """t = Turtle() t.rotate(10)
+    repeat(7) { t.fd(10) t.rotate(360 / 7) }
+    w = -10 chord = 2 * 20 * -0.08715574274765817
+    repeat(9) { t.rotate(w / 2) t.fd(chord) t.rotate(w / 2) }
+    t.fd(5) t.rotate(30) t.fd(10) t.rotate(-45) t.fd(3) t.rotate(0)
+    repeat(2.5) { t.fd(1) t.rotate(360 / 2.5) }"""
+    expected = run_program(loops, "tree")
+    for engine, canvas in itertools.product(EXECUTION_ENGINES, CANVAS_MODES):
+        elements, _, lines, angles = run_program(native, engine, canvas=canvas)
+        assert elements["t"] == pytest.approx(expected[0]["t"])
+        assert len(lines[0]) == len(expected[2][0]) == 22
+        for point, expected_point in zip(lines[0], expected[2][0]):
+            assert point == pytest.approx(expected_point, abs=1e-9)
+        assert angles == pytest.approx(expected[3])
+
+
+def test_count_nodes():
+    def count(code: str) -> int:
+        program = Parser(token_source=generate_lexer(code)).parse_program()
+        return count_nodes(program.statements)
+
+    # calls are counted once, though Value keeps them in operators and steps
+    assert count("f(1)") == 4
+    assert count("t.fd(1)") == count("f(1)") + 1
+    assert count("x = f(1)") == count("f(1)") + 1
+
+
+def test_optimizer_passes():
+    code = """fun f(n) { if (True) { print(n * (2 + 3)) } else { print(0) } }
+    x = f(1 + 2 * 3)"""
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    optimizer = AstOptimizer()
+    optimizer.optimize(program)
+    assert optimizer.nodes_before > optimizer.nodes_after
+    assert optimizer.nodes_after == count_nodes(program.definitions +
+                                                program.statements)
+    assert program.statements[0].expression.operators[0].arguments[
+        0].value == 7
+    # if statement replaced by print(...)
+    assert len(program.definitions[0].block.statements) == 1
+
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    optimizer = AstOptimizer(fold_constants=False, eliminate_branches=False)
+    optimizer.optimize(program)
+    assert optimizer.nodes_before == optimizer.nodes_after
+
+
+def test_resolver_slots():
+    code = """fun f(a) {
+        b = a
+        while (b > 0) {
+            if (b > 1) { a = b c = 1 }
+            b = b - 1
+        }
+        return(a)
+    }
+    x = f(3)"""
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    resolver = Resolver().resolve(program)
+    function = program.definitions[0]
+    assert resolver.scopes[function].names == ["a", "b"]
+
+    loop = function.block.statements[1]
+    if_statement = loop.block.statements[0]
+    assert resolver.scopes[if_statement].names == ["a", "c"]
+    assignment = if_statement.true_block.statements[0]
+    # a from if scope (if defined there), then argument of function
+    assert resolver.slots[assignment] == ((0, 0), (2, 0))
+    # b is assigned in while block too
+    assert resolver.scopes[loop].names == ["b"]
+    assert resolver.slots[loop.condition.left] == ((0, 0), (1, 1))
+    assert resolver.slots[program.statements[0]] == ()
+
+
+def test_scope_elision():
+    code = """t = Turtle()
+    while (t.get_x() < 3) {
+        if (t.get_x() > 0) { y = 1 }
+        t.set_x(t.get_x() + 1)
+    }"""
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    loop = program.statements[1]
+    assert not loop.block.defines_variables
+    assert loop.block.statements[0].true_block.defines_variables
+
+    resolver = Resolver().resolve(program)
+    assert loop not in resolver.scopes
+    assert resolver.scopes[loop.block.statements[0]].names == ["y"]
+
+    program.execute()
+    # context of if block is reused
+    assert len(program.root_context.pool) == 1
+    other = Parser(token_source=generate_lexer(code)).parse_program()
+    assert other.root_context.pool == []
+    assert program.root_context.elements["t"].x == 3
@@ -8,9 +8,10 @@ module_path = os.path.dirname(os.path.realpath(__file__)) + "/.."
 sys.path.append(module_path)
 
 from ..shared import Token, TokenType, Location
-from ..lexer import Lexer
+from ..lexer import Lexer, ScanningLexer
 from ..language_errors import UnexpectedCharacterError, ParseError
-from ..text_reader import StringReader
+from ..text_reader import StringReader, MappedFileReader
+from ..token_buffer import TokenBuffer
 
 
 
@@ -152,3 +153,122 @@ if(pole > 10 && pole <200)
 
     assert tokens[87].symbol_type == TokenType.EOF
     assert tokens[86].symbol_type != TokenType.EOF
+
+
+def test_scanning_lexer_matches_lexer():
+    TEST_STRINGS = [
+        """<=(\"word\"+         312.543/1322(
+
+    ))""", "n=432+32-0+-32", "0 0.12 1.05",
+        'x = "esc\\"aped\nstring" y = x', """fun f(a, b) {
+            if(a <= b || a != b && !a) { return(a) }
+            else { while(a >= 0.5) { a = a - 1 } }
+        }
+        t.fd(3)""", "for (i, 1, 10, 2) { repeat(i) { forward = repcount } }",
+        "", "    "
+    ]
+    for string in TEST_STRINGS:
+        lexer = Lexer(source=StringReader(string))
+        scanning_lexer = ScanningLexer(source=StringReader(string))
+        while True:
+            token = lexer.get_token()
+            assert scanning_lexer.get_token() == token
+            if token.symbol_type == TokenType.EOF:
+                break
+
+
+def test_EOF_location_after_blank_lines():
+    # EOF is placed at the last token, not after trailing newlines
+    for string, location in [("fun f(a){\n  x = a\n\n\n", Location(1, 6)),
+                             ('x = "a\nb"\n\n', Location(0, 4)),
+                             ("\n\n  ", Location(0, 0))]:
+        for lexer_class in (Lexer, ScanningLexer):
+            lexer = lexer_class(source=StringReader(string))
+            while (token := lexer.get_token()).symbol_type != TokenType.EOF:
+                pass
+            assert token.location == location
+            assert lexer.get_token().location == location
+
+
+def test_scanning_lexer_exceptions():
+    EXCEPTIONS = [
+        ("1312.43ls", UnexpectedCharacterError, Location(0, 0)),
+        ("x = 1312.", ParseError, Location(0, 4)),
+        ("032", ParseError, Location(0, 0)),
+        ("\n 1ls", UnexpectedCharacterError, Location(1, 1)),
+        ("a | b", UnexpectedCharacterError, Location(0, 2)),
+        ("x = #", UnexpectedCharacterError, Location(0, 4)),
+    ]
+    for string, ex_type, loc in EXCEPTIONS:
+        lexer = ScanningLexer(source=StringReader(string))
+        with pytest.raises(ex_type):
+            try:
+                for i in range(5):
+                    lexer.get_token()
+            except ex_type as err:
+                assert err.location == loc
+                raise err
+
+    lexer = ScanningLexer(source=StringReader('"not closed'))
+    with pytest.raises(EOFError):
+        lexer.get_token()
+
+
+def test_mapped_file_reader(tmp_path):
+    text = 'x = "zażółć"\ny = 1\n\nfun f() {\n  t.fd(3)\n}\n'
+    path = tmp_path / "source.logo"
+    path.write_text(text, encoding="utf-8")
+
+    mapped = MappedFileReader(path)
+    # small chunks split multibyte characters between them
+    mapped.CHUNK_SIZE = 5
+    reference = StringReader(text)
+    char = None
+    while char != "\0":
+        char = mapped.get_char()
+        assert char == reference.get_char()
+        assert mapped.get_location() == reference.get_location()
+
+    assert mapped.get_text() == text
+    assert mapped.get_loc_region(Location(4, 2)) == reference.get_loc_region(
+        Location(4, 2))
+    mapped.close()
+
+    # line endings are translated like in files opened in text mode
+    crlf = tmp_path / "crlf.logo"
+    crlf.write_bytes(text.replace("\n", "\r\n").replace(
+        "\r\n\r\n", "\r\r").encode("utf-8"))
+    for chunk_size in range(1, 8):
+        mapped = MappedFileReader(crlf)
+        # "\r\n" is split between chunks too
+        mapped.CHUNK_SIZE = chunk_size
+        reference = StringReader(text)
+        char = None
+        while char != "\0":
+            char = mapped.get_char()
+            assert char == reference.get_char()
+            assert mapped.get_location() == reference.get_location()
+        assert mapped.get_text() == text
+        for location in [Location(1, 2), Location(4, 2), Location(6, 0)]:
+            assert mapped.get_loc_region(location) == (
+                reference.get_loc_region(location))
+        mapped.close()
+
+    empty = tmp_path / "empty.logo"
+    empty.write_text("")
+    lexer = Lexer(MappedFileReader(empty))
+    assert lexer.get_token().symbol_type == TokenType.EOF
+
+
+def test_token_buffer():
+    text = 'x = "word" + 3.5\nx.fd(x, 3.5)'
+    buffer = TokenBuffer.from_lexer(ScanningLexer(StringReader(text)))
+    lexer = Lexer(StringReader(text))
+    for index in range(len(buffer)):
+        token = lexer.get_token()
+        assert buffer[index] == token
+        assert buffer.get_type(index) == token.symbol_type
+    assert buffer.get_type(len(buffer) + 10) == TokenType.EOF
+    # repeated values are stored once
+    assert buffer.value_pool.count(3.5) == 1
+    assert buffer.value_pool.count("x") == 1
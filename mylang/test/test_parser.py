@@ -8,8 +8,13 @@ sys.path.append(module_path)
 
 from ..parser_logo import Parser
 from ..language_errors import LogoSyntaxError, LogoRuntimeError
-from ..shared import Location
+from ..shared import Location, StringLogger
 
+from ..lexer import ScanningLexer
+from ..text_reader import MappedFileReader, StringReader
+from ..token_buffer import TokenBuffer
+from ..parse_cache import ParseCache
+from ..node_classes import ReturnStatement, Value
 from .testing_utils import check_parse_exception, generate_lexer
 
 
@@ -54,7 +59,9 @@ def test_functions():
 def test_loops():
     TEST_STRINGS = [
         "while(true){" + "}", "while(3<43){" + "}",
-        "while(true){ x = x+1" + "}"
+        "while(true){ x = x+1" + "}",
+        "for(i, 1, 10){" + "}", "for(i, n, 0, -0.5){ x = i" + "}",
+        "repeat(4){ t.fd(repcount) repeat(2){" + "} }"
     ]
     for string in TEST_STRINGS:
         print(f'parsing string: {string}')
@@ -100,6 +107,21 @@ def test_exceptions():
          Location(0, 18)),
         ("thh(1,)", LogoSyntaxError, "argument", Location(0, 6)),
         ("fun print (){" + "}", LogoRuntimeError, "Redefi", None),
+        ("x = (1 + 2", LogoSyntaxError, "ending parenthesis", Location(0, 9)),
+        ("x = ()", LogoSyntaxError, "No expression", Location(0, 5)),
+        ("x = 1 * ", LogoSyntaxError, "No factor", Location(0, 6)),
+        ("x = a && ", LogoSyntaxError, "Missing relation", Location(0, 6)),
+        ("x = a || ", LogoSyntaxError, "Missing condition", Location(0, 6)),
+        ("x = a < ", LogoSyntaxError, "comparison", Location(0, 6)),
+        ("f(1 2)", LogoSyntaxError, "close paren", Location(0, 4)),
+        ("for(i, 1) {" + "}", LogoSyntaxError, "optional step",
+         Location(0, 8)),
+        ("for(1, 2, 3) {" + "}", LogoSyntaxError, "counter", Location(0, 4)),
+        ("repeat 3", LogoSyntaxError, "opening paren", Location(0, 7)),
+        ("for(i, 1, 3) { if(1) { i = 2 } }", LogoSyntaxError,
+         "loop counter i", Location(0, 25)),
+        ("repeat(2) { repcount = 2 }", LogoSyntaxError, "loop counter",
+         Location(0, 21)),
     ]
     for string, type, msg, loc in EXCEPTIONS:
         check_parse_exception(string, type, msg, loc)
@@ -110,3 +132,115 @@ def test_program_parsing():
     p = Parser(token_source=q)
     prog = p.parse_program()
     print(prog)
+
+
+def test_parsing_token_buffer():
+    code = """fun f1(a, b){ while(a < b) { a = a + 1 } return(a * -b) }
+    x = 32 if(x > 3 || !x) { foo(x+1).bar } else { t.fd(1) }"""
+    expected = str(Parser(token_source=generate_lexer(code)).parse_program())
+    buffer = TokenBuffer.from_lexer(ScanningLexer(StringReader(code)))
+    assert str(Parser(token_source=buffer).parse_program()) == expected
+
+
+def test_deeply_nested_expressions():
+    depth = 5 * sys.getrecursionlimit()
+    code = "x = " + "-(" * depth + "1" + ")" * depth
+    code += " y = " + "f(" * depth + "2" + ")" * depth
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    factor = program.statements[0].expression
+    for i in range(depth):
+        assert factor.unary_op == "-"
+        factor = factor.value
+    assert factor.value == 1
+
+
+def test_return_statements():
+    code = """fun f(a){ if(a) { return(a) } x = return(1) return }
+    return(2)"""
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    statements = program.definitions[0].block.statements
+    assert type(statements[0].true_block.statements[0]) is ReturnStatement
+    assert type(statements[1].expression) is Value
+    assert type(statements[2]) is not ReturnStatement
+    # outside of function return is called like any function
+    assert type(program.statements[0]) is Value
+
+
+def test_parse_cache(tmp_path):
+    code = "fun f(a){ return(a*2) } x = f(3) t = Turtle() t.fd(x)"
+    cache = ParseCache(max_entries=1, cache_dir=tmp_path)
+    first = cache.parse_program(StringReader(code))
+    second = cache.parse_program(StringReader(code))
+    assert str(first) == str(second)
+    assert first.root_context is not second.root_context
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+    cache.parse_program(StringReader("y = 1"))
+    assert len(cache.entries) == 1
+
+    # new cache reads program parsed before from disk
+    disk_cache = ParseCache(cache_dir=tmp_path)
+    program = disk_cache.parse_program(StringReader(code))
+    assert disk_cache.get_stats()["disk_hits"] == 1
+    program.execute()
+    assert program.root_context.get_element("x") == 6
+
+
+def test_parse_cache_disk_errors(tmp_path, monkeypatch):
+    code = "x = 1 y = x + 1"
+    # cache_dir can't be created, programs are parsed anyway
+    (tmp_path / "file").write_text("")
+    cache = ParseCache(cache_dir=str(tmp_path / "file" / "cache"))
+    assert cache.parse_program(StringReader(code)).statements
+
+    # temporary file of failed write is removed
+    directory = tmp_path / "cache"
+    cache = ParseCache(cache_dir=str(directory))
+
+    def fail_replace(source, target):
+        raise OSError("replace failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "replace", fail_replace)
+        assert cache.parse_program(StringReader(code)).statements
+    assert list(directory.iterdir()) == []
+
+    # corrupted file is a miss, program is parsed and written again
+    ParseCache(cache_dir=str(directory)).parse_program(StringReader(code))
+    path, = directory.iterdir()
+    data = path.read_bytes()
+    for corrupted in [data[:len(data) // 2], b"", b"garbage"]:
+        path.write_bytes(corrupted)
+        disk_cache = ParseCache(cache_dir=str(directory))
+        program = disk_cache.parse_program(StringReader(code))
+        assert disk_cache.get_stats()["misses"] == 1
+        program.execute()
+        assert program.root_context.get_element("y") == 2
+        assert path.read_bytes() == data
+
+
+def test_parse_cache_key(tmp_path, monkeypatch):
+    code = 'x = "zażółć" ' * 10000
+    path = tmp_path / "program.logo"
+    path.write_text(code, encoding="utf-8")
+    reader = MappedFileReader(path)
+    # file is hashed by chunks of its bytes, without decoding it whole
+    monkeypatch.setattr(reader, "get_text", None)
+    cache = ParseCache()
+    key = cache.get_key(reader)
+    assert key == cache.get_key(StringReader(code))
+    assert key != cache.get_key(StringReader(code + " "))
+    assert key != ParseCache(lexer_class=ScanningLexer).get_key(reader)
+    reader.close()
+
+    lexers = []
+
+    def lexer_class(reader, logger):
+        lexers.append(ScanningLexer(reader, logger))
+        return lexers[-1]
+
+    logger = StringLogger()
+    cache = ParseCache(lexer_class=lexer_class, logger=logger)
+    assert cache.parse_program(StringReader("x = 1")).statements
+    assert lexers[0].logger is logger
@@ -0,0 +1,327 @@
+#!/usr/bin/python3
+
+import io
+import itertools
+import random
+import struct
+import xml.etree.ElementTree as ElementTree
+import zlib
+
+import pytest
+
+from ..language_errors import LogoRuntimeError
+from ..parser_logo import Parser
+from ..standard_library.drawing.canvas import IndexedPaths, TurtlePaths
+from ..standard_library.drawing.decimation import (
+    DecimatedPaths, LevelsOfDetail, clip, merge_collinear, simplify)
+from ..standard_library.drawing.raster_renderer import RasterRenderer
+from ..standard_library.drawing.svg_renderer import SvgRenderer
+from ..standard_library.drawing.spatial_index import (distance_to_segment,
+                                                      segment_in_rectangle,
+                                                      segments_intersect)
+from .testing_utils import generate_lexer
+
+
+def draw(code: str) -> TurtlePaths:
+    program = Parser(token_source=generate_lexer(code)).parse_program()
+    program.execute()
+    return program.get_canvas()
+
+
+def read_png(path) -> tuple:
+    "returns width, height and pixels of 8-bit grayscale PNG"
+    data = open(path, "rb").read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks = {}
+    position = 8
+    while position < len(data):
+        size, kind = struct.unpack_from(">I4s", data, position)
+        content = data[position + 8:position + 8 + size]
+        crc, = struct.unpack_from(">I", data, position + 8 + size)
+        assert crc == zlib.crc32(kind + content)
+        chunks[kind] = content
+        position += size + 12
+    width, height, depth, color = struct.unpack_from(">IIBB", chunks[b"IHDR"])
+    assert (depth, color) == (8, 0)
+    rows = zlib.decompress(chunks[b"IDAT"])
+    assert rows[::width + 1] == bytes(height)
+    pixels = b"".join(rows[x * (width + 1) + 1:(x + 1) * (width + 1)]
+                      for x in range(height))
+    return width, height, pixels
+
+
+def test_raster_renderer(tmp_path):
+    canvas = draw("t = Turtle() t.rotate(90) t.fd(100) t.rotate(90) t.fd(50)")
+    RasterRenderer(canvas, tmp_path / "image.png", size=120).render()
+    width, height, pixels = read_png(tmp_path / "image.png")
+    # line of 100 units is scaled to 100 pixels, with margins of 10 pixels,
+    # the turtle goes left, then up
+    assert (width, height) == (120, 70)
+    row = pixels[60 * width:61 * width]
+    assert row[:10] + row[111:] == bytes([255]) * 19
+    assert row[11:110] == bytes(99)
+    column = pixels[10::width]
+    assert column[11:60] == bytes(49)
+    # ends of lines are drawn with half of intensity
+    assert row[10] == column[10] == 127 and row[110] == 128
+    assert pixels.count(255) == width * height - 99 - 49 - 3
+
+
+def test_raster_tiles_match_single_image(tmp_path):
+    canvas = draw("""t = Turtle() repeat(12) { t.poly(7, 30) t.rotate(30) }
+    t.arc(40, 500, 11)""")
+    renderer = RasterRenderer(canvas, tmp_path / "image.png", size=200,
+                              tile_size=1000, workers=1)
+    width, height, segments = renderer.get_segments()
+    expected = renderer.rasterize(width, height, segments)
+    assert 0 < expected.count(255) < width * height
+    for tile_size, workers in [(64, 1), (13, 1), (50, 2)]:
+        renderer = RasterRenderer(canvas, tmp_path / "image.png", size=200,
+                                  tile_size=tile_size, workers=workers)
+        assert renderer.rasterize(width, height, segments) == expected
+
+
+def read_svg_lines(text: str) -> list:
+    "returns points of lines of turtles from SVG"
+    svg = ElementTree.fromstring(text)
+    lines = []
+    for path in svg[0]:
+        move, data = path.get("d")[1:].partition("l")[::2]
+        if not data:
+            move, data = path.get("d")[1:].partition("L")[::2]
+            numbers = [float(x) for x in (move + " " + data).split()]
+            lines.append(list(zip(numbers[0::2], numbers[1::2])))
+            continue
+        numbers = [float(x) for x in (move + " " + data).split()]
+        points = [tuple(numbers[:2])]
+        for x, y in zip(numbers[2::2], numbers[3::2]):
+            points.append((points[-1][0] + x, points[-1][1] + y))
+        lines.append(points)
+    return lines
+
+
+def test_svg_renderer():
+    canvas = draw("""t = Turtle() t.arc(30, 200, 9) t.fd(0.001)
+    u = Turtle() u.rotate(45) u.polyline(12.345, 120, 4, 0)""")
+    expected = [[(round(x, 1), round(y, 1)) for x, y in line]
+                for line in canvas.turtle_lines.values()]
+    # move not visible with the precision is skipped
+    del expected[0][-1]
+
+    output = io.StringIO()
+    SvgRenderer(canvas, output, precision=1).render()
+    lines = read_svg_lines(output.getvalue())
+    assert [[pytest.approx(x, abs=1e-9) for x in y] for y in lines] == expected
+    absolute = SvgRenderer(canvas, precision=1, relative=False)
+    assert read_svg_lines("".join(absolute.iter_svg())) == expected
+
+    parts = list(SvgRenderer(canvas, precision=1, points_per_chunk=2).iter_svg())
+    assert "".join(parts) == output.getvalue()
+    assert len(parts) > 10
+    svg = ElementTree.fromstring(output.getvalue())
+    assert svg.get("viewBox") == "-70 -20.3 80 60.3"
+    assert [x.get("transform") for x in svg[1]] == [
+        "translate(-58.2 -10.3) rotate(200.0)",
+        "translate(-9.8 4.9) rotate(165.0)"
+    ]
+
+    # small moves far from origin are shorter as relative ones
+    canvas = draw("t = Turtle() t.fd(1000) t.poly(50, 1)")
+    relative = "".join(SvgRenderer(canvas).iter_path_data(0))
+    absolute = "".join(SvgRenderer(canvas, relative=False).iter_path_data(0))
+    assert len(relative) < 0.7 * len(absolute)
+
+
+def test_svg_number_format():
+    renderer = SvgRenderer(TurtlePaths(), precision=2)
+    assert [renderer.format(x) for x in (0, 1, -1, 50, -250, 1000, 12345)] \
+        == ["0", ".01", "-.01", ".5", "-2.5", "10", "123.45"]
+    assert SvgRenderer(TurtlePaths(), precision=0).format(-12) == "-12"
+
+
+def test_merge_collinear():
+    xs = [0, 1, 2, 2, 2, 2, 1, 1]
+    ys = [0, 0, 0, 0, 1, 3, 3, 3]
+    assert merge_collinear(xs, ys) == ([0, 2, 2, 1], [0, 0, 3, 3])
+    # turning back is kept
+    assert merge_collinear([0, 2, 1], [0, 0, 0]) == ([0, 2, 1], [0, 0, 0])
+
+
+def distance_to_line(x, y, xs, ys) -> float:
+    return min(((x - x0 - t * (x1 - x0))**2 + (y - y0 - t * (y1 - y0))**2)**0.5
+               for x0, y0, x1, y1 in zip(xs, ys, xs[1:], ys[1:])
+               for t in [max(0, min(1, ((x - x0) * (x1 - x0) + (y - y0) *
+                                        (y1 - y0)) /
+                                    ((x1 - x0)**2 + (y1 - y0)**2 or 1)))])
+
+
+def test_simplify():
+    xs, ys = draw("t = Turtle() t.arc(100, 360, 300)").get_columns(0)
+    for tolerance in (0.05, 0.5, 5):
+        for window in (1024, 50):
+            new_xs, new_ys = simplify(xs, ys, tolerance, window)
+            assert 2 < len(new_xs) < len(xs)
+            assert (new_xs[0], new_ys[-1]) == (xs[0], ys[-1])
+            assert max(distance_to_line(x, y, new_xs, new_ys)
+                       for x, y in zip(xs, ys)) <= tolerance
+    assert len(simplify(xs, ys, 5)[0]) < len(simplify(xs, ys, 0.5)[0])
+
+
+def test_clip():
+    xs = [0, 20, 30, 5, 5, -10, -20]
+    ys = [0, 0, 0, 5, 20, 20, 0]
+    assert clip(xs, ys, (-1, -1, 10, 10)) == [([0, 20], [0, 0]),
+                                              ([30, 5, 5], [0, 5, 20]),
+                                              ([-20], [0])]
+
+    canvas = draw("t = Turtle() t.fd(-20) t.rotate(90) t.fd(20) t.rotate(90)"
+                  " t.fd(40) u = Turtle()")
+    clipped = DecimatedPaths(canvas, viewport=(-10, -30, 30, 10))
+    # visible part of line gets new ID, the turtle stays at its end
+    assert {x: list(y) for x, y in clipped.turtle_lines.items()} == {
+        0: [(pytest.approx(-20), -60)],
+        1: [(0, 0)],
+        2: [(0, 0), (0, -20), (-20, -20)]
+    }
+    assert clipped.turtle_angles == {0: 180, 1: 0, 2: None}
+    assert clipped.to_dict()["turtle_lines"][2] == [(0, 0), (0, -20),
+                                                    (-20, -20)]
+
+
+def test_levels_of_detail():
+    canvas = draw("t = Turtle() repeat(20) { t.arc(50, 360, 200) t.fd(5) }")
+    levels = LevelsOfDetail(canvas, levels=6, max_size=1000)
+    assert levels.select() is canvas
+    points = [levels.get_level(x).count_points() for x in range(6)]
+    assert points == sorted(points, reverse=True)
+    assert points[0] < len(canvas.get_columns(0)[0])
+    assert points[-1] < points[0] / 4
+    # the finest level is exact at scale of 1000 pixels per 195 units
+    assert levels.tolerances[0] == pytest.approx(0.5 * 195 / 1000)
+    assert levels.select(6) is canvas
+    assert levels.select(5) is levels.get_level(0)
+    assert levels.select(2.5) is levels.get_level(1)
+    assert levels.select(0.1) is levels.select(0) is levels.get_level(5)
+    xs, ys = canvas.get_columns(0)
+    new_xs, new_ys = levels.get_level(5).get_columns(0)
+    assert max(distance_to_line(x, y, new_xs, new_ys)
+               for x, y in zip(xs[::7], ys[::7])) <= levels.tolerances[5]
+    visible = levels.select(5, (0, 0, 50, 50))
+    assert 0 < sum(len(x) for x in visible.xs.values()) < points[1]
+
+
+# with small max_cells many segments are in overflow list of index
+@pytest.mark.parametrize("max_cells", [64, 3])
+def test_indexed_canvas(max_cells):
+    canvas = IndexedPaths(cell_size=7, max_cells=max_cells)
+    program = Parser(token_source=generate_lexer("""t = Turtle()
+    repeat(30) { t.poly(5, 20) t.rotate(12) t.fd(3) } t.fd(0) t.fd(0)
+    t.fd(100) u = Turtle() u.rotate(90) u.fd(-60) v = Turtle()""")
+    ).parse_program()
+    program.set_canvas(canvas)
+    program.execute()
+    index = canvas.index
+    segments = [(x, y) for x, line in canvas.turtle_lines.items()
+                for y in range(len(line) - 1)]
+    assert len(segments) == 30 * 6 + 3 + 1
+
+    for viewport in [(-5, -5, 5, 5), (10, 30, 11, 31), (-100, -100, 0, 100),
+                     (-3, 55, 40, 60), (500, 500, 600, 600)]:
+        assert index.query(viewport) == [
+            x for x in segments
+            if segment_in_rectangle(*index.get_segment(x), *viewport)
+        ]
+    assert index.query((-1000, -1000, 1000, 1000)) == segments
+
+    for x, y in [(0, 0), (13, -7.5), (30, 40), (-300, 250), (59, 2)]:
+        distance, *nearest = index.nearest(x, y)
+        assert distance == min(
+            distance_to_segment(x, y, *index.get_segment(key))
+            for key in segments)
+        assert distance_to_segment(
+            x, y, *index.get_segment(tuple(nearest))) == distance
+    assert index.nearest(-300, 250, max_distance=10) is None
+    assert index.nearest(59, 2, max_distance=10)[1:] == (1, 0)
+
+    # segments between consecutive ones can be only moves by 0
+    zero_moves = {180, 181}
+    crossing = sum(
+        segments_intersect(*index.get_segment(x), *index.get_segment(y))
+        for x, y in itertools.combinations(segments, 2)
+        if x[0] != y[0] or not zero_moves.issuperset(range(x[1] + 1, y[1])))
+    assert index.count_intersections() == crossing
+    assert 0 < index.count_intersections(0) < crossing
+    assert index.count_intersections(2) == 0
+
+
+def test_segment_intersection():
+    assert segments_intersect(0, 0, 10, 10, 0, 10, 10, 0)
+    assert not segments_intersect(0, 0, 10, 10, 0, 1, 10, 11)
+    # touching and overlapping collinear segments
+    assert segments_intersect(0, 0, 10, 0, 10, 0, 10, 5)
+    assert segments_intersect(0, 0, 10, 0, 5, 0, 20, 0)
+    assert not segments_intersect(0, 0, 10, 0, 11, 0, 20, 0)
+    assert segments_intersect(0, 0, 10, 0, 3, 0, 3, 0)
+
+
+@pytest.mark.parametrize("max_cells", [64, 3])
+def test_segment_grid_query_matches_brute_force(max_cells):
+    # random walk crossing many cells, with segments along cell borders
+    generator = random.Random(3)
+    moves = " ".join(
+        f"t.rotate({generator.choice([0, 90, 45, 137.5, -60])}) "
+        f"t.fd({generator.choice([0, 5, 10, 23.7, -40])})"
+        for _ in range(300))
+    canvas = IndexedPaths(cell_size=5, max_cells=max_cells)
+    program = Parser(token_source=generate_lexer(
+        f"t = Turtle() {moves} u = Turtle() u.set_angle(90) u.fd(15)")
+    ).parse_program()
+    program.set_canvas(canvas)
+    program.execute()
+    index = canvas.index
+    segments = [(x, y) for x, line in canvas.turtle_lines.items()
+                for y in range(len(line) - 1)]
+    min_x, min_y, max_x, max_y = canvas.get_bounds()
+    viewports = [(x, y, x, y) for x, y in canvas.turtle_lines[0]]
+    for _ in range(500):
+        x = generator.uniform(min_x - 10, max_x + 10)
+        y = generator.uniform(min_y - 10, max_y + 10)
+        # sizes of viewports from a point to more than whole drawing
+        width = generator.choice([0, 1, 5, 17.3, 100, 1000])
+        height = generator.choice([0, 1, 5, 17.3, 100, 1000])
+        viewports.append((x, y, x + width, y + height))
+    for viewport in viewports:
+        assert index.query(viewport) == [
+            x for x in segments
+            if segment_in_rectangle(*index.get_segment(x), *viewport)
+        ]
+
+
+def test_indexed_canvas_long_segments():
+    canvas = IndexedPaths(cell_size=1)
+    program = Parser(token_source=generate_lexer(
+        """d = 1000000000 t = Turtle() t.fd(d) t.rotate(90) t.fd(d)
+        t.fd(0.5)""")
+    ).parse_program()
+    program.set_canvas(canvas)
+    program.execute()
+    index = canvas.index
+    # long segments aren't registered in cells they cross
+    assert index.overflow == [(0, 0), (0, 1)]
+    assert sum(len(x) for x in index.cells.values()) <= 2
+    assert index.query((-1, 5e8, 1, 5e8 + 1)) == [(0, 0)]
+    assert index.query((-1e9 - 1, 1e9 - 1, 1e9, 1e9 + 1)) == [
+        (0, 0), (0, 1), (0, 2)
+    ]
+    assert index.nearest(-5e8, 1e9 + 2)[1:] == (0, 1)
+    assert index.nearest(-1e9 - 1, 1e9 + 1)[1:] == (0, 2)
+    assert index.nearest(3, 3, max_distance=1) is None
+    assert index.count_intersections() == 0
+
+    program = Parser(token_source=generate_lexer(
+        "d = 1 repeat(400) { d = d * 10 } t = Turtle() t.fd(d)")
+    ).parse_program()
+    program.set_canvas(IndexedPaths())
+    with pytest.raises(LogoRuntimeError, match="Canvas can't index line"):
+        program.execute()
+
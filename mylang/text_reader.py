@@ -1,4 +1,10 @@
+import codecs
+import io
+import mmap
+import os
+import re
 from abc import ABC, abstractmethod
+from array import array
 
 from .shared import Location
 
@@ -6,6 +12,8 @@ from .shared import Location
 class TextReader(ABC):
     """Base class for queque reading letters
     """
+    # encoding of bytes yielded by iter_bytes
+    encoding = "utf-8"
     @abstractmethod
     def get_char(self) -> str:
         """if buffer empty then wait
@@ -26,6 +34,21 @@ class TextReader(ABC):
     def get_location(self) -> Location:
         raise NotImplementedError
 
+    def get_text(self) -> str:
+        """Returns whole source at once, used by lexers scanning
+        complete buffer instead of single characters.
+        """
+        raise NotImplementedError
+
+    def iter_bytes(self, chunk_size: int = 64 * 1024):
+        """Yields encoded source in chunks, used for hashing it without
+        another copy of whole source.
+        """
+        text = self.get_text()
+        for start in range(0, len(text), chunk_size):
+            yield text[start:start + chunk_size].encode(
+                self.encoding, "surrogatepass")
+
     def print_loc_region(self, loc: Location) -> str:
         """Used after error
         """
@@ -39,7 +62,7 @@ class StringReader(TextReader):
         self.lineno = 0
         self.charnr = -1
         self.newline = False
-        self.lines = self.msg.split('\n')
+        self.lines = None
 
     def get_char(self):
         self.counter += 1
@@ -59,7 +82,12 @@ class StringReader(TextReader):
     def get_location(self) -> Location:
         return Location(self.lineno, self.charnr)
 
+    def get_text(self) -> str:
+        return self.msg
+
     def get_loc_region(self, loc: Location) -> str:
+        if self.lines is None:
+            self.lines = self.msg.split('\n')
         lineno = loc.line
         startline = lineno - 5 if lineno >= 5 else 0
         ret = ""
@@ -75,3 +103,108 @@ class FileReader(StringReader):
         msg = file.read()
         file.close()
         super().__init__(msg)
+
+
+class MappedFileReader(TextReader):
+    """Reader decoding memory-mapped file in chunks.
+
+    Decoded text is never held as a whole (unless get_text is used).
+    Lines printed by get_loc_region are found using an index of line
+    offsets, built the first time it is needed. Line endings "\r\n" and
+    "\r" are read as "\n", like FileReader does (universal newlines).
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, filename: str, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self.file = open(filename, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size:
+            self.data = mmap.mmap(self.file.fileno(),
+                                  0,
+                                  access=mmap.ACCESS_READ)
+        else:
+            # empty files can't be mapped
+            self.data = b""
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(encoding)(), translate=True)
+        self.offset = 0
+        self.chunk = ""
+        self.chunk_pos = 0
+
+        self.lineno = 0
+        self.charnr = -1
+        self.newline = False
+        self.line_offsets = None
+
+    def get_char(self):
+        self.charnr += 1
+        if self.chunk_pos >= len(self.chunk) and not self._decode_chunk():
+            return '\0'
+        if self.newline:
+            self.lineno += 1
+            self.charnr = 0
+            self.newline = False
+
+        char = self.chunk[self.chunk_pos]
+        self.chunk_pos += 1
+        if char == "\n":
+            self.newline = True
+        return char
+
+    def _decode_chunk(self) -> bool:
+        """Decodes next chunk of file, returns False at the end of file."""
+        self.chunk = ""
+        self.chunk_pos = 0
+        # multibyte characters split between chunks are kept by decoder,
+        # so a single chunk may decode to an empty string
+        while not self.chunk and self.offset < self.size:
+            end = min(self.offset + self.CHUNK_SIZE, self.size)
+            self.chunk = self.decoder.decode(self.data[self.offset:end],
+                                             end == self.size)
+            self.offset = end
+        return bool(self.chunk)
+
+    def get_location(self) -> Location:
+        return Location(self.lineno, self.charnr)
+
+    def get_text(self) -> str:
+        text = str(self.data, self.encoding)
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+    def iter_bytes(self, chunk_size: int = CHUNK_SIZE):
+        """Yields bytes of file, without decoding them."""
+        for start in range(0, self.size, chunk_size):
+            yield self.data[start:start + chunk_size]
+
+    def get_loc_region(self, loc: Location) -> str:
+        if self.line_offsets is None:
+            self.line_offsets = array("q", [0])
+            self.line_offsets.extend(
+                match.end()
+                for match in re.finditer(rb"\r\n?|\n", self.data))
+        lineno = min(loc.line, len(self.line_offsets) - 1)
+        startline = lineno - 5 if lineno >= 5 else 0
+        ret = ""
+        for nr in range(startline, lineno + 1):
+            ret += self._get_line(nr) + "\n"
+        ret += " " * loc.char_number + "^"
+        return ret
+
+    def _get_line(self, nr: int) -> str:
+        start = self.line_offsets[nr]
+        if nr + 1 < len(self.line_offsets):
+            end = self.line_offsets[nr + 1]
+        else:
+            end = self.size
+        line = str(self.data[start:end], self.encoding, errors="replace")
+        return line.rstrip("\r\n")
+
+    def close(self):
+        """Releases mapping, get_char returns 0x00 afterwards."""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b""
+        self.size = 0
+        self.chunk = ""
+        self.file.close()
@@ -0,0 +1,104 @@
+from array import array
+
+from .shared import Token, TokenType, Location
+
+
+class TokenBuffer(object):
+    """Struct-of-arrays storage of tokens.
+
+    Types, lines and columns of tokens are kept in parallel arrays, values
+    are stored once in a pool and referenced by index. Tokens are pulled
+    from the source lexer lazily (when someone asks for them) or all at
+    once by fill(). Token objects are created only by __getitem__ and
+    get_token, get_type gives token type without creating anything.
+    """
+    TOKEN_TYPES = list(TokenType)
+    TYPE_CODES = {token_type: nr for nr, token_type in enumerate(TOKEN_TYPES)}
+
+    def __init__(self, token_source=None):
+        self.types = array("B")
+        self.values = array("I")
+        self.lines = array("I")
+        self.columns = array("I")
+        self.value_pool = []
+        self._value_codes = {}
+        # cursor used by get_token
+        self.position = 0
+
+        if token_source is None:
+            self._raw_tokens = None
+            self.append(TokenType.EOF, "", 0, 0)
+        elif hasattr(token_source, "scan"):
+            self._raw_tokens = token_source.scan()
+        else:
+            self._raw_tokens = self._read_tokens(token_source)
+
+    @classmethod
+    def from_lexer(cls, lexer):
+        "Returns buffer with whole source of lexer already tokenized."
+        return cls(lexer).fill()
+
+    @staticmethod
+    def _read_tokens(lexer):
+        while True:
+            token = lexer.get_token()
+            location = token.location
+            yield token.symbol_type, token.value, location.line, location.char_number
+
+    def append(self, token_type: TokenType, value, line: int, column: int):
+        value_code = self._value_codes.get(value)
+        if value_code is None:
+            value_code = len(self.value_pool)
+            self._value_codes[value] = value_code
+            self.value_pool.append(value)
+        self.types.append(self.TYPE_CODES[token_type])
+        self.values.append(value_code)
+        self.lines.append(line)
+        self.columns.append(column)
+        if token_type is TokenType.EOF:
+            self._raw_tokens = None
+
+    def fill(self):
+        "Tokenizes rest of the source."
+        while self._raw_tokens is not None:
+            self.append(*next(self._raw_tokens))
+        return self
+
+    def _fetch(self, index: int) -> int:
+        """Reads tokens until the one with given index is available.
+        Indexes after EOF are mapped to EOF.
+        """
+        while index >= len(self.types):
+            if self._raw_tokens is None:
+                return len(self.types) - 1
+            self.append(*next(self._raw_tokens))
+        return index
+
+    def get_type(self, index: int) -> TokenType:
+        if index >= len(self.types):
+            index = self._fetch(index)
+        return self.TOKEN_TYPES[self.types[index]]
+
+    def get_value(self, index: int):
+        index = self._fetch(index)
+        return self.value_pool[self.values[index]]
+
+    def get_location(self, index: int) -> Location:
+        index = self._fetch(index)
+        return Location(self.lines[index], self.columns[index])
+
+    def __getitem__(self, index: int) -> Token:
+        index = self._fetch(index)
+        return Token(self.TOKEN_TYPES[self.types[index]],
+                     self.value_pool[self.values[index]],
+                     Location(self.lines[index], self.columns[index]))
+
+    def __len__(self):
+        return len(self.types)
+
+    def get_token(self) -> Token:
+        "Returns token under cursor and moves cursor forward (like Lexer)."
+        token = self[self.position]
+        if token.symbol_type is not TokenType.EOF:
+            self.position += 1
+        return token
@@ -0,0 +1,416 @@
+from .base_nodes import (BaseFunctionDefinition, BaseObject, NativeMethod,
+                         get_field)
+from .definition_classes import FunctionDefinition
+from .language_errors import CompilationError, LogoRuntimeError
+from .node_classes import (ForStatement, FunOperator, Identifier,
+                           IfStatement, ReturnStatement, ValueAssignment,
+                           WhileStatement)
+from .node_visitor import NodeVisitor
+from .resolver import Resolver, get_root_lookup
+
+
+class PythonTranspiler(NodeVisitor):
+    """Translates Program into Python source.
+
+    Every user function becomes a Python function and top level statements
+    become __main function. Variables of functions and blocks (scopes given
+    by Resolver) are Python locals, None means that variable isn't
+    defined. Variables of root context stay in its dictionary. Statement
+    return(...) becomes Python return. Objects used by generated code
+    (definitions, locations, helpers) are kept in namespace.
+    """
+    INDENT = "    "
+
+    def __init__(self, program):
+        self.program = program
+        self.root_context = program.root_context
+        self.definitions = program.root_context.definitions
+        self.lines = []
+        self.depth = 0
+        self.resolver = Resolver().resolve(program)
+        self.scope = None
+        self.temp_count = 0
+        self.constants = []
+        self.constant_ids = {}
+        self.function_names = {
+            x: f"__f_{x.name}"
+            for x in program.definitions
+        }
+        # root variable named return would be called by return(...)
+        self.return_assigned = any(
+            isinstance(x, ValueAssignment) and x.name == "return"
+            for x in program.statements)
+
+        self.functions = {}
+        self.namespace = {
+            "__root": self.root_context,
+            "__program": program,
+            "__C": self.constants,
+            "__functions": self.functions,
+            "__ReturnValue": FunctionDefinition.ReturnValue,
+            "__LogoRuntimeError": LogoRuntimeError,
+            "__call": _get_call_function(self.root_context, self.functions),
+            "__lookup": get_root_lookup(self.root_context),
+            "__field": get_field,
+            "__method": _get_method,
+            "__invoke": _get_invoke_function(self.root_context,
+                                             self.functions),
+            "__divisor": _divisor,
+            "__loop_values": ForStatement.get_values,
+            "__assign_none": _assign_none,
+        }
+
+    def transpile(self) -> str:
+        "returns Python source of program"
+        for definition in self.program.definitions:
+            self.visit(definition)
+
+        self._emit("def __main():")
+        self.depth += 1
+        for statement in self.program.statements:
+            self._emit(
+                f"__program.current_statement = {self._constant(statement)}")
+            self._emit_statement(statement)
+        self._emit("pass")
+        self.depth -= 1
+
+        for definition, name in self.function_names.items():
+            self._emit(f"__functions[{self._constant(definition)}] = {name}")
+        return "\n".join(self.lines) + "\n"
+
+    def compile(self):
+        "returns __main function of transpiled program"
+        code = compile(self.transpile(), "<logo>", "exec")
+        exec(code, self.namespace)
+        for definition, name in self.function_names.items():
+            if definition.memo is not None:
+                # generated code calls functions by global name
+                function = _memoized(definition.memo, self.namespace[name])
+                self.namespace[name] = self.functions[definition] = function
+        return self.namespace["__main"]
+
+    def _emit(self, line: str):
+        self.lines.append(self.INDENT * self.depth + line)
+
+    def _constant(self, value) -> str:
+        "returns expression giving value from namespace"
+        nr = self.constant_ids.get(id(value))
+        if nr is None:
+            nr = len(self.constants)
+            self.constant_ids[id(value)] = nr
+            self.constants.append(value)
+        return f"__C[{nr}]"
+
+    def _new_temp(self) -> str:
+        self.temp_count += 1
+        return f"t{self.temp_count}"
+
+    def _enter_scope(self, node):
+        "returns scope of node, None if it runs in enclosing one"
+        scope = self.resolver.scopes.get(node)
+        if scope is not None:
+            self.scope = scope
+        return scope
+
+    @staticmethod
+    def _variable(scope, slot: int) -> str:
+        return f"v{scope.nr}_{scope.names[slot]}"
+
+    def _variables(self, node) -> list:
+        "returns Python variables which node can refer to, innermost first"
+        return [
+            self._variable(self.scope.get_scope(depth), slot)
+            for depth, slot in self.resolver.slots[node]
+        ]
+
+    def _emit_scope_init(self, scope, skip: int = 0):
+        "sets variables of scope (except first skip ones) to None"
+        if scope is None:
+            return
+        names = [self._variable(scope, x) for x in range(skip, len(scope.names))]
+        if names:
+            self._emit(" = ".join(names) + " = None")
+
+    def _emit_block(self, statements: list):
+        for statement in statements:
+            self._emit_statement(statement)
+        if not statements:
+            self._emit("pass")
+
+    def _emit_statement(self, statement):
+        if isinstance(statement,
+                      (ValueAssignment, IfStatement, WhileStatement,
+                       ForStatement)):
+            self.visit(statement)
+        elif type(statement) is ReturnStatement and not self._is_shadowed(
+                statement.call.id_value):
+            self._emit_return(statement.arguments)
+        else:
+            self._emit(self.visit(statement))
+
+    def _is_shadowed(self, node) -> bool:
+        "checks if return can refer to variable instead of return function"
+        return self.return_assigned or bool(self.resolver.slots[node])
+
+    def _emit_return(self, arguments: list):
+        if len(arguments) > 1:
+            values = ", ".join(self.visit(x) for x in arguments)
+            self._emit(f"[{values}]")
+            self._emit("raise __LogoRuntimeError('Wrong number of valuse "
+                       f"passed to return: {len(arguments)}')")
+        elif arguments:
+            self._emit(f"return {self.visit(arguments[0])}")
+        else:
+            self._emit("return None")
+
+    def _get_definition(self, node):
+        "returns definition which identifier always refers to"
+        if isinstance(node, Identifier) and node.name in self.definitions:
+            if not self.resolver.slots[node]:
+                # root context can't have element named like definition
+                return self.definitions[node.name]
+        return None
+
+    def visit_FunctionDefinition(self, node):
+        scope = self._enter_scope(node)
+        arguments = len(node.arguments)
+        parameters = [self._variable(scope, x) for x in range(arguments)]
+
+        self._emit(
+            f"def {self.function_names[node]}({', '.join(parameters)}):")
+        self.depth += 1
+        self._emit_scope_init(scope, skip=arguments)
+        self._emit("try:")
+        self.depth += 1
+        self._emit_block(node.block.statements)
+        self.depth -= 1
+        self._emit("except __ReturnValue as ret:")
+        self._emit(self.INDENT + "return ret.args[0]")
+        self.depth -= 1
+        self.scope = None
+
+    def visit_ValueAssignment(self, node):
+        name = node.name
+        value = self._new_temp()
+        self._emit(f"{value} = {self.visit(node.expression)}")
+        self._emit(f"if {value} is None:")
+        self._emit(self.INDENT + f"__assign_none({name!r})")
+
+        if self.scope is None:
+            self._emit(f"__root.define_element({name!r}, {value})")
+            return
+        if self.scope.is_function and name == "return":
+            self._emit("raise __LogoRuntimeError('Redefinition of element')")
+            return
+
+        # like Context.define_element: innermost defined variable is
+        # changed, new variable is created in current scope
+        variables = self._variables(node)
+        keyword = "if"
+        for variable in variables:
+            self._emit(f"{keyword} {variable} is not None:")
+            self._emit(self.INDENT + f"{variable} = {value}")
+            keyword = "elif"
+        self._emit(f"elif __root.get_element({name!r}) is not None:")
+        self._emit(self.INDENT + f"__root.define_element({name!r}, {value})")
+        self._emit("else:")
+        self._emit(self.INDENT + f"{variables[0]} = {value}")
+
+    def visit_IfStatement(self, node):
+        self._emit(f"if {self.visit(node.condition)}:")
+        outer_scope = self.scope
+        scope = self._enter_scope(node)
+
+        self.depth += 1
+        self._emit_scope_init(scope)
+        self._emit_block(node.true_block.statements)
+        self.depth -= 1
+        if node.false_block:
+            self._emit("else:")
+            self.depth += 1
+            self._emit_scope_init(scope)
+            self._emit_block(node.false_block.statements)
+            self.depth -= 1
+        self.scope = outer_scope
+
+    def visit_WhileStatement(self, node):
+        outer_scope = self.scope
+        scope = self._enter_scope(node)
+        self._emit_scope_init(scope)
+        self._emit(f"while {self.visit(node.condition)}:")
+        self.depth += 1
+        self._emit_block(node.block.statements)
+        self.depth -= 1
+        self.scope = outer_scope
+
+    def visit_ForStatement(self, node):
+        bounds = ", ".join(
+            self.visit(x) for x in (node.start, node.end, node.step))
+        outer_scope = self.scope
+        scope = self._enter_scope(node)
+        counter = self._variable(scope, scope.slots[node.variable])
+        self._emit_scope_init(scope, skip=1)
+        self._emit(f"for {counter} in __loop_values({bounds}):")
+        self.depth += 1
+        self._emit_block(node.block.statements)
+        self.depth -= 1
+        self.scope = outer_scope
+
+    def visit_LogicalExpression(self, node):
+        # all conditions are evaluated (no short-circuit) like in AST
+        conditions = " | ".join(f"bool({self.visit(x)})"
+                                for x in node.and_conditions)
+        return f"({conditions})"
+
+    def visit_AndCondition(self, node):
+        relations = " & ".join(f"bool({self.visit(x)})"
+                               for x in node.relations)
+        return f"({relations})"
+
+    def visit_Relation(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        return f"({left} {node.comp_sign} {right})"
+
+    def visit_MathExpression(self, node):
+        # flat, Python adds from left too (nested parentheses are limited)
+        result = self.visit(node.add_expressions[0])
+        for sign, expression in zip(node.operators, node.add_expressions[1:]):
+            result += f" {sign} {self.visit(expression)}"
+        return f"({result})" if node.operators else result
+
+    def visit_AddExpression(self, node):
+        result = self.visit(node.factors[0])
+        for sign, factor in zip(node.operators, node.factors[1:]):
+            if sign == "*":
+                result += f" * {self.visit(factor)}"
+            else:
+                location = self._constant(factor.location)
+                result += f" / __divisor({self.visit(factor)}, {location})"
+        return f"({result})" if node.operators else result
+
+    def visit_Factor(self, node):
+        value = self.visit(node.value)
+        if node.unary_op == "-":
+            return f"(-{value})"
+        if node.unary_op == "!":
+            return f"(not {value})"
+        return value
+
+    def visit_ConstValue(self, node):
+        if type(node.value) in (float, str):
+            return repr(node.value)
+        return self._constant(node.value)
+
+    def visit_Identifier(self, node):
+        definition = self._get_definition(node)
+        if definition is not None:
+            return self._constant(definition)
+
+        name = node.name
+        in_function = self.scope is not None
+        location = self._constant(node.location)
+        result = f"__lookup({name!r}, {location}, {in_function})"
+        variables = self._variables(node)
+        for variable in reversed(variables):
+            result = f"({variable} if {variable} is not None else {result})"
+        return result
+
+    def visit_ReturnStatement(self, node):
+        return self.visit(node.call)
+
+    def visit_Value(self, node):
+        result = self.visit(node.id_value)
+        definition = self._get_definition(node.id_value)
+        for operator in node.steps:
+            if isinstance(operator, FunOperator):
+                result = self._visit_call(operator, result, definition)
+            else:
+                result = self.visit(operator, result)
+            definition = None
+        return result
+
+    def visit_FieldOperator(self, node, source):
+        return f"__field({source}, {node.name!r})"
+
+    def visit_MethodCallOperator(self, node, source):
+        # source is evaluated once, before field is checked and arguments
+        # are evaluated
+        temp = self._new_temp()
+        arguments = ", ".join(self.visit(x) for x in node.call.arguments)
+        return (f"__invoke(({temp} := {source}), "
+                f"__method({temp}, {node.field.name!r}), [{arguments}])")
+
+    def visit_FunOperator(self, node, source):
+        return self._visit_call(node, source)
+
+    def _visit_call(self, node, source: str, definition=None) -> str:
+        arguments = ", ".join(self.visit(x) for x in node.arguments)
+        if isinstance(definition, FunctionDefinition) and len(
+                definition.arguments) == len(node.arguments):
+            return f"{self.function_names[definition]}({arguments})"
+        if isinstance(definition, BaseFunctionDefinition):
+            return f"{source}.execute([{arguments}], __root)"
+        return f"__call({source}, [{arguments}])"
+
+
+def _get_call_function(root_context, functions: dict):
+    def call(source_element, values: list):
+        if type(source_element) is FunctionDefinition:
+            if len(values) != len(source_element.arguments):
+                raise LogoRuntimeError("Numbers of arguments don't match")
+            return functions[source_element](*values)
+        return source_element.execute(values, root_context)
+
+    return call
+
+
+def _memoized(memo, function):
+    def memoized(*values):
+        return memo.call(values, function, *values)
+
+    return memoized
+
+
+def _get_invoke_function(root_context, functions: dict):
+    call = _get_call_function(root_context, functions)
+
+    def invoke(source_element, method, values: list):
+        if type(method) is NativeMethod:
+            return method.call(source_element, values)
+        return call(method, values)
+
+    return invoke
+
+
+def _get_method(source_element, name: str):
+    "returns native method of object or value of its field"
+    if isinstance(source_element, BaseObject):
+        method = source_element.methods.get(name)
+        if method is not None:
+            return method
+    return get_field(source_element, name)
+
+
+def _divisor(divisor, location):
+    "returns divisor, dividend is divided by it in generated code"
+    if divisor == 0:
+        raise ZeroDivisionError(f"Dividing by zero at {location}")
+    return divisor
+
+
+def _assign_none(name: str):
+    raise LogoRuntimeError(f"Trying to assign None value to {name}")
+
+
+class TranspilerEngine(object):
+    "Runs program translated into Python by PythonTranspiler"
+
+    def execute(self, program):
+        try:
+            main = PythonTranspiler(program).compile()
+        except (SyntaxError, RecursionError) as err:
+            # Python limits nesting of parentheses and depth of its AST
+            raise CompilationError(
+                f"Program can't be compiled to Python: {err}") from err
+        main()
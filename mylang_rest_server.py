@@ -1,15 +1,19 @@
 #!/usr/bin/python3
 
-from flask import Flask, request, render_template, send_from_directory
+from math import isfinite
+
+from flask import (Flask, Response, request, render_template,
+                   send_from_directory)
 
 from mylang.shared import StringLogger, set_global_logger, get_global_logger
 
 from mylang.language_errors import LogoSyntaxError, BaseLanguageException
-from mylang.lexer import Lexer
-from mylang.parser_logo import Parser
+from mylang.parse_cache import ParseCache
 from mylang.text_reader import StringReader
 
-from dataclasses import asdict
+from mylang.standard_library.drawing.canvas import ColumnarPaths
+from mylang.standard_library.drawing.decimation import LevelsOfDetail
+from mylang.standard_library.drawing.svg_renderer import SvgRenderer
 
 app = Flask(__name__,
             template_folder="./web_interface",
@@ -17,6 +21,7 @@ app = Flask(__name__,
             static_folder="./web_interface")
 
 set_global_logger(StringLogger())
+parse_cache = ParseCache(logger=get_global_logger())
 
 
 @app.route('/', methods=["GET"])
@@ -33,8 +38,12 @@ def post_code():
     parsed_json = request.get_json()
     code = parsed_json["code"]
     print("Got code: ", code, "\nexecuting...")
+    scale = parsed_json.get("scale")
+    viewport = parsed_json.get("viewport")
+    if detail_error := check_detail(scale, viewport):
+        return Response(detail_error, status=400, mimetype="text/plain")
 
-    log, canvas, error = execute_code(code)
+    log, canvas, error = execute_code(code, scale, viewport)
     response = {}
     response["log"] = log
     response["canvas"] = canvas
@@ -42,19 +51,81 @@ def post_code():
     return response
 
 
-def execute_code(code: str):
+@app.route('/svg', methods=["POST"])
+def post_code_svg():
+    "executes code and streams drawing as SVG, or returns error as text"
+    parsed_json = request.get_json()
+    scale = parsed_json.get("scale")
+    viewport = parsed_json.get("viewport")
+    if detail_error := check_detail(scale, viewport):
+        return Response(detail_error, status=400, mimetype="text/plain")
+    program, error = run_code(parsed_json["code"])
+    # output of program is returned only by JSON endpoint
+    get_global_logger().out_string = ""
+    if error:
+        return Response(error, status=400, mimetype="text/plain")
+    renderer = SvgRenderer(select_detail(program.get_canvas(), scale,
+                                         viewport))
+    return Response(renderer.iter_svg(), mimetype="image/svg+xml")
+
+
+@app.route('/cache', methods=["GET"])
+def get_cache_stats():
+    return parse_cache.get_stats()
+
+
+def run_code(code: str):
+    "returns executed program and None or None and error message"
     reader = StringReader(code)
-    lexer = Lexer(reader, get_global_logger())
     try:
-        program = Parser(lexer, get_global_logger()).parse_program()
+        program = parse_cache.parse_program(reader)
+        # compact storage of points, programs may draw millions of them
+        program.set_canvas(ColumnarPaths())
         program.execute()
     except BaseLanguageException as exc:
         error_msg = f"Error: {str(exc)}\n"
         error_msg += f"At: {exc.location}\n"
         error_msg += reader.get_loc_region(exc.location)
+        return (None, error_msg)
+    return (program, None)
+
+
+def _is_number(value) -> bool:
+    return (type(value) in (int, float)) and isfinite(value)
+
+
+def check_detail(scale, viewport):
+    "returns error message if scale or viewport sent by client is invalid"
+    if scale is not None and not (_is_number(scale) and scale >= 0):
+        return "Error: scale must be a non-negative number\n"
+    if viewport is not None:
+        if (type(viewport) is not list or len(viewport) != 4
+                or not all(_is_number(x) for x in viewport)):
+            return "Error: viewport must be a list of 4 numbers\n"
+        min_x, min_y, max_x, max_y = viewport
+        if min_x > max_x or min_y > max_y:
+            return "Error: viewport must be [min_x, min_y, max_x, max_y]\n"
+    return None
+
+
+def select_detail(canvas, scale=None, viewport=None):
+    """returns canvas decimated for scale (pixels per unit of drawing) and
+    clipped to viewport [min_x, min_y, max_x, max_y], when they are given.
+
+    LevelsOfDetail is built again for every request, levels aren't kept
+    between requests, because every request runs its program again and
+    gets a new canvas anyway."""
+    if scale is None and not viewport:
+        return canvas
+    return LevelsOfDetail(canvas).select(scale, viewport)
+
+
+def execute_code(code: str, scale=None, viewport=None):
+    program, error_msg = run_code(code)
+    if error_msg:
         return ("", None, error_msg)
 
-    canvas = asdict(program.get_canvas())
+    canvas = select_detail(program.get_canvas(), scale, viewport).to_dict()
     #TODO limit number of workers in flask
     logger_string = get_global_logger().out_string
     get_global_logger().out_string = ""